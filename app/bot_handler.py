@@ -1,81 +1,197 @@
 # app/bot_handler.py
-from fastapi import APIRouter, Request, Depends
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+import os
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import AsyncSessionLocal
+from app.services.update_queue import get_update_queue, QueueFull
+from app.services.dedup import get_deduplicator
+from app.services.telegram_client import get_telegram_client
+from app.services.export_jobs import get_export_manager, ExportQueueFull
+from app.services.statement_import import get_import_manager, ImportQueueFull, IMPORT_MAX_BYTES
+from app.services.transactions import load_ledger_async
+from app.services.responses import FORMATTERS
+from app.services.log import get_logger, LOG_MESSAGE_TEXT
+from app.services.metrics import UPDATES, UPDATE_SECONDS
+from app.services import tracing
 from app.utils.nlp import parse_message, parse_time_range, extract_update_fields_from_msg
-from app.utils.generate_pdf import generate_pdf_report
-from tempfile import NamedTemporaryFile
 from dateutil import parser
 import pytz
-from app.db import crud
-import httpx
-import os
+from app.db import async_crud as crud
+from app.db.crud import ADJUSTMENT_CATEGORY, local_day
+from app.nlp.parser import split_items, names_account, normalize
+from app.db import profiler
+from app.utils.money import to_paise
+from app.utils.indian_format import format_inr
 
 telegram_webhook = APIRouter()
+logger = get_logger("app.bot")
+
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "5"))
+HISTORY_PAGE_SIZE_MAX = int(os.getenv("HISTORY_PAGE_SIZE_MAX", "20"))  # however many the message (or a forged button) asks for
 
 @telegram_webhook.post("/")
-async def handle_telegram_webhook(req: Request, db: Session = Depends(get_db)):
+async def handle_telegram_webhook(req: Request):
+    # Acknowledge straight away; Telegram redelivers anything that isn't answered in time.
     payload = await req.json()
+    deduplicator = get_deduplicator()
+    if not await deduplicator.is_new(payload.get("update_id")):
+        return {"ok": True}
+    try:
+        await get_update_queue().put(payload)
+    except QueueFull:
+        # Let Telegram retry later instead of growing without bound; the retry isn't a duplicate.
+        await deduplicator.release(payload.get("update_id"))
+        return JSONResponse({"ok": False, "error": "busy"}, status_code=503)
+    except Exception:
+        await deduplicator.release(payload.get("update_id"))
+        raise
+    return {"ok": True}
+
+
+async def process_update(payload: dict):
+    with tracing.span("update", update_id=payload.get("update_id")), UPDATE_SECONDS.time(), profiler.profile("update"):
+        async with AsyncSessionLocal() as db:
+            await handle_update(payload, db)
+
+
+async def handle_update(payload: dict, db: AsyncSession):
     message = None
+    callback = payload.get("callback_query")
     if "message" in payload:
         message = payload["message"]
     elif "edited_message" in payload:
         message = payload["edited_message"]
-    elif "callback_query" in payload:
-        message = payload["callback_query"]["message"]
+    elif callback:
+        message = callback["message"]  # the bot's message the button is on; the user is callback["from"]
     else:
-        print("Unhandled update type:", payload)
-        return {"ok": True}
+        UPDATES.inc(type="unhandled", action="")
+        logger.info("Unhandled update type", extra={"keys": sorted(payload)})
+        return
 
     chat_id = message["chat"]["id"]
     text = message.get("text", "")
-    telegram_id = str(message["from"]["id"])
-    name = message["from"].get("first_name", "User")
-    BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+    sender = callback.get("from", message["from"]) if callback else message["from"]
+    telegram_id = str(sender["id"])
+    name = sender.get("first_name", "User")
 
-    user = crud.get_user(db, telegram_id)
-    if not user:
-        user = crud.create_user(db, telegram_id, name)
+    user_id = await crud.get_user_id(db, telegram_id)
+    if user_id is None:
+        user_id = (await crud.create_user(db, telegram_id, name)).id
 
-    if "export" in text.lower():
-        parsed_time = parse_time_range(text)
-        print(parsed_time['start'], parsed_time['end'])
-        with NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            file_name = f"report_{parsed_time['start'][:10]}_{parsed_time['end'][:10]}.pdf"
-            generate_pdf_report(user.id, db,  file_name, parsed_time['start'], parsed_time['end'])
+    if callback:
+        if (callback.get("data") or "").startswith("tx:"):
+            await _turn_history_page(db, user_id, chat_id, message["message_id"], callback)
+            return
+        await _answer_callback(callback)
+
+    # Bank statement upload; the caption names the account.
+    if "document" in message:
+        document = message["document"]
+        caption = (message.get("caption") or "").split()
+        acc_name = caption[0] if caption else "Cash"
+        UPDATES.inc(type="document", action="import")
+        tracing.set_attributes(type="document", action="import")
+        profiler.set_scope("update:document/import")
+        if (document.get("file_size") or 0) > IMPORT_MAX_BYTES:
+            reply = f"That file is too big to import (limit {IMPORT_MAX_BYTES // 2**20} MB)."
+        else:
             try:
-                with open(file_name, "rb") as f:
-                    async with httpx.AsyncClient() as client:
-                        await client.post(
-                            f"https://api.telegram.org/bot{BOT_TOKEN}/sendDocument",
-                            files={"document": f},
-                            data={"chat_id": chat_id, "caption": f"📄 Expense Report"}
-                        )
-            finally:
-                os.remove(file_name)
-        return {"ok": True}
+                job = get_import_manager().submit(user_id, chat_id, acc_name, document["file_id"], document.get("file_name"))
+                reply = f"⏳ Importing your statement into {acc_name.upper()}. I'll post progress here.\n<i>Job: {job.id}</i>"
+            except ImportQueueFull:
+                reply = "Too many statements are being imported right now. Please try again in a minute."
+        get_telegram_client().send_message(chat_id, reply)
+        return
 
-    parsed = parse_message(text)
+    if "export" in text.lower():
+        UPDATES.inc(type="export", action="read")
+        tracing.set_attributes(type="export", action="read")
+        profiler.set_scope("update:export/read")
+        parsed_time = await parse_time_range(text)
+        try:
+            job = get_export_manager().submit(user_id, chat_id, parsed_time['start'], parsed_time['end'])
+            reply = f"⏳ Preparing your report. It will arrive here shortly.\n<i>Job: {job.id}</i>"
+        except ExportQueueFull:
+            reply = "Too many reports are being prepared right now. Please try again in a minute."
+        get_telegram_client().send_message(chat_id, reply)
+        return
+
+    items = None
+    edited = "edited_message" in payload
+    if edited:
+        handled, items = await _apply_edit(db, user_id, chat_id, message["message_id"], text)
+        if handled:
+            return
+    source = _message_source(message, chat_id, text) if not callback else None
+
+    if items is None:
+        with tracing.span("parse"):
+            items = await parse_message(text)
+    parsed = items[0]
     reply = "Sorry, I couldn't understand that."
-    print("-" * 40,"\n")
-    print(f"Received message from {name} ({telegram_id}): {text}")
-    print(f"Parsed message: {parsed}")
-    print("-" * 40,"\n")
+    for item in items:
+        UPDATES.inc(type=item["type"], action=item["action"])
+    tracing.set_attributes(type=parsed["type"], action=parsed["action"], items=len(items))
+    if not edited:
+        profiler.set_scope(f"update:{'batch' if len(items) > 1 else parsed['type']}/{parsed['action']}")
+    logger.debug("Parsed message", extra={
+        "telegram_id": telegram_id,
+        "intents": [f"{i['type']}/{i['action']}" for i in items],
+        **({"text": text, "parsed": items} if LOG_MESSAGE_TEXT else {}),
+    })
+
+    # CREATE several income/expenses from one message, in one commit
+    if len(items) > 1:
+        batch = [i for i in items if i["type"] in ["income", "expense"] and i["action"] == "create"]
+        segments = split_items(text)
+        sources = [
+            {**source, "message_item": n, "source_text": segments[n] if len(segments) == len(items) else text}
+            for n, i in enumerate(items) if i in batch
+        ] if source else None
+        acc_ids = {}
+        for item in batch:
+            acc_name = item["account"]
+            if acc_name.upper() not in acc_ids:
+                acc_id = await crud.get_account_id(db, user_id, acc_name)
+                if acc_id is None:
+                    acc_id = (await crud.create_account(db, user_id, acc_name, 0)).id
+                acc_ids[acc_name.upper()] = acc_id
+        txns = await crud.add_transactions(db, [
+            (acc_ids[i["account"].upper()], to_paise(i["amount"]), i["description"], i["type"], i["date"]) for i in batch
+        ], sources)
 
-    
+        lines = [
+            f"• {txn.type.value.title()} of <b>{format_inr(txn.amount_paise)}</b> - {item['description']} <i>({item['account']}"
+            + (f", {item['date']}" if item["date"] else "") + ")</i>"
+            for item, txn in zip(batch, txns)
+        ]
+        spent = sum(t.amount_paise for t in txns if t.type.value == "expense")
+        earned = sum(t.amount_paise for t in txns if t.type.value == "income")
+        reply = f"<b>Recorded {len(txns)} transactions:</b>\n\n" + "\n".join(lines)
+        reply += f"\n\nSpent {format_inr(spent)}" + (f", received {format_inr(earned)}" if earned else "") + "."
+        if len(batch) < len(items):
+            reply += f"\n<i>Skipped {len(items) - len(batch)} item(s) that aren't income or expenses; send those separately.</i>"
+
+    # ANALYTICS
+    elif parsed["type"] == "analytics":
+        parsed_time = await parse_time_range(text)
+        ledger = await load_ledger_async(db, user_id, parsed_time['start'], parsed_time['end'])
+        reply = FORMATTERS[parsed.get("metric") or "summary"](ledger)
 
     # CREATE income/expense
-    if parsed["type"] in ["income", "expense"] and parsed["action"] == "create":
+    elif parsed["type"] in ["income", "expense"] and parsed["action"] == "create":
         acc_name = parsed["account"]
-        acc = crud.get_account_by_name(db, user.id, acc_name)
-        if not acc:
-            acc = crud.create_account(db, user.id, acc_name, 0.0)
+        amount_paise = to_paise(parsed["amount"])
+        acc_id = await crud.get_account_id(db, user_id, acc_name)
+        if acc_id is None:
+            acc_id = (await crud.create_account(db, user_id, acc_name, 0)).id
 
-        txn = crud.add_transaction(
-            db, acc.id, parsed["amount"], parsed["description"], parsed["type"], parsed["date"] if parsed["date"] else None
+        txn = await crud.add_transaction(
+            db, acc_id, amount_paise, parsed["description"], parsed["type"], parsed["date"] if parsed["date"] else None, source
         )
 
-        reply = f"{parsed['type'].title()} of ₹{parsed['amount']} recorded in {acc_name}."
+        reply = f"{parsed['type'].title()} of {format_inr(amount_paise)} recorded in {acc_name}."
         if parsed["description"] != "Miscellaneous":
             reply += f"\nDescription: {parsed['description']}"
         if parsed["date"]:
@@ -83,49 +199,45 @@ async def handle_telegram_webhook(req: Request, db: Session = Depends(get_db)):
 
     # BALANCE
     elif parsed["type"] == "balance" and parsed["action"] == "read":
-        accounts = crud.get_all_balances(db, user.id)
-        summary = "\n".join([f"<b>{a.name}:</b> ₹{a.balance:.2f}" for a in accounts])
+        accounts = await crud.get_all_balances(db, user_id)
+        summary = "\n".join([f"<b>{a.name}:</b> {format_inr(a.balance_paise)}" for a in accounts])
         reply = f"<b>Current balances:</b>\n\n{summary}"
 
     # BALANCE SET
     elif parsed["type"] == "balance_adjustment":
         acc_name = parsed["account"]
-        acc = crud.get_account_by_name(db, user.id, acc_name)
-        if not acc:
-            acc = crud.create_account(db, user.id, acc_name, 0.0)
-
-        diff = parsed["amount"] - acc.balance
-        txn_type = "income" if diff > 0 else "expense"
-        txn = crud.add_transaction(
-            db, acc.id, abs(diff), "Balance correction", txn_type
-        )
-        reply = f"{acc_name} balance set to <b>₹{parsed['amount']}</b> <i>(adjusted by {txn_type} of ₹{abs(diff):.2f})</i>"
+        acc_id = await crud.get_account_id(db, user_id, acc_name)
+        if acc_id is None:
+            acc_id = (await crud.create_account(db, user_id, acc_name, 0)).id
+
+        target_paise = to_paise(parsed["amount"])
+        txn = await crud.set_balance(db, acc_id, target_paise, source=source)
+        reply = f"{acc_name} balance set to <b>{format_inr(target_paise)}</b> <i>(adjusted by {txn.type.value} of {format_inr(txn.amount_paise)})</i>"
 
     # TRANSFER
     elif parsed["type"] == "transfer":
         from_acc_name = parsed.get("from_account", "Cash")
         to_acc_name = parsed.get("account", "Cash")
-        amt = parsed["amount"]
+        amt = to_paise(parsed["amount"])
 
-        from_acc = crud.get_account_by_name(db, user.id, from_acc_name)
-        to_acc = crud.get_account_by_name(db, user.id, to_acc_name)
-        if not from_acc:
-            from_acc = crud.create_account(db, user.id, from_acc_name, 0.0)
-        if not to_acc:
-            to_acc = crud.create_account(db, user.id, to_acc_name, 0.0)
+        from_acc_id = await crud.get_account_id(db, user_id, from_acc_name)
+        to_acc_id = await crud.get_account_id(db, user_id, to_acc_name)
+        if from_acc_id is None:
+            from_acc_id = (await crud.create_account(db, user_id, from_acc_name, 0)).id
+        if to_acc_id is None:
+            to_acc_id = (await crud.create_account(db, user_id, to_acc_name, 0)).id
 
-        crud.add_transaction(db, from_acc.id, amt, parsed["description"], "expense")
-        crud.add_transaction(db, to_acc.id, amt, parsed["description"], "income")
+        await crud.add_transfer(db, from_acc_id, to_acc_id, amt, parsed["description"], source=source)
 
-        reply = f"Transferred <b>₹{amt}</b> from <i>{from_acc_name}</i> to <i>{to_acc_name}</i>."
+        reply = f"Transferred <b>{format_inr(amt)}</b> from <i>{from_acc_name}</i> to <i>{to_acc_name}</i>."
 
     elif parsed["action"] == "delete":
         acc_name = parsed.get("account", "Cash")
-        acc = crud.get_account_by_name(db, user.id, acc_name)
-        if acc:
-            deleted_txn = crud.delete_last_transaction(db, acc.id)
+        acc_id = await crud.get_account_id(db, user_id, acc_name)
+        if acc_id is not None:
+            deleted_txn = await crud.delete_last_transaction(db, acc_id)
             if deleted_txn:
-                reply = f"Deleted last {deleted_txn.type} of <b>₹{deleted_txn.amount}</b> from {acc_name}."
+                reply = f"Deleted last {deleted_txn.type} of <b>{format_inr(deleted_txn.amount_paise)}</b> from {acc_name}."
             else:
                 reply = f"No transactions found in {acc_name} to delete."
         else:
@@ -134,13 +246,13 @@ async def handle_telegram_webhook(req: Request, db: Session = Depends(get_db)):
     # UPDATE last transaction
     elif parsed["action"] == "update":
         acc_name = parsed.get("account", "Cash")
-        acc = crud.get_account_by_name(db, user.id, acc_name)
+        acc_id = await crud.get_account_id(db, user_id, acc_name)
 
-        if not acc:
+        if acc_id is None:
             reply = f"Account {acc_name} does not exist."
         else:
             # Step 1: Ask Gemini what fields the user meant to update
-            update_fields = extract_update_fields_from_msg(text)
+            update_fields = await extract_update_fields_from_msg(text)
             updated_values = {
                 "new_amount": None,
                 "new_description": None,
@@ -148,7 +260,7 @@ async def handle_telegram_webhook(req: Request, db: Session = Depends(get_db)):
                 "new_date": None
             }
             if update_fields.get("amount"):
-                updated_values["new_amount"] = update_fields["amount"]
+                updated_values["new_amount"] = to_paise(update_fields["amount"])
             if update_fields.get("description"):
                 updated_values["new_description"] = update_fields["description"]
             if update_fields.get("type") in ["income", "expense"]:
@@ -161,15 +273,12 @@ async def handle_telegram_webhook(req: Request, db: Session = Depends(get_db)):
                     pass  
 
             if updated_values:
-                updated_txn = crud.update_last_transaction(db, acc.id, updated_values['new_amount'] or None, updated_values['new_description'] or None, updated_values['new_type'] or None, updated_values['new_date'] or None)
+                updated_txn = await crud.update_last_transaction(db, acc_id, updated_values['new_amount'] or None, updated_values['new_description'] or None, updated_values['new_type'] or None, updated_values['new_date'] or None)
                 reply_parts = []
-
-                print("-"*30)
-                print("updated values: ", updated_values,"\nupdated Fields: ", update_fields)
-                print("-"*30)
+                logger.debug("Updated last transaction", extra={"fields": sorted(k for k, v in update_fields.items() if v)})
 
                 if "new_amount" in updated_values and updated_values['new_amount']:
-                    reply_parts.append(f"₹{updated_values['new_amount']}")
+                    reply_parts.append(format_inr(updated_values['new_amount']))
                 if "new_description" in updated_values and updated_values['new_description']:
                     reply_parts.append(f"{updated_values['new_description']}")
                 if "new_type" in updated_values and updated_values['new_type']:
@@ -183,26 +292,210 @@ async def handle_telegram_webhook(req: Request, db: Session = Depends(get_db)):
 
     elif parsed["action"] == "read" and parsed["type"] == "transaction":
         acc_name = parsed.get("account", "Cash")
-        limit = parsed.get("limit", 5)
+        limit = _page_size(parsed.get("limit"))
 
-        acc = crud.get_account_by_name(db, user.id, acc_name)
-        if not acc:
+        acc_id = await crud.get_account_id(db, user_id, acc_name)
+        if acc_id is None:
             reply = f"No account found with name {acc_name}."
         else:
-            txns = crud.get_recent_transactions(db, acc.id, limit)
+            txns, more = await crud.get_transactions_page(db, user_id, acc_id, limit)
             if not txns:
                 reply = f"No transactions found in {acc_name}."
             else:
-                lines = [
-                    f"• {txn.date.strftime('%d-%b')}: <b>₹{txn.amount:.2f}</b> - <i>{txn.type.title()} ({txn.description})</i>"
-                    for txn in txns
-                ]
-                reply = f"<b>Last {len(txns)} transactions in {acc_name}:</b>\n\n" + "\n".join(lines)
-
-    async with httpx.AsyncClient() as client:
-        await client.post(
-            f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage",
-            json={"chat_id": chat_id, "text": reply, "parse_mode": "HTML"}
-        )
+                reply, keyboard = _history_page(txns, limit, page=1, newer=False, older=more)
+                get_telegram_client().send_message(chat_id, reply, reply_markup=keyboard)
+                return
 
-    return {"ok": True}
+    get_telegram_client().send_message(chat_id, reply)
+
+
+def _message_source(message: dict, chat_id, text: str) -> dict:
+    """Where a transaction came from, so that editing the message later updates it in place."""
+    if not message.get("message_id"):
+        return None
+    return {"chat_id": chat_id, "message_id": message["message_id"], "message_item": 0, "source_text": text}
+
+
+def _kind(rows) -> str:
+    if rows[0].transfer_id:
+        return "transfer"
+    if rows[0].category == ADJUSTMENT_CATEGORY:
+        return "balance_adjustment"
+    return "entry"
+
+
+async def _apply_edit(db: AsyncSession, user_id: int, chat_id, message_id: int, text: str):
+    """
+    An edit of a message that recorded transactions: update them in place, changing only
+    the columns the new text changes. Returns (handled, items). When the edit changes what
+    kind of message it is (or how many entries a list has), the old transactions are deleted
+    and items, the new parse, is recorded like a new message. (False, None) for messages
+    that recorded nothing.
+    """
+    # Even when it recorded nothing, the edit is recorded afresh after this lookup: budget it as an edit.
+    profiler.set_scope("update:edit/update")
+    rows = await crud.get_message_transactions(db, user_id, chat_id, message_id)
+    if not rows:
+        return False, None
+    UPDATES.inc(type="edit", action="update")
+    tracing.set_attributes(type="edit", action="update")
+
+    kind = _kind(rows)
+    # Transfers and balance corrections keep the whole text on every row; lists one entry per row.
+    segments = split_items(text) if kind == "entry" and len(rows) > 1 else [text] * len(rows)
+    if len(segments) == len(rows) and all(normalize(seg) == normalize(row.source_text) for seg, row in zip(segments, rows)):
+        get_telegram_client().send_message(chat_id, "Your edit doesn't change what was recorded.")
+        return True, None
+
+    # A list whose last entry, which can name the account or date for all of them, is unchanged:
+    # only the entries that changed are parsed again, each on its own.
+    partial = kind == "entry" and len(rows) == len(segments) > 1 and normalize(segments[-1]) == normalize(rows[-1].source_text)
+    with tracing.span("parse"):
+        items = await _parse_changed(rows, segments) if partial else await parse_message(text)
+    entries = all(i is None or (i["type"] in ("income", "expense") and i["action"] == "create") for i in items)
+    if kind == "entry" and entries and len(items) == len(rows) == len(segments):
+        pairs = [(row, item) for row, item in zip(rows, items) if item is not None]
+        changes = await _entry_changes(db, user_id, pairs, [seg for seg, item in zip(segments, items) if item is not None], partial)
+    elif kind == "transfer" and len(items) == 1 and items[0]["type"] == "transfer" and _same_accounts(rows, items[0]):
+        # Edit the from leg; edit_transactions carries the change over to the to leg.
+        pairs = [(rows[0], items[0])]
+        changes = {rows[0].id: _diff(rows[0], items[0], text, ("amount", "description", "date"))}
+    else:
+        if partial:
+            with tracing.span("parse"):
+                items = await parse_message(text)
+        await crud.delete_transactions(db, [row.id for row in rows])
+        return False, items
+
+    changes = {txn_id: fields for txn_id, fields in changes.items() if fields}
+    if changes:
+        await crud.edit_transactions(db, changes)
+    lines = [_edited_line(item) for row, item in pairs if set(changes.get(row.id, ())) - {"source_text"}]
+    if lines:
+        reply = "<b>Updated from your edited message:</b>\n\n" + "\n".join(lines)
+    else:
+        reply = "Your edit doesn't change what was recorded."
+    get_telegram_client().send_message(chat_id, reply)
+    return True, None
+
+
+def _diff(row, item: dict, source_text: str, fields) -> dict:
+    """The columns of row that item, the edited text's parse, changes."""
+    changes = {}
+    if "amount" in fields and to_paise(item["amount"]) != row.amount_paise:
+        changes["amount_paise"] = to_paise(item["amount"])
+    if "type" in fields and item["type"] != row.type.value:
+        changes["type"] = item["type"]
+    if "description" in fields and item["description"] != row.description:
+        changes["description"] = item["description"]
+    # The date only changes when the edit names one; "spent 500" keeps the day it was recorded.
+    if "date" in fields and item["date"] and item["date"] != local_day(row.date).isoformat():
+        changes["date"] = item["date"]
+    if source_text != row.source_text:
+        changes["source_text"] = source_text
+    return changes
+
+
+async def _parse_changed(rows, segments) -> list:
+    """Parse each list entry whose text changed on its own; None for the ones that didn't."""
+    items = []
+    for row, segment in zip(rows, segments):
+        if normalize(segment) == normalize(row.source_text):
+            items.append(None)
+            continue
+        parsed = await parse_message(segment)
+        items.append(parsed[0] if len(parsed) == 1 else {"type": "unknown", "action": "read"})
+    return items
+
+
+async def _entry_changes(db: AsyncSession, user_id: int, pairs, segments, partial: bool) -> dict:
+    changes = {}
+    for (row, item), segment in zip(pairs, segments):
+        fields = _diff(row, item, segment, ("amount", "type", "description", "date"))
+        # Parsed alone, an entry that names no account gets the default; it had the list's.
+        if partial and not names_account(segment):
+            item["account"] = row.account.name
+        if item["account"].upper() != row.account.name.upper():
+            acc_id = await crud.get_account_id(db, user_id, item["account"])
+            if acc_id is None:
+                acc_id = (await crud.create_account(db, user_id, item["account"], 0)).id
+            fields["account_id"] = acc_id
+        changes[row.id] = fields
+    return changes
+
+
+def _same_accounts(legs, item: dict) -> bool:
+    """Whether the edited transfer is still between the accounts of legs (from, to)."""
+    names = (item.get("from_account", "Cash"), item.get("account", "Cash"))
+    return len(legs) == 2 and all(leg.account.name.upper() == name.upper() for leg, name in zip(legs, names))
+
+
+def _edited_line(item: dict) -> str:
+    amount = format_inr(to_paise(item["amount"]))
+    date = f", {item['date']}" if item["date"] else ""
+    if item["type"] == "transfer":
+        return f"• Transfer of <b>{amount}</b> - {item['description']} <i>({item.get('from_account', 'Cash')} to {item.get('account', 'Cash')}{date})</i>"
+    return f"• {item['type'].title()} of <b>{amount}</b> - {item['description']} <i>({item['account']}{date})</i>"
+
+
+def _page_size(limit) -> int:
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        limit = HISTORY_PAGE_SIZE
+    return max(1, min(limit, HISTORY_PAGE_SIZE_MAX))
+
+
+def _history_page(txns, limit: int, page: int, newer: bool, older: bool):
+    """Reply text and Prev/Next keyboard for one page of history; buttons carry the keyset, not an offset."""
+    account = txns[0].account
+    lines = [
+        f"• {txn.date.strftime('%d-%b')}: <b>{format_inr(txn.amount_paise)}</b> - <i>{txn.type.title()} ({txn.description})</i>"
+        for txn in txns
+    ]
+    title = f"Last {len(txns)} transactions in {account.name}" if page == 1 else f"Transactions in {account.name}, page {page}"
+    buttons = []
+    if newer:
+        buttons.append({"text": "‹ Prev", "callback_data": f"tx:{account.id}:n:{txns[0].id}:{limit}:{page - 1}"})
+    if older:
+        buttons.append({"text": "Next ›", "callback_data": f"tx:{account.id}:o:{txns[-1].id}:{limit}:{page + 1}"})
+    return f"<b>{title}:</b>\n\n" + "\n".join(lines), {"inline_keyboard": [buttons]} if buttons else None
+
+
+async def _turn_history_page(db: AsyncSession, user_id: int, chat_id, message_id: int, callback: dict):
+    """A Prev/Next press: edit the history message in place to show the neighbouring page."""
+    UPDATES.inc(type="transaction", action="read")
+    tracing.set_attributes(type="transaction", action="read")
+    profiler.set_scope("update:transaction/read")
+    try:
+        _, account_id, direction, anchor_id, limit, page = callback["data"].split(":")
+        account_id, anchor_id, page, newer = int(account_id), int(anchor_id), max(1, int(page)), direction == "n"
+    except ValueError:
+        await _answer_callback(callback)
+        return
+
+    limit = _page_size(limit)
+    txns, more = await crud.get_transactions_page(db, user_id, account_id, limit, anchor_id, newer)
+    if not txns:
+        await _answer_callback(callback, "No more transactions.")
+        return
+    if newer:
+        # Back at the newest page, or not, whatever the button said: rows may have been added since.
+        page = max(page, 2) if more else 1
+        reply, keyboard = _history_page(txns, limit, page, newer=more, older=True)
+    else:
+        reply, keyboard = _history_page(txns, limit, max(page, 2), newer=True, older=more)
+    await _answer_callback(callback)
+    try:
+        await get_telegram_client().edit_message(chat_id, message_id, reply, reply_markup=keyboard)
+    except Exception as e:
+        logger.warning("History page edit failed", extra={"chat_id": chat_id, "error": repr(e)})
+
+
+async def _answer_callback(callback: dict, text: str = None):
+    if not callback.get("id"):
+        return
+    try:
+        await get_telegram_client().answer_callback_query(callback["id"], text)
+    except Exception as e:
+        logger.warning("answerCallbackQuery failed", extra={"error": repr(e)})
@@ -0,0 +1,99 @@
+# Async counterparts of app/db/crud.py for the webhook path.
+# Each one runs the sync crud function on the AsyncSession's underlying Session
+# via run_sync, so the queries themselves go through the async driver while the
+# query logic lives in one place.
+# get_user_id / get_account_id go through the identity cache first; create_user and
+# create_account write the new row's id through to it.
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import crud
+from app.services.identity_cache import get_identity_cache
+
+
+async def create_user(db: AsyncSession, telegram_id: int, name: str):
+    user = await db.run_sync(crud.create_user, telegram_id, name)
+    await get_identity_cache().set_user(str(telegram_id), user.id)
+    return user
+
+async def get_user(db: AsyncSession, telegram_id: int):
+    return await db.run_sync(crud.get_user, telegram_id)
+
+async def get_user_id(db: AsyncSession, telegram_id: int):
+    cache = get_identity_cache()
+    user_id = await cache.get_user(str(telegram_id))
+    if user_id is None:
+        user = await get_user(db, telegram_id)
+        if not user:
+            return None
+        user_id = user.id
+        await cache.set_user(str(telegram_id), user_id)
+    return user_id
+
+async def create_account(db: AsyncSession, user_id: int, account_name: str, initial_balance_paise: int):
+    account = await db.run_sync(crud.create_account, user_id, account_name, initial_balance_paise)
+    await get_identity_cache().set_account(user_id, account.name, account.id)
+    return account
+
+async def get_account_by_name(db: AsyncSession, user_id: int, account_name: str):
+    account = await db.run_sync(crud.get_account_by_name, user_id, account_name)
+    if account:
+        await get_identity_cache().set_account(user_id, account.name, account.id)
+    return account
+
+async def get_account_id(db: AsyncSession, user_id: int, account_name: str):
+    account_id = await get_identity_cache().get_account(user_id, account_name)
+    if account_id is None:
+        account = await get_account_by_name(db, user_id, account_name)
+        account_id = account.id if account else None
+    return account_id
+
+async def add_transaction(db: AsyncSession, account_id: int, amount_paise: int, description: str, type: str, date: datetime = None, source: dict = None):
+    return await db.run_sync(crud.add_transaction, account_id, amount_paise, description, type, date, source)
+
+async def add_transactions(db: AsyncSession, entries, sources=None):
+    return await db.run_sync(crud.add_transactions, entries, sources)
+
+async def add_transfer(db: AsyncSession, from_account_id: int, to_account_id: int, amount_paise: int, description: str, date: datetime = None, source: dict = None):
+    return await db.run_sync(crud.add_transfer, from_account_id, to_account_id, amount_paise, description, date, source)
+
+async def set_balance(db: AsyncSession, account_id: int, balance_paise: int, description: str = "Balance correction", source: dict = None):
+    return await db.run_sync(crud.set_balance, account_id, balance_paise, description, source)
+
+async def get_all_balances(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.get_all_balances, user_id)
+
+async def delete_last_transaction(db: AsyncSession, account_id: int):
+    return await db.run_sync(crud.delete_last_transaction, account_id)
+
+async def update_last_transaction(
+    db: AsyncSession, account_id: int, new_amount_paise: int, new_description: str = None,
+    new_type: str = None, new_date: datetime = None
+):
+    return await db.run_sync(crud.update_last_transaction, account_id, new_amount_paise, new_description, new_type, new_date)
+
+async def get_message_transactions(db: AsyncSession, user_id: int, chat_id: int, message_id: int):
+    return await db.run_sync(crud.get_message_transactions, user_id, chat_id, message_id)
+
+async def edit_transactions(db: AsyncSession, changes: dict):
+    return await db.run_sync(crud.edit_transactions, changes)
+
+async def delete_transactions(db: AsyncSession, transaction_ids):
+    return await db.run_sync(crud.delete_transactions, transaction_ids)
+
+async def get_transactions_page(db: AsyncSession, user_id: int, account_id: int, limit: int, anchor_id: int = None, newer: bool = False):
+    return await db.run_sync(crud.get_transactions_page, user_id, account_id, limit, anchor_id, newer)
+
+async def get_transactions_by_account(db: AsyncSession, account_id: int, start_date: str = None, end_date: str = None):
+    return await db.run_sync(crud.get_transactions_by_account, account_id, start_date, end_date)
+
+async def get_report_totals(db: AsyncSession, user_id: int, start_date: str = None, end_date: str = None):
+    return await db.run_sync(crud.get_report_totals, user_id, start_date, end_date)
+
+async def get_category_totals(db: AsyncSession, user_id: int, start_date: str = None, end_date: str = None):
+    return await db.run_sync(crud.get_category_totals, user_id, start_date, end_date)
+
+async def get_daily_totals(db: AsyncSession, user_id: int, start: datetime, end: datetime):
+    return await db.run_sync(crud.get_daily_totals, user_id, start, end)
+
+async def get_net_since(db: AsyncSession, user_id: int, start: datetime):
+    return await db.run_sync(crud.get_net_since, user_id, start)
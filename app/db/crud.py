@@ -1,119 +1,483 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, case, cast, select, insert, update, delete, and_, or_, tuple_, literal, Date, Integer
+from sqlalchemy.orm import Session, joinedload
 from app.db import models
-from datetime import datetime, timedelta
+from app.nlp.categories import categorize, DEFAULT_CATEGORY
+from datetime import datetime, date, time, timedelta
+import heapq
+import itertools
+import json
+import os
+import uuid
+import zlib
+from collections import Counter, namedtuple
 from dateutil import parser
 import pytz
+from app.services.metrics import DB_SECONDS
+from app.services.tracing import timed_calls
+from app.db.profiler import profiled
 
 india_tz = pytz.timezone("Asia/Kolkata")
 
+def _timed(fn):
+    return profiled(timed_calls(DB_SECONDS, "db")(fn))
+
+@_timed
 def create_user(db: Session, telegram_id: int, name: str):
     user = models.User(telegram_id=telegram_id, name=name)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.commit()  # the INSERT returns the id; no refresh needed
     return user
 
+@_timed
 def get_user(db: Session, telegram_id: int):
     return db.query(models.User).filter(models.User.telegram_id == telegram_id).first()
 
-def create_account(db: Session, user_id: int, account_name: str, initial_balance: float):
-    account = models.Account(user_id=user_id, name=account_name.upper(), balance=initial_balance)
+@_timed
+def create_account(db: Session, user_id: int, account_name: str, initial_balance_paise: int):
+    account = models.Account(
+        user_id=user_id, name=account_name.upper(),
+        initial_balance_paise=initial_balance_paise, balance_paise=initial_balance_paise
+    )
     db.add(account)
     db.commit()
-    db.refresh(account)
     return account
 
+@_timed
 def get_account_by_name(db: Session, user_id: int, account_name: str):
     return db.query(models.Account).filter(
         models.Account.user_id == user_id,
-        models.Account.name.ilike(account_name)
+        func.upper(models.Account.name) == account_name.upper()
     ).first()
 
-def add_transaction(db: Session, account_id: int, amount: float, description: str, type: str, date: datetime = None):
+def _signed(type: str, amount_paise: int) -> int:
+    if type == 'expense':
+        return -amount_paise
+    if type == 'income':
+        return amount_paise
+    return 0
+
+def _apply_delta(db: Session, account_id: int, delta_paise: int):
+    """balance += delta as one UPDATE ... RETURNING; the row stays locked until the commit."""
+    return db.execute(
+        update(models.Account)
+        .where(models.Account.id == account_id)
+        .values(balance_paise=models.Account.balance_paise + delta_paise)
+        .returning(models.Account.user_id, models.Account.balance_paise)
+    ).one()
+
+TRANSFER_CATEGORY = "Transfer"
+ADJUSTMENT_CATEGORY = "Adjustment"  # balance corrections: counted in reports, never summed
+
+def local_day(when: datetime) -> date:
+    """The Asia/Kolkata calendar day of a stored or given datetime."""
+    # Postgres hands back aware datetimes; SQLite keeps the Asia/Kolkata wall time it was given.
+    if not when.tzinfo or getattr(when.tzinfo, "zone", None) == india_tz.zone:
+        return when.date()
+    return when.astimezone(india_tz).date()
+
+EPOCH_DAY = date(1970, 1, 1)
+
+def _day_number(db: Session, column):
+    """
+    SQL for a Date column, or the Asia/Kolkata date of a DateTime one (the day local_day
+    gives), as days since EPOCH_DAY.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        # Dates, and the wall times SQLite keeps, read by %s as if they were UTC.
+        return cast(func.strftime("%s", column), Integer) // 86400
+    if not isinstance(column.type, Date):
+        column = cast(func.timezone(india_tz.zone, column), Date)
+    return column - EPOCH_DAY
+
+def _upsert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+ROLLUP_KEY = ("user_id", "grain", "period_start", "account_id", "type", "category")
+
+def _add_rollups(db: Session, totals: dict):
+    """Add {ROLLUP_KEY tuple: (total_paise, count)} onto transaction_rollups with one executemany upsert."""
+    totals = {key: change for key, change in totals.items() if change != (0, 0)}
+    if not totals:
+        return
+    rollup = models.TransactionRollup
+    stmt = _upsert(db)(rollup.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[c.name for c in rollup.__table__.primary_key],
+        set_={"total_paise": rollup.total_paise + stmt.excluded.total_paise, "count": rollup.count + stmt.excluded.count},
+    )
+    db.execute(stmt, [dict(zip(ROLLUP_KEY, key), total_paise=total, count=count) for key, (total, count) in totals.items()])
+
+def _rollup_keys(user_id: int, account_id: int, type, category: str, day: date):
+    type = models.TransactionType(type)
+    return (user_id, "day", day, account_id, type, category), (user_id, "month", day.replace(day=1), account_id, type, category)
+
+def _rollup_delta(totals: dict, txn: models.Transaction, sign: int) -> dict:
+    """Add (sign=1) or remove (sign=-1) txn's day and month rows in totals, to be written with _add_rollups."""
+    for key in _rollup_keys(txn.user_id, txn.account_id, txn.type, txn.category, local_day(txn.date)):
+        total, count = totals.get(key, (0, 0))
+        totals[key] = (total + sign * txn.amount_paise, count + sign)
+    return totals
+
+def _as_datetime(value) -> datetime:
+    """Transaction time from a datetime, an ISO string such as the parser's "YYYY-MM-DD", or None for now."""
+    if not value:
+        return datetime.now(india_tz)
+    if isinstance(value, str):
+        value = parser.isoparse(value)
+    return value if value.tzinfo else india_tz.localize(value)
+
+def _insert_transaction(db: Session, account_id: int, user_id: int, amount_paise: int, description: str, type: str, date: datetime = None, transfer_id: str = None, totals: dict = None, source: dict = None):
+    """
+    Add the transaction; its rollup change is written now, or collected in totals for the caller to write.
+    source has the chat_id, message_id, message_item and source_text of the message it came from.
+    """
     transaction = models.Transaction(
         account_id=account_id,
-        amount=amount,
+        user_id=user_id,
+        amount_paise=amount_paise,
         description=description,
-        type=type,
-        date=date if date else datetime.now(india_tz)
+        type=models.TransactionType(type),
+        date=_as_datetime(date),
+        transfer_id=transfer_id,
+        category=TRANSFER_CATEGORY if transfer_id else categorize(description),
+        **(source or {}),
     )
     db.add(transaction)
+    if totals is None:
+        _add_rollups(db, _rollup_delta({}, transaction, 1))
+    else:
+        _rollup_delta(totals, transaction, 1)
+    return transaction
 
-    # Update balance
-    account = db.query(models.Account).filter(models.Account.id == account_id).first()
-    if type == 'expense':
-        account.balance -= amount
-    elif type == 'income':
-        account.balance += amount
+@_timed
+def add_transaction(db: Session, account_id: int, amount_paise: int, description: str, type: str, date: datetime = None, source: dict = None):
+    account = _apply_delta(db, account_id, _signed(type, amount_paise))
+    transaction = _insert_transaction(db, account_id, account.user_id, amount_paise, description, type, date, source=source)
+    db.commit()
+    return transaction
 
+@_timed
+def add_transactions(db: Session, entries, sources=None):
+    """
+    Record several (account_id, amount_paise, description, type, date) income/expenses in
+    one commit, with one balance update per account and one rollup upsert for the lot.
+    sources, if given, has a message source (see _insert_transaction) per entry.
+    Returns the transactions in the order given.
+    """
+    deltas = {}
+    for account_id, amount_paise, _, type, _ in entries:
+        deltas[account_id] = deltas.get(account_id, 0) + _signed(type, amount_paise)
+    user_ids = {}
+    # Same lock order as add_transfer.
+    for account_id in sorted(deltas):
+        user_ids[account_id] = _apply_delta(db, account_id, deltas[account_id]).user_id
+
+    transactions, totals = [], {}
+    for (account_id, amount_paise, description, type, date), source in zip(entries, sources or itertools.repeat(None)):
+        transaction = models.Transaction(
+            account_id=account_id,
+            user_id=user_ids[account_id],
+            amount_paise=amount_paise,
+            description=description,
+            type=models.TransactionType(type),
+            date=_as_datetime(date),
+            category=categorize(description),
+            **(source or {}),
+        )
+        transactions.append(transaction)
+        _rollup_delta(totals, transaction, 1)
+    db.add_all(transactions)
+    _add_rollups(db, totals)
+    db.commit()
+    return transactions
+
+@_timed
+def add_transfer(db: Session, from_account_id: int, to_account_id: int, amount_paise: int, description: str, date: datetime = None, source: dict = None):
+    """
+    Both legs of a transfer in one commit, linked by a shared transfer_id. Returns (expense, income).
+    With a message source the legs are its items 0 (from) and 1 (to).
+    """
+    transfer_id = uuid.uuid4().hex
+    date = _as_datetime(date)
+    legs = {from_account_id: ("expense", -amount_paise), to_account_id: ("income", amount_paise)}
+    user_ids = {}
+    # Lock accounts in id order so two opposite transfers can't deadlock each other.
+    for account_id in sorted(legs):
+        user_ids[account_id] = _apply_delta(db, account_id, legs[account_id][1]).user_id
+    totals = {}
+    legs = [{**source, "message_item": item} for item in (0, 1)] if source else [None, None]
+    expense = _insert_transaction(db, from_account_id, user_ids[from_account_id], amount_paise, description, "expense", date, transfer_id, totals, legs[0])
+    income = _insert_transaction(db, to_account_id, user_ids[to_account_id], amount_paise, description, "income", date, transfer_id, totals, legs[1])
+    _add_rollups(db, totals)
+    db.commit()
+    return expense, income
+
+@_timed
+def set_balance(db: Session, account_id: int, balance_paise: int, description: str = "Balance correction", source: dict = None):
+    """Record the income/expense that brings the account to balance_paise."""
+    current = db.execute(
+        select(models.Account.balance_paise).where(models.Account.id == account_id).with_for_update()
+    ).scalar_one()
+    diff = balance_paise - current
+    type = "income" if diff > 0 else "expense"
+    account = _apply_delta(db, account_id, diff)
+    transaction = _insert_transaction(db, account_id, account.user_id, abs(diff), description, type, source=source)
     db.commit()
-    db.refresh(transaction)
     return transaction
 
+def _existing_keys(db: Session, account_id: int, first_day: date, last_day: date, max_id: int) -> Counter:
+    txn = models.Transaction
+    rows = db.execute(
+        select(txn.date, txn.amount_paise, txn.type, txn.description)
+        .where(txn.account_id == account_id, txn.date >= _day_start(first_day),
+               txn.date < _day_start(last_day + timedelta(days=1)), txn.id <= max_id)
+    )
+    return Counter((local_day(d), amount, type.value, description) for d, amount, type, description in rows)
+
+@_timed
+def import_transactions(db: Session, account_id: int, rows, chunk_size: int = 5000, on_progress=None) -> dict:
+    """
+    Bulk-insert (date, description, type, amount_paise) rows into one account as a single
+    database transaction: executemany inserts and rollup upserts per chunk, and the balance
+    moved once at the end. A row matching a transaction that was already there (same local
+    day, amount, type and description) is skipped, so importing a statement twice is a no-op.
+    on_progress(processed, inserted, duplicates) is called after each chunk.
+    """
+    txn = models.Transaction
+    user_id = db.execute(select(models.Account.user_id).where(models.Account.id == account_id)).scalar_one()
+    # Rows inserted by this import must not count as duplicates of later rows.
+    max_id = db.execute(select(func.max(txn.id))).scalar() or 0
+    existing, loaded_days = Counter(), set()
+    processed = inserted = duplicates = net = 0
+
+    chunk = []
+    for row in itertools.chain(rows, [None]):
+        if row is not None:
+            chunk.append(row)
+            if len(chunk) < chunk_size:
+                continue
+        if not chunk:
+            break
+
+        days = {local_day(when) for when, *_ in chunk} - loaded_days
+        if days:
+            for key, count in _existing_keys(db, account_id, min(days), max(days), max_id).items():
+                if key[0] in days:
+                    existing[key] += count
+            loaded_days |= days
+
+        values, totals = [], {}
+        for when, description, type, amount_paise in chunk:
+            day = local_day(when)
+            key = (day, amount_paise, type, description)
+            if existing[key] > 0:
+                existing[key] -= 1
+                duplicates += 1
+                continue
+            category = categorize(description)
+            values.append({
+                "account_id": account_id, "user_id": user_id, "amount_paise": amount_paise, "description": description,
+                "type": models.TransactionType(type), "date": when, "category": category,
+            })
+            for rollup_key in _rollup_keys(user_id, account_id, type, category, day):
+                total, count = totals.get(rollup_key, (0, 0))
+                totals[rollup_key] = (total + amount_paise, count + 1)
+            net += _signed(type, amount_paise)
+        if values:
+            db.execute(insert(txn.__table__), values)
+            _add_rollups(db, totals)
+
+        processed += len(chunk)
+        inserted += len(values)
+        chunk = []
+        if on_progress:
+            on_progress(processed, inserted, duplicates)
+
+    if net:
+        _apply_delta(db, account_id, net)
+    db.commit()
+    return {"processed": processed, "inserted": inserted, "duplicates": duplicates, "net_paise": net}
+
+@_timed
 def get_all_balances(db: Session, user_id: int):
     return db.query(models.Account).filter(models.Account.user_id == user_id).all()
 
-def delete_last_transaction(db: Session, account_id: int):
-    txn = db.query(models.Transaction).filter(
+def _last_transaction_id(account_id: int):
+    return select(models.Transaction.id).where(
         models.Transaction.account_id == account_id
-    ).order_by(models.Transaction.date.desc()).first()
+    ).order_by(models.Transaction.date.desc(), models.Transaction.id.desc()).limit(1).scalar_subquery()
+
+@_timed
+def delete_last_transaction(db: Session, account_id: int):
+    """Delete the latest transaction (both legs if it was a transfer) and reverse its effect on balances."""
+    txn = db.scalars(
+        delete(models.Transaction)
+        .where(models.Transaction.id == _last_transaction_id(account_id))
+        .returning(models.Transaction)
+    ).first()
+    if not txn:
+        db.rollback()
+        return None
+
+    _reverse_deleted(db, [txn])
+    db.commit()
+    return txn
 
-    if txn:
-        # Reverse balance
-        account = db.query(models.Account).filter(models.Account.id == account_id).first()
-        if txn.type == 'expense':
-            account.balance += txn.amount
-        elif txn.type == 'income':
-            account.balance -= txn.amount
+def _reverse_deleted(db: Session, deleted: list):
+    """Delete the other legs of any transfers among the deleted rows, then take all of them off balances and rollups."""
+    legs = list(deleted)
+    transfer_ids = {txn.transfer_id for txn in deleted if txn.transfer_id}
+    if transfer_ids:
+        legs += db.scalars(
+            delete(models.Transaction)
+            .where(models.Transaction.transfer_id.in_(transfer_ids))
+            .returning(models.Transaction)
+        ).all()
+    totals, deltas = {}, Counter()
+    for leg in legs:
+        deltas[leg.account_id] -= _signed(leg.type, leg.amount_paise)
+        _rollup_delta(totals, leg, -1)
+    for account_id in sorted(deltas):
+        if deltas[account_id]:
+            _apply_delta(db, account_id, deltas[account_id])
+    _add_rollups(db, totals)
+    return legs
 
-        db.delete(txn)
-        db.commit()
-        return txn
-    return None
+def _rewrite(db: Session, legs: list, edit):
+    """Apply edit(leg) to each locked leg, then move balances and rollups by the difference."""
+    totals, deltas = {}, Counter()
+    for leg in legs:
+        deltas[leg.account_id] -= _signed(leg.type, leg.amount_paise)
+        _rollup_delta(totals, leg, -1)
+        edit(leg)
+        deltas[leg.account_id] += _signed(leg.type, leg.amount_paise)
+        _rollup_delta(totals, leg, 1)
+    _add_rollups(db, totals)
+    # Same lock order as add_transfer.
+    for account_id in sorted(deltas):
+        if deltas[account_id]:
+            _apply_delta(db, account_id, deltas[account_id])
 
+@_timed
 def update_last_transaction(
-    db: Session, account_id: int, new_amount: float, new_description: str = None,
+    db: Session, account_id: int, new_amount_paise: int, new_description: str = None,
     new_type: str = None, new_date: datetime = None
 ):
-    txn = db.query(models.Transaction).filter(
-        models.Transaction.account_id == account_id
-    ).order_by(models.Transaction.date.desc()).first()
-
+    """
+    Edit the latest transaction and adjust the balance by the difference. Amount,
+    description and date changes apply to both legs of a transfer; its type can't change.
+    """
+    txn = db.scalars(
+        select(models.Transaction).where(models.Transaction.id == _last_transaction_id(account_id)).with_for_update()
+    ).first()
     if not txn:
+        db.rollback()
         return None
 
-    account = db.query(models.Account).filter(models.Account.id == account_id).first()
+    legs = [txn]
+    if txn.transfer_id:
+        legs += db.scalars(
+            select(models.Transaction).where(
+                models.Transaction.transfer_id == txn.transfer_id, models.Transaction.id != txn.id
+            ).with_for_update()
+        ).all()
+
+    def edit(leg):
+        leg.amount_paise = new_amount_paise or leg.amount_paise
+        leg.description = new_description or leg.description
+        leg.date = new_date or leg.date
+        if not leg.transfer_id:
+            leg.type = models.TransactionType(new_type or leg.type)
+            leg.category = categorize(leg.description)
+
+    _rewrite(db, legs, edit)
+    db.commit()
+    return txn
+
+@_timed
+def get_message_transactions(db: Session, user_id: int, chat_id: int, message_id: int):
+    """The transactions recorded from one Telegram message, in message_item order, with their accounts."""
+    txn = models.Transaction
+    return db.scalars(
+        select(txn).options(joinedload(txn.account, innerjoin=True))
+        .where(txn.chat_id == chat_id, txn.message_id == message_id, txn.user_id == user_id)
+        .order_by(txn.message_item)
+    ).all()
 
-    # Reverse old transaction impact
-    if txn.type == 'expense':
-        account.balance += txn.amount
-    elif txn.type == 'income':
-        account.balance -= txn.amount
+TRANSFER_EDITABLE = ("amount_paise", "description", "date", "source_text")
 
-    # Apply new values
-    txn.amount = new_amount or txn.amount
-    txn.description = new_description or txn.description
-    txn.type = new_type or txn.type
-    txn.date = new_date or txn.date
+@_timed
+def edit_transactions(db: Session, changes: dict):
+    """
+    Apply {transaction id: {column: value}} edits to amount_paise, description, type, date,
+    account_id and source_text in one commit, moving balances and rollups by the difference.
+    Amount, description and date edits carry over to the other leg of a transfer; its type
+    and accounts don't change. Returns the edited transactions.
+    """
+    txn = models.Transaction
+    rows = db.scalars(select(txn).where(txn.id.in_(changes)).with_for_update()).all()
+    transfer_ids = {row.transfer_id for row in rows if row.transfer_id}
+    legs = list(rows)
+    if transfer_ids:
+        others = db.scalars(select(txn).where(txn.transfer_id.in_(transfer_ids)).with_for_update()).all()
+        legs += [leg for leg in others if leg.id not in changes]
+    by_transfer = {
+        row.transfer_id: {k: v for k, v in changes[row.id].items() if k in TRANSFER_EDITABLE}
+        for row in rows if row.transfer_id
+    }
 
-    # Apply new impact
-    if txn.type == 'expense':
-        account.balance -= txn.amount
-    elif txn.type == 'income':
-        account.balance += txn.amount
+    def edit(leg):
+        fields = by_transfer[leg.transfer_id] if leg.transfer_id else changes[leg.id]
+        for column, value in fields.items():
+            if column == "type":
+                value = models.TransactionType(value)
+            elif column == "date":
+                value = _as_datetime(value)
+            setattr(leg, column, value)
+        if "description" in fields and not leg.transfer_id:
+            leg.category = categorize(leg.description)
 
+    _rewrite(db, legs, edit)
     db.commit()
-    db.refresh(txn)
-    return txn
+    return rows
 
-def get_recent_transactions(db: Session, account_id: int, limit: int = 5):
-    return db.query(models.Transaction).filter(
-        models.Transaction.account_id == account_id
-    ).order_by(models.Transaction.date.desc()).limit(limit).all()
+@_timed
+def delete_transactions(db: Session, transaction_ids):
+    """Delete transactions, both legs of any transfer among them, reversing their balances and rollups in one commit."""
+    deleted = db.scalars(
+        delete(models.Transaction).where(models.Transaction.id.in_(list(transaction_ids))).returning(models.Transaction)
+    ).all()
+    legs = _reverse_deleted(db, deleted)
+    db.commit()
+    return legs
 
-def get_transactions_by_account(db: Session, account_id: int, start_date: str = None, end_date: str = None):
-    query = db.query(models.Transaction).filter(models.Transaction.account_id == account_id)
+@_timed
+def get_transactions_page(db: Session, user_id: int, account_id: int, limit: int, anchor_id: int = None, newer: bool = False):
+    """
+    One page of an account's transactions, newest first, keyset-paginated on (date, id):
+    the newest page, or the page just older (newer=True: newer) than transaction anchor_id.
+    One index range scan however deep the page. Returns (transactions, more), more saying
+    whether there is another page beyond this one in the same direction.
+    """
+    txn = models.Transaction
+    query = select(txn).options(joinedload(txn.account, innerjoin=True)).where(
+        txn.account_id == account_id, txn.user_id == user_id
+    )
+    if anchor_id is not None:
+        anchor_date = select(txn.date).where(txn.id == anchor_id, txn.account_id == account_id).scalar_subquery()
+        key, anchor = tuple_(txn.date, txn.id), tuple_(anchor_date, literal(anchor_id))
+        query = query.where(key > anchor if newer else key < anchor)
+    order = (txn.date.asc(), txn.id.asc()) if newer else (txn.date.desc(), txn.id.desc())
+    rows = db.scalars(query.order_by(*order).limit(limit + 1)).all()
+    page = rows[:limit]
+    return (page[::-1] if newer else page), len(rows) > limit
 
+def date_range(start_date: str = None, end_date: str = None):
+    """ISO strings to Asia/Kolkata datetimes; the last 30 days when they're missing."""
     if start_date:
         start_date = parser.isoparse(start_date).astimezone(india_tz)
     else:
@@ -124,8 +488,258 @@ def get_transactions_by_account(db: Session, account_id: int, start_date: str =
         end_date = parser.isoparse(end_date).astimezone(india_tz)
     else:
         end_date = datetime.now(india_tz)
+    return start_date, end_date
+
+@_timed
+def get_transactions_by_account(db: Session, account_id: int, start_date: str = None, end_date: str = None):
+    query = db.query(models.Transaction).filter(models.Transaction.account_id == account_id)
 
+    start_date, end_date = date_range(start_date, end_date)
     query = query.filter(models.Transaction.date >= start_date)
     query = query.filter(models.Transaction.date <= end_date)
 
-    return query.order_by(models.Transaction.date.desc()).all()
\ No newline at end of file
+    return query.order_by(models.Transaction.date.desc()).all()
+
+def _day_start(day: date) -> datetime:
+    return india_tz.localize(datetime.combine(day, time.min))
+
+def _split_range(start: datetime, end: datetime):
+    """
+    Cover [start, end] with whole months, whole days and the partial days at either end.
+    Returns (months, days, edges): (first, last) month starts, (first, last) day ranges,
+    and (from, to, to_inclusive) datetime ranges that have to be read from transactions.
+    """
+    start, end = start.astimezone(india_tz), end.astimezone(india_tz)
+    first_day = start.date() if start.time() == time.min else start.date() + timedelta(days=1)
+    last_day = end.date() if end.time() >= time(23, 59, 59) else end.date() - timedelta(days=1)
+    if first_day > last_day:
+        return None, [], [(start, end, True)]
+
+    edges = []
+    if start < _day_start(first_day):
+        edges.append((start, _day_start(first_day), False))
+    if end >= _day_start(last_day + timedelta(days=1)):
+        edges.append((_day_start(last_day + timedelta(days=1)), end, True))
+
+    first_month = first_day if first_day.day == 1 else (first_day.replace(day=1) + timedelta(days=32)).replace(day=1)
+    after_last = last_day + timedelta(days=1)
+    last_month = after_last.replace(day=1) - timedelta(days=1)  # last day of the last whole month
+    if first_month > last_month:
+        return None, [(first_day, last_day)], edges
+
+    days = []
+    if first_day < first_month:
+        days.append((first_day, first_month - timedelta(days=1)))
+    if last_month < last_day:
+        days.append((last_month + timedelta(days=1), last_day))
+    return (first_month, last_month.replace(day=1)), days, edges
+
+@_timed
+def get_rollup_totals(db: Session, user_id: int, start_date: str = None, end_date: str = None, keys=("account_id", "type")):
+    """
+    Sums in paise for a user over a date range, grouped by keys (any of account_id, type,
+    category), read from transaction_rollups: one row per month and per leftover day,
+    plus the raw transactions of partial days at the ends. Balance corrections are
+    counted but not summed.
+    """
+    start_date, end_date = date_range(start_date, end_date)
+    months, days, edges = _split_range(start_date, end_date)
+    rollup, txn = models.TransactionRollup, models.Transaction
+    totals = {}
+
+    def add(rows):
+        for row in rows:
+            key = tuple(getattr(row, k) for k in keys)
+            total, count = totals.get(key, (0, 0))
+            totals[key] = (total + row.total_paise, count + row.count)
+
+    periods = []
+    if months:
+        periods.append(and_(rollup.grain == "month", rollup.period_start.between(*months)))
+    for first, last in days:
+        periods.append(and_(rollup.grain == "day", rollup.period_start.between(first, last)))
+    if periods:
+        counted = rollup.category != ADJUSTMENT_CATEGORY
+        add(db.query(
+            *[getattr(rollup, k) for k in keys],
+            func.coalesce(func.sum(case((counted, rollup.total_paise), else_=0)), 0).label("total_paise"),
+            func.coalesce(func.sum(rollup.count), 0).label("count"),
+        ).filter(rollup.user_id == user_id, or_(*periods)).group_by(*[getattr(rollup, k) for k in keys]))
+
+    for lo, hi, hi_inclusive in edges:
+        counted = txn.category != ADJUSTMENT_CATEGORY
+        add(db.query(
+            *[getattr(txn, k) for k in keys],
+            func.coalesce(func.sum(case((counted, txn.amount_paise), else_=0)), 0).label("total_paise"),
+            func.count(txn.id).label("count"),
+        ).filter(
+            txn.user_id == user_id, txn.date >= lo, txn.date <= hi if hi_inclusive else txn.date < hi,
+        ).group_by(*[getattr(txn, k) for k in keys]))
+
+    Row = namedtuple("RollupTotal", keys + ("total_paise", "count"))
+    return [Row(*key, total, count) for key, (total, count) in totals.items() if count]
+
+@_timed
+def get_report_totals(db: Session, user_id: int, start_date: str = None, end_date: str = None):
+    """Per-account, per-type sums in paise for a report. Balance corrections are counted but not summed."""
+    return get_rollup_totals(db, user_id, start_date, end_date, ("account_id", "type"))
+
+@_timed
+def get_category_totals(db: Session, user_id: int, start_date: str = None, end_date: str = None):
+    return get_rollup_totals(db, user_id, start_date, end_date, ("type", "category"))
+
+@_timed
+def get_daily_totals(db: Session, user_id: int, start: datetime, end: datetime):
+    """
+    (day, account_id, income, category, total_paise, count) for each day, account, type and
+    category a user has transactions in [start, end], worked out in SQL as plain ints and
+    strings: day is the local date as days since EPOCH_DAY, income is 1 or 0. Whole days are
+    read from the daily rollups, the partial days at either end from transactions (and the
+    archive). Balance corrections are summed too; a day can have several rows for one key.
+    """
+    rollup, txn = models.TransactionRollup, models.Transaction
+    months, days, edges = _split_range(start, end)
+    if months:
+        days = days + [(months[0], _add_months(months[1], 1) - timedelta(days=1))]
+    rows = []
+    if days:
+        rows = db.execute(
+            select(
+                _day_number(db, rollup.period_start),
+                rollup.account_id,
+                case((rollup.type == models.TransactionType.INCOME, 1), else_=0),
+                rollup.category,
+                rollup.total_paise,
+                rollup.count,
+            ).where(
+                rollup.user_id == user_id, rollup.grain == "day",
+                or_(*(rollup.period_start.between(first, last) for first, last in days)),
+            )
+        ).all()
+    if edges:
+        day = _day_number(db, txn.date)
+        income = case((txn.type == models.TransactionType.INCOME, 1), else_=0)
+        category = func.coalesce(txn.category, DEFAULT_CATEGORY)
+        rows += db.execute(
+            select(day, txn.account_id, income, category, func.sum(txn.amount_paise), func.count(txn.id))
+            .where(txn.user_id == user_id, or_(*(
+                and_(txn.date >= lo, txn.date <= hi if hi_inclusive else txn.date < hi) for lo, hi, hi_inclusive in edges
+            )))
+            .group_by(day, txn.account_id, income, category)
+        ).all()
+        for lo, hi, hi_inclusive in edges:
+            for r in _archived(db, user_id, lo, hi):
+                if hi_inclusive or _as_datetime(r.date) < hi:
+                    day = (local_day(r.date) - EPOCH_DAY).days
+                    rows.append((day, r.account_id, int(r.type == "income"), r.category or DEFAULT_CATEGORY, r.amount_paise, 1))
+    return rows
+
+@_timed
+def get_net_since(db: Session, user_id: int, start: datetime):
+    """account_id -> net change in paise from start onwards; current balance minus this is the opening balance."""
+    txn = models.Transaction
+    signed = case((txn.type == models.TransactionType.INCOME, txn.amount_paise), else_=-txn.amount_paise)
+    rows = db.query(txn.account_id, func.sum(signed)).filter(txn.user_id == user_id, txn.date >= start).group_by(txn.account_id)
+    net = {account_id: int(net) for account_id, net in rows}
+    for row in _archived(db, user_id, start):
+        net[row.account_id] = net.get(row.account_id, 0) + _signed(row.type, row.amount_paise)
+    return net
+
+def iter_user_transactions(db: Session, user_id: int, start_date: str = None, end_date: str = None, by_account: bool = False, batch_size: int = 1000):
+    """
+    Stream a user's transactions across all accounts, oldest first, as lightweight rows
+    (account_name, date, amount_paise, type, description, account_id, id, category), archived
+    months included. With by_account=True rows are grouped by account name, then date.
+    """
+    start_date, end_date = date_range(start_date, end_date)
+    query = db.query(
+        models.Account.name.label("account_name"),
+        models.Transaction.date,
+        models.Transaction.amount_paise,
+        models.Transaction.type,
+        models.Transaction.description,
+        models.Account.id.label("account_id"),
+        models.Transaction.id,
+        models.Transaction.category,
+    ).join(models.Account, models.Account.id == models.Transaction.account_id).filter(
+        models.Account.user_id == user_id,
+        models.Transaction.date >= start_date,
+        models.Transaction.date <= end_date,
+    )
+    order = [models.Transaction.date, models.Transaction.id]
+    if by_account:
+        order = [models.Account.name, models.Account.id] + order
+    rows = query.order_by(*order).yield_per(batch_size)
+
+    archived = _archived(db, user_id, start_date, end_date)
+    if not archived:
+        return rows
+    names = dict(db.execute(select(models.Account.id, models.Account.name).where(models.Account.user_id == user_id)).all())
+
+    def key(row):
+        when = (_as_datetime(row.date), row.id)
+        return (row.account_name, row.account_id) + when if by_account else when
+
+    archived = sorted(
+        (ExportRow(names[r.account_id], r.date, r.amount_paise, r.type, r.description, r.account_id, r.id, r.category) for r in archived),
+        key=key,
+    )
+    return heapq.merge(archived, rows, key=key)
+
+# When set, whole months older than TRANSACTIONS_HOT_MONTHS are moved to transaction_archive
+# by app/db/partitions.py (0, the default, keeps everything in transactions). The readers above
+# add back whatever is archived for their range, whatever the setting is now: one lookup on the
+# archive's (user_id, month) key, which finds nothing for recent ranges.
+TRANSACTIONS_HOT_MONTHS = int(os.getenv("TRANSACTIONS_HOT_MONTHS", "0"))
+ARCHIVE_COLUMNS = (
+    "id", "account_id", "amount_paise", "description", "type", "date",
+    "transfer_id", "category", "chat_id", "message_id", "message_item", "source_text",
+)
+ArchivedTransaction = namedtuple("ArchivedTransaction", ARCHIVE_COLUMNS)
+ExportRow = namedtuple("ExportRow", ("account_name", "date", "amount_paise", "type", "description", "account_id", "id", "category"))
+
+def _add_months(month: date, n: int) -> date:
+    months = month.year * 12 + month.month - 1 + n
+    return date(months // 12, months % 12 + 1, 1)
+
+def _archive_horizon(today: date = None) -> date:
+    """The oldest month kept in transactions; the months before it are archived. None when nothing is."""
+    if TRANSACTIONS_HOT_MONTHS <= 0:
+        return None
+    today = today or datetime.now(india_tz).date()
+    return _add_months(today.replace(day=1), -TRANSACTIONS_HOT_MONTHS)
+
+def _pack_archive(rows) -> bytes:
+    """Transactions as zlib-compressed JSON, dates as Asia/Kolkata ISO strings."""
+    values = []
+    for row in rows:
+        value = {column: getattr(row, column) for column in ARCHIVE_COLUMNS}
+        value["date"] = _as_datetime(row.date).astimezone(india_tz).isoformat()
+        value["type"] = models.TransactionType(row.type).value
+        values.append([value[column] for column in ARCHIVE_COLUMNS])
+    return zlib.compress(json.dumps(values, separators=(",", ":")).encode(), 9)
+
+def _unpack_archive(payload: bytes, naive: bool = False) -> list:
+    """ArchivedTransactions from _pack_archive; naive gives the Asia/Kolkata wall times SQLite stores."""
+    rows = []
+    for values in json.loads(zlib.decompress(payload)):
+        row = dict(zip(ARCHIVE_COLUMNS, values))
+        when = datetime.fromisoformat(row["date"])
+        row["date"] = when.replace(tzinfo=None) if naive else when
+        row["type"] = models.TransactionType(row["type"])
+        rows.append(ArchivedTransaction(**row))
+    return rows
+
+def _archived(db: Session, user_id: int, start: datetime, end: datetime = None) -> list:
+    """A user's archived transactions in [start, end], oldest first."""
+    archive = models.TransactionArchive
+    months = [archive.month >= local_day(start).replace(day=1)]
+    if end is not None:
+        months.append(archive.month <= local_day(end).replace(day=1))
+    payloads = db.scalars(select(archive.payload).where(archive.user_id == user_id, *months))
+    naive = db.get_bind().dialect.name == "sqlite"
+    rows = [
+        row for payload in payloads for row in _unpack_archive(payload, naive)
+        if _as_datetime(row.date) >= start and (end is None or _as_datetime(row.date) <= end)
+    ]
+    return sorted(rows, key=lambda r: (_as_datetime(r.date), r.id))
@@ -0,0 +1,45 @@
+"""Durable update queue and processed update_id tables
+
+Revision ID: 0002_update_queue_tables
+Revises: 0001_baseline
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_update_queue_tables"
+down_revision: Union[str, Sequence[str], None] = "0001_baseline"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    existing = sa.inspect(op.get_bind()).get_table_names()
+
+    if "pending_updates" not in existing:
+        op.create_table(
+            "pending_updates",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("chat_id", sa.BigInteger(), nullable=True),
+            sa.Column("payload", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        )
+        op.create_index("ix_pending_updates_chat_id", "pending_updates", ["chat_id"])
+
+    if "processed_updates" not in existing:
+        op.create_table(
+            "processed_updates",
+            sa.Column("update_id", sa.BigInteger(), primary_key=True, autoincrement=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        )
+        op.create_index("ix_processed_updates_created_at", "processed_updates", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("processed_updates")
+    op.drop_table("pending_updates")
@@ -0,0 +1,66 @@
+"""Indexes for the crud hot path; one account name per user
+
+Revision ID: 0003_transaction_indexes
+Revises: 0002_update_queue_tables
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_transaction_indexes"
+down_revision: Union[str, Sequence[str], None] = "0002_update_queue_tables"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # transactions.user_id was never filled in; take it from the account.
+    op.execute("""
+        UPDATE transactions SET user_id = (
+            SELECT accounts.user_id FROM accounts WHERE accounts.id = transactions.account_id
+        ) WHERE user_id IS NULL
+    """)
+
+    # Account names are compared case-insensitively, so "Cash" and "CASH" are the same
+    # account. Fold any such duplicates into the oldest one before adding the constraint.
+    op.execute("UPDATE accounts SET name = UPPER(name) WHERE name <> UPPER(name)")
+    op.execute("""
+        UPDATE transactions SET account_id = (
+            SELECT MIN(keep.id) FROM accounts dup
+            JOIN accounts keep ON keep.user_id = dup.user_id AND keep.name = dup.name
+            WHERE dup.id = transactions.account_id
+        ) WHERE account_id IN (
+            SELECT dup.id FROM accounts dup WHERE EXISTS (
+                SELECT 1 FROM accounts keep
+                WHERE keep.user_id = dup.user_id AND keep.name = dup.name AND keep.id < dup.id
+            )
+        )
+    """)
+    op.execute("""
+        UPDATE accounts SET
+            balance = (SELECT SUM(d.balance) FROM accounts d WHERE d.user_id = accounts.user_id AND d.name = accounts.name),
+            initial_balance = (SELECT SUM(d.initial_balance) FROM accounts d WHERE d.user_id = accounts.user_id AND d.name = accounts.name)
+        WHERE id IN (SELECT MIN(id) FROM accounts GROUP BY user_id, name HAVING COUNT(*) > 1)
+    """)
+    op.execute("""
+        DELETE FROM accounts WHERE EXISTS (
+            SELECT 1 FROM accounts keep
+            WHERE keep.user_id = accounts.user_id AND keep.name = accounts.name AND keep.id < accounts.id
+        )
+    """)
+
+    op.create_index("ix_transactions_account_id_date", "transactions", ["account_id", sa.text("date DESC")])
+    op.create_index("ix_transactions_user_id_date", "transactions", ["user_id", "date"])
+    # Serves get_account_by_name (upper(name) = :name) as well as enforcing uniqueness.
+    op.create_index("uq_accounts_user_id_upper_name", "accounts", ["user_id", sa.text("upper(name)")], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("uq_accounts_user_id_upper_name", table_name="accounts")
+    op.drop_index("ix_transactions_user_id_date", table_name="transactions")
+    op.drop_index("ix_transactions_account_id_date", table_name="transactions")
@@ -0,0 +1,68 @@
+"""Store money as BIGINT paise instead of Float rupees
+
+Revision ID: 0004_money_paise
+Revises: 0003_transaction_indexes
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_money_paise"
+down_revision: Union[str, Sequence[str], None] = "0003_transaction_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = {
+    "accounts": ["initial_balance", "balance"],
+    "transactions": ["amount"],
+}
+
+
+def _to_paise(column: str) -> str:
+    if op.get_bind().dialect.name == "postgresql":
+        # Through numeric so 200.455 rounds to 20046 instead of the float's 20045.4999...
+        return f"ROUND(CAST({column} AS NUMERIC) * 100)::BIGINT"
+    return f"CAST(ROUND({column} * 100) AS INTEGER)"
+
+
+def _keeping_expression_indexes(fn):
+    # SQLite batch mode recreates the tables and can't reflect expression or DESC
+    # index columns, so those indexes are put back by hand.
+    def wrapper():
+        op.drop_index("uq_accounts_user_id_upper_name", table_name="accounts")
+        op.drop_index("ix_transactions_account_id_date", table_name="transactions")
+        fn()
+        op.create_index("uq_accounts_user_id_upper_name", "accounts", ["user_id", sa.text("upper(name)")], unique=True)
+        op.create_index("ix_transactions_account_id_date", "transactions", ["account_id", sa.text("date DESC")])
+    return wrapper
+
+
+@_keeping_expression_indexes
+def upgrade() -> None:
+    for table, columns in COLUMNS.items():
+        with op.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.add_column(sa.Column(f"{column}_paise", sa.BigInteger(), nullable=True))
+        for column in columns:
+            op.execute(f"UPDATE {table} SET {column}_paise = {_to_paise(column)} WHERE {column} IS NOT NULL")
+        with op.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.drop_column(column)
+
+
+@_keeping_expression_indexes
+def downgrade() -> None:
+    for table, columns in COLUMNS.items():
+        with op.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.add_column(sa.Column(column, sa.Float(), nullable=True))
+        for column in columns:
+            op.execute(f"UPDATE {table} SET {column} = {column}_paise / 100.0")
+        with op.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.drop_column(f"{column}_paise")
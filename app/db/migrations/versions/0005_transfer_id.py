@@ -0,0 +1,32 @@
+"""Link the two legs of a transfer with transactions.transfer_id
+
+Revision ID: 0005_transfer_id
+Revises: 0004_money_paise
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_transfer_id"
+down_revision: Union[str, Sequence[str], None] = "0004_money_paise"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("transactions", sa.Column("transfer_id", sa.String(32), nullable=True))
+    op.create_index("ix_transactions_transfer_id", "transactions", ["transfer_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_transfer_id", table_name="transactions")
+    op.drop_index("ix_transactions_account_id_date", table_name="transactions")
+    with op.batch_alter_table("transactions") as batch:
+        batch.drop_column("transfer_id")
+    # Batch mode on SQLite doesn't carry the DESC over.
+    op.create_index("ix_transactions_account_id_date", "transactions", ["account_id", sa.text("date DESC")])
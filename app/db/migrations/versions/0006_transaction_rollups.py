@@ -0,0 +1,88 @@
+"""Transaction categories and daily/monthly rollups
+
+Revision ID: 0006_transaction_rollups
+Revises: 0005_transfer_id
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import pytz
+import sqlalchemy as sa
+from app.nlp.categories import categorize
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_transaction_rollups"
+down_revision: Union[str, Sequence[str], None] = "0005_transfer_id"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+transaction_type = sa.Enum("INCOME", "EXPENSE", name="transactiontype", create_type=False)
+india_tz = pytz.timezone("Asia/Kolkata")
+
+
+def upgrade() -> None:
+    op.add_column("transactions", sa.Column("category", sa.String(), nullable=True))
+    rollups = op.create_table(
+        "transaction_rollups",
+        sa.Column("user_id", sa.Integer(), primary_key=True),
+        sa.Column("grain", sa.String(5), primary_key=True),
+        sa.Column("period_start", sa.Date(), primary_key=True),
+        sa.Column("account_id", sa.Integer(), primary_key=True),
+        sa.Column("type", transaction_type, primary_key=True),
+        sa.Column("category", sa.String(), primary_key=True),
+        sa.Column("total_paise", sa.BigInteger(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+
+    conn = op.get_bind()
+    transactions = sa.table(
+        "transactions",
+        sa.column("user_id", sa.Integer()),
+        sa.column("account_id", sa.Integer()),
+        sa.column("date", sa.DateTime(timezone=True)),
+        sa.column("type", transaction_type),
+        sa.column("amount_paise", sa.BigInteger()),
+        sa.column("description", sa.String()),
+        sa.column("category", sa.String()),
+    )
+
+    # Categorise existing rows, one UPDATE per distinct description.
+    descriptions = conn.execute(sa.select(transactions.c.description).distinct()).scalars().all()
+    for description in descriptions:
+        conn.execute(
+            transactions.update()
+            .where(transactions.c.description.is_(None) if description is None else transactions.c.description == description)
+            .values(category=categorize(description))
+        )
+
+    # Fill the rollups from them.
+    totals = {}
+    # On the statement: Connection.execution_options would stream everything alembic runs after it.
+    rows = conn.execute(sa.select(
+        transactions.c.user_id, transactions.c.account_id, transactions.c.date,
+        transactions.c.type, transactions.c.category, transactions.c.amount_paise,
+    ).execution_options(yield_per=5000))
+    for row in rows:
+        day = row.date.astimezone(india_tz).date() if row.date.tzinfo else row.date.date()
+        for grain, period_start in (("day", day), ("month", day.replace(day=1))):
+            key = (row.user_id, grain, period_start, row.account_id, row.type, row.category)
+            total, count = totals.get(key, (0, 0))
+            totals[key] = (total + row.amount_paise, count + 1)
+    values = [
+        dict(zip(("user_id", "grain", "period_start", "account_id", "type", "category"), key), total_paise=total, count=count)
+        for key, (total, count) in totals.items()
+    ]
+    for i in range(0, len(values), 5000):
+        op.bulk_insert(rollups, values[i:i + 5000])
+
+
+def downgrade() -> None:
+    op.drop_table("transaction_rollups")
+    op.drop_index("ix_transactions_account_id_date", table_name="transactions")
+    with op.batch_alter_table("transactions") as batch:
+        batch.drop_column("category")
+    # Batch mode on SQLite doesn't carry the DESC over.
+    op.create_index("ix_transactions_account_id_date", "transactions", ["account_id", sa.text("date DESC")])
@@ -0,0 +1,32 @@
+"""Index transactions on (account_id, date, id) for keyset-paginated history
+
+Revision ID: 0007_transaction_keyset_index
+Revises: 0006_transaction_rollups
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_transaction_keyset_index"
+down_revision: Union[str, Sequence[str], None] = "0006_transaction_rollups"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Replaces (account_id, date DESC): with id in the key a page of history is one range
+    # scan starting at the previous page's last row, and same-instant rows keep an order.
+    op.create_index(
+        "ix_transactions_account_id_date_id", "transactions", ["account_id", sa.text("date DESC"), sa.text("id DESC")]
+    )
+    op.drop_index("ix_transactions_account_id_date", table_name="transactions")
+
+
+def downgrade() -> None:
+    op.create_index("ix_transactions_account_id_date", "transactions", ["account_id", sa.text("date DESC")])
+    op.drop_index("ix_transactions_account_id_date_id", table_name="transactions")
@@ -0,0 +1,41 @@
+"""Record the Telegram message each transaction came from
+
+Revision ID: 0008_transaction_message_source
+Revises: 0007_transaction_keyset_index
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_transaction_message_source"
+down_revision: Union[str, Sequence[str], None] = "0007_transaction_keyset_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows stay NULL: edits of messages sent before this are recorded as new messages.
+    op.add_column("transactions", sa.Column("chat_id", sa.BigInteger(), nullable=True))
+    op.add_column("transactions", sa.Column("message_id", sa.BigInteger(), nullable=True))
+    op.add_column("transactions", sa.Column("message_item", sa.Integer(), nullable=True))
+    op.add_column("transactions", sa.Column("source_text", sa.Text(), nullable=True))
+    op.create_index(
+        "uq_transactions_chat_message_item", "transactions", ["chat_id", "message_id", "message_item"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_transactions_chat_message_item", table_name="transactions")
+    op.drop_index("ix_transactions_account_id_date_id", table_name="transactions")
+    with op.batch_alter_table("transactions") as batch:
+        for column in ("source_text", "message_item", "message_id", "chat_id"):
+            batch.drop_column(column)
+    # Batch mode on SQLite doesn't carry the DESC over.
+    op.create_index(
+        "ix_transactions_account_id_date_id", "transactions", ["account_id", sa.text("date DESC"), sa.text("id DESC")]
+    )
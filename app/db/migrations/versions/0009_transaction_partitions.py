@@ -0,0 +1,124 @@
+"""Partition transactions by month on Postgres; add transaction_archive
+
+Revision ID: 0009_transaction_partitions
+Revises: 0008_transaction_message_source
+Create Date: 2026-10-17
+
+"""
+from datetime import datetime, date, time
+from typing import Sequence, Union
+
+from alembic import op
+import pytz
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009_transaction_partitions"
+down_revision: Union[str, Sequence[str], None] = "0008_transaction_message_source"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    "ix_transactions_id": "id",
+    "ix_transactions_transfer_id": "transfer_id",
+    "ix_transactions_account_id_date_id": "account_id, date DESC, id DESC",
+    "ix_transactions_user_id_date": "user_id, date",
+}
+# A unique index on a partitioned table has to include the partition key.
+UNIQUE = ("uq_transactions_chat_message_item", "chat_id, message_id, message_item")
+
+# Frozen copies of app.db.crud / app.db.partitions helpers as of this revision; app code may change.
+india_tz = pytz.timezone("Asia/Kolkata")
+PARTITIONS_AHEAD = 3
+
+
+def _add_months(month: date, n: int) -> date:
+    months = month.year * 12 + month.month - 1 + n
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def _month_start(month: date) -> str:
+    return india_tz.localize(datetime.combine(month, time.min)).isoformat(sep=" ")
+
+
+def partition_name(month: date) -> str:
+    return f"transactions_y{month.year}m{month.month:02d}"
+
+
+def partition_bounds(month: date) -> str:
+    return f"FOR VALUES FROM ('{_month_start(month)}') TO ('{_month_start(_add_months(month, 1))}')"
+
+
+def upgrade() -> None:
+    op.create_table(
+        "transaction_archive",
+        sa.Column("user_id", sa.Integer(), primary_key=True),
+        sa.Column("month", sa.Date(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+    )
+    op.create_index("ix_transaction_archive_month", "transaction_archive", ["month"])
+    if op.get_bind().dialect.name == "postgresql":
+        _partition()
+
+
+def _partition() -> None:
+    conn = op.get_bind()
+    oldest = conn.execute(sa.text("SELECT min(date) FROM transactions")).scalar()
+    this_month = datetime.now(india_tz).date().replace(day=1)
+    month = min(oldest.astimezone(india_tz).date().replace(day=1), this_month) if oldest else this_month
+
+    op.execute("ALTER TABLE transactions RENAME TO transactions_unpartitioned")
+    op.execute("ALTER TABLE transactions_unpartitioned RENAME CONSTRAINT transactions_pkey TO transactions_unpartitioned_pkey")
+    for name in (*INDEXES, UNIQUE[0]):
+        op.execute(f"DROP INDEX {name}")
+    op.execute("UPDATE transactions_unpartitioned SET date = now() WHERE date IS NULL")
+
+    # Same columns, defaults (the id sequence included) and column order, so SELECT * copies.
+    op.execute("CREATE TABLE transactions (LIKE transactions_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (date)")
+    op.execute("ALTER TABLE transactions ALTER COLUMN date SET NOT NULL")
+    op.execute("ALTER TABLE transactions ADD PRIMARY KEY (id, date)")
+    op.execute("ALTER TABLE transactions ADD FOREIGN KEY (user_id) REFERENCES users (id)")
+    op.execute("ALTER TABLE transactions ADD FOREIGN KEY (account_id) REFERENCES accounts (id)")
+    while month <= _add_months(this_month, PARTITIONS_AHEAD):
+        op.execute(f"CREATE TABLE {partition_name(month)} PARTITION OF transactions {partition_bounds(month)}")
+        month = _add_months(month, 1)
+    op.execute("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+
+    op.execute("INSERT INTO transactions SELECT * FROM transactions_unpartitioned")
+    # Each partition gets its own copy of these, covering only its month.
+    for name, columns in INDEXES.items():
+        op.execute(f"CREATE INDEX {name} ON transactions ({columns})")
+    op.execute(f"CREATE UNIQUE INDEX {UNIQUE[0]} ON transactions ({UNIQUE[1]}, date)")
+    sequence = conn.execute(sa.text("SELECT pg_get_serial_sequence('transactions_unpartitioned', 'id')")).scalar()
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY transactions.id")
+    op.execute("DROP TABLE transactions_unpartitioned")
+    op.execute("ANALYZE transactions")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.execute(sa.text("SELECT 1 FROM transaction_archive LIMIT 1")).first():
+        raise RuntimeError("transaction_archive isn't empty: run python -m app.db.partitions restore --all first")
+    partitioned = conn.dialect.name == "postgresql" and conn.execute(
+        sa.text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('transactions')")
+    ).scalar()
+    if partitioned:
+        op.execute("ALTER TABLE transactions RENAME TO transactions_partitioned")
+        op.execute("ALTER TABLE transactions_partitioned RENAME CONSTRAINT transactions_pkey TO transactions_partitioned_pkey")
+        for name in (*INDEXES, UNIQUE[0]):
+            op.execute(f"DROP INDEX {name}")
+        op.execute("CREATE TABLE transactions (LIKE transactions_partitioned INCLUDING DEFAULTS)")
+        op.execute("ALTER TABLE transactions ADD PRIMARY KEY (id)")
+        op.execute("ALTER TABLE transactions ADD FOREIGN KEY (user_id) REFERENCES users (id)")
+        op.execute("ALTER TABLE transactions ADD FOREIGN KEY (account_id) REFERENCES accounts (id)")
+        op.execute("INSERT INTO transactions SELECT * FROM transactions_partitioned")
+        for name, columns in INDEXES.items():
+            op.execute(f"CREATE INDEX {name} ON transactions ({columns})")
+        op.execute(f"CREATE UNIQUE INDEX {UNIQUE[0]} ON transactions ({UNIQUE[1]})")
+        sequence = conn.execute(sa.text("SELECT pg_get_serial_sequence('transactions_partitioned', 'id')")).scalar()
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY transactions.id")
+        op.execute("DROP TABLE transactions_partitioned")  # and its partitions
+    op.drop_index("ix_transaction_archive_month", table_name="transaction_archive")
+    op.drop_table("transaction_archive")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, func
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Date, DateTime, LargeBinary, ForeignKey, Enum, Index, func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 import enum
@@ -25,26 +25,101 @@ class Account(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)  # Example: HDFC, SBI, Cash
-    initial_balance = Column(Float, default=0.0)
-    balance = Column(Float, default=0.0)
+    # Money columns hold integer paise; see app/utils/money.py.
+    initial_balance_paise = Column(BigInteger, default=0)
+    balance_paise = Column(BigInteger, default=0)
 
     user_id = Column(Integer, ForeignKey("users.id"))
     user = relationship("User", back_populates="accounts")
 
     transactions = relationship("Transaction", back_populates="account")
 
+    __table_args__ = (
+        # One account per name per user, case-insensitively; also the index get_account_by_name uses.
+        Index("uq_accounts_user_id_upper_name", "user_id", func.upper(name), unique=True),
+    )
+
 
 class Transaction(Base):
+    # On Postgres (migration 0009) this is partitioned by month on date, with primary key
+    # (id, date); ids still come from the one sequence. See app/db/partitions.py.
     __tablename__ = "transactions"
 
     id = Column(Integer, primary_key=True, index=True)
-    amount = Column(Float)
+    amount_paise = Column(BigInteger)
     description = Column(String)
     type = Column(Enum(TransactionType))
     date = Column(DateTime(timezone=True), server_default=func.now())
+    transfer_id = Column(String(32), index=True, nullable=True)  # shared by both legs of a transfer
+    category = Column(String, nullable=True)  # from app/nlp/categories.py, fixed when the row is written
+
+    # The Telegram message the row was recorded from, so an edit of it updates the row in place.
+    # message_item is the entry's position in a pasted list, or the leg (0 from, 1 to) of a transfer.
+    chat_id = Column(BigInteger, nullable=True)
+    message_id = Column(BigInteger, nullable=True)
+    message_item = Column(Integer, nullable=True)
+    source_text = Column(Text, nullable=True)  # the message text (or list entry) it was parsed from
 
     user_id = Column(Integer, ForeignKey("users.id"))
     user = relationship("User", back_populates="transactions")
 
     account_id = Column(Integer, ForeignKey("accounts.id"))
     account = relationship("Account", back_populates="transactions")
+
+    __table_args__ = (
+        # (date, id) is the history pages' keyset; id breaks ties between same-instant rows.
+        Index("ix_transactions_account_id_date_id", "account_id", date.desc(), id.desc()),
+        Index("ix_transactions_user_id_date", "user_id", "date"),
+        # Partitioned on Postgres, where a unique index has to include date, so there it does.
+        Index("uq_transactions_chat_message_item", "chat_id", "message_id", "message_item", unique=True),
+    )
+
+
+class TransactionRollup(Base):
+    """
+    Per user/account/type/category sums for each day and each month, kept in step with
+    transactions by crud in the same commit. Rebuild with python -m app.db.rebuild_rollups.
+    """
+    __tablename__ = "transaction_rollups"
+
+    # Key order serves the read path: one user, one grain, a range of periods.
+    user_id = Column(Integer, primary_key=True)
+    grain = Column(String(5), primary_key=True)  # "day" | "month"
+    period_start = Column(Date, primary_key=True)  # Asia/Kolkata calendar day, or the 1st of the month
+    account_id = Column(Integer, primary_key=True)
+    type = Column(Enum(TransactionType), primary_key=True)
+    category = Column(String, primary_key=True)
+    total_paise = Column(BigInteger, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class TransactionArchive(Base):
+    """
+    A user's transactions for one month that app/db/partitions.py moved out of transactions,
+    as zlib-compressed JSON. Exports and analytics over archived months read them from here;
+    their rollups stay in transaction_rollups.
+    """
+    __tablename__ = "transaction_archive"
+
+    user_id = Column(Integer, primary_key=True)
+    month = Column(Date, primary_key=True, index=True)  # Asia/Kolkata month start
+    count = Column(Integer, nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+
+
+class PendingUpdate(Base):
+    """Telegram updates accepted by the webhook but not yet processed (durable update queue)."""
+    __tablename__ = "pending_updates"
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, index=True)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ProcessedUpdate(Base):
+    """Telegram update_ids already accepted, so redeliveries are dropped across restarts."""
+    __tablename__ = "processed_updates"
+
+    update_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -0,0 +1,280 @@
+# Monthly partitions of transactions, and archival of the months before the horizon.
+#
+#     python -m app.db.partitions status
+#     python -m app.db.partitions ensure                     # this month and TRANSACTION_PARTITIONS_AHEAD more
+#     python -m app.db.partitions archive [--month 2024-03]  # months older than TRANSACTIONS_HOT_MONTHS
+#     python -m app.db.partitions restore --month 2024-03 | --all
+#
+# On Postgres, migration 0009 partitions transactions by RANGE (date): one partition per
+# Asia/Kolkata month, named transactions_yYYYYmMM, plus transactions_default for rows that
+# fall outside them. Recent-history queries touch only the recent partitions, and each
+# partition's indexes only cover its own month, however long the history gets. Archiving
+# a month packs each user's rows into transaction_archive (zlib-compressed JSON) and drops
+# the partition; it only happens once TRANSACTIONS_HOT_MONTHS is set. SQLite, and a Postgres
+# database made with init_db, keep transactions as one table: ensure does nothing there,
+# archive deletes the month's rows instead, and the app's background job leaves them alone.
+import argparse
+import asyncio
+import itertools
+import os
+from contextlib import contextmanager
+from datetime import date, datetime
+from dotenv import load_dotenv
+from sqlalchemy import select, delete, insert, func, text
+from sqlalchemy.orm import Session
+from app.db.session import SessionLocal
+from app.db import models
+from app.db.crud import india_tz, _add_months, _archive_horizon, _day_start, local_day, _pack_archive, _unpack_archive
+from app.services.log import get_logger
+
+load_dotenv()
+
+TRANSACTION_PARTITIONS_AHEAD = int(os.getenv("TRANSACTION_PARTITIONS_AHEAD", "3"))
+PARTITION_MAINTENANCE_HOURS = float(os.getenv("PARTITION_MAINTENANCE_HOURS", "24"))  # 0 disables the background job
+
+logger = get_logger("app.db.partitions")
+
+
+def partition_name(month: date) -> str:
+    return f"transactions_y{month.year}m{month.month:02d}"
+
+
+def partition_bounds(month: date) -> str:
+    lo, hi = (_day_start(m).isoformat(sep=" ") for m in (month, _add_months(month, 1)))
+    return f"FOR VALUES FROM ('{lo}') TO ('{hi}')"
+
+
+def _month_range(month: date):
+    return _day_start(month), _day_start(_add_months(month, 1))
+
+
+def is_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return bool(db.execute(text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('transactions')")).scalar())
+
+
+def partitions(db: Session) -> list:
+    """The months that have a partition, oldest first."""
+    names = db.scalars(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid"
+        " WHERE i.inhparent = 'transactions'::regclass"
+    ))
+    return sorted(date(int(name[14:18]), int(name[19:21]), 1) for name in names if name.startswith("transactions_y"))
+
+
+@contextmanager
+def _exclusive(db: Session):
+    """Yields False if another instance is already maintaining the partitions."""
+    engine = db.get_bind()
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+    # A session-level lock, held on a connection of its own: db gives its connection back at each commit.
+    with engine.connect() as conn:
+        got = conn.execute(text("SELECT pg_try_advisory_lock(hashtext('transactions_partitions'))")).scalar()
+        conn.commit()
+        try:
+            yield got
+        finally:
+            if got:
+                conn.execute(text("SELECT pg_advisory_unlock(hashtext('transactions_partitions'))"))
+                conn.commit()
+
+
+def create_partition(db: Session, month: date):
+    """Add month's partition, moving any of its rows out of the default partition first."""
+    name, bounds = partition_name(month), partition_bounds(month)
+    lo, hi = _month_range(month)
+    params = {"lo": lo, "hi": hi}
+    strays = db.execute(text("SELECT count(*) FROM transactions_default WHERE date >= :lo AND date < :hi"), params).scalar()
+    if not strays:
+        db.execute(text(f"CREATE TABLE {name} PARTITION OF transactions {bounds}"))
+        return
+    db.execute(text(f"CREATE TABLE {name} (LIKE transactions INCLUDING DEFAULTS)"))
+    db.execute(text(
+        "WITH moved AS (DELETE FROM transactions_default WHERE date >= :lo AND date < :hi RETURNING *)"
+        f" INSERT INTO {name} SELECT * FROM moved"
+    ), params)
+    db.execute(text(f"ALTER TABLE transactions ATTACH PARTITION {name} {bounds}"))
+
+
+def ensure_partitions(db: Session, ahead: int = TRANSACTION_PARTITIONS_AHEAD, today: date = None) -> list:
+    """Create the partitions for this month and the next `ahead` that don't exist yet; returns their months."""
+    if not is_partitioned(db):
+        return []
+    this_month = (today or datetime.now(india_tz).date()).replace(day=1)
+    existing = set(partitions(db))
+    created = [m for m in (_add_months(this_month, i) for i in range(ahead + 1)) if m not in existing]
+    for month in created:
+        create_partition(db, month)
+    db.commit()
+    return created
+
+
+def archive_month(db: Session, month: date, today: date = None) -> int:
+    """
+    Move month's transactions into transaction_archive, one row per user, and drop them
+    from transactions (the partition, on Postgres), in one commit. A user's rows added to
+    an already archived month are merged into their archive row. Balances and rollups are
+    left as they are. Returns the number of transactions archived.
+    """
+    horizon = _archive_horizon(today)
+    if horizon is None or month >= horizon:
+        raise ValueError(f"{month:%Y-%m} is not before the archive horizon ({horizon and f'{horizon:%Y-%m}'})")
+    txn, archive = models.Transaction, models.TransactionArchive
+    lo, hi = _month_range(month)
+    in_month = (txn.date >= lo, txn.date < hi)
+    existing = {a.user_id: a for a in db.scalars(select(archive).where(archive.month == month))}
+    rows = db.execute(
+        select(txn.__table__).where(*in_month).order_by(txn.user_id, txn.id).execution_options(yield_per=5000)
+    )
+    archived = 0
+    for user_id, user_rows in itertools.groupby(rows, key=lambda r: r.user_id):
+        user_rows = list(user_rows)
+        archived += len(user_rows)
+        if user_id in existing:
+            row = existing[user_id]
+            user_rows = _unpack_archive(row.payload) + user_rows
+            row.payload, row.count = _pack_archive(user_rows), len(user_rows)
+        else:
+            db.add(archive(user_id=user_id, month=month, count=len(user_rows), payload=_pack_archive(user_rows)))
+
+    if is_partitioned(db) and month in partitions(db):
+        db.execute(text(f"DROP TABLE {partition_name(month)}"))
+    # What's left: rows in the default partition, or the month's rows in an unpartitioned table.
+    db.execute(delete(txn).where(*in_month).execution_options(synchronize_session=False))
+    db.commit()
+    return archived
+
+
+def archive_old(db: Session, today: date = None) -> dict:
+    """Archive every month before the horizon that still has transactions; returns {month: rows}."""
+    horizon = _archive_horizon(today)
+    if horizon is None:
+        return {}
+    if is_partitioned(db):
+        months = {m for m in partitions(db) if m < horizon}
+        months |= {d.date() for d in db.scalars(text(
+            "SELECT DISTINCT date_trunc('month', date AT TIME ZONE 'Asia/Kolkata') FROM transactions_default WHERE date < :horizon"
+        ), {"horizon": _day_start(horizon)})}
+    else:
+        oldest = db.scalar(select(func.min(models.Transaction.date)))
+        months = set()
+        month = local_day(oldest).replace(day=1) if oldest is not None else horizon
+        while month < horizon:
+            months.add(month)
+            month = _add_months(month, 1)
+    done = {month: archive_month(db, month, today) for month in sorted(months)}
+    return {month: rows for month, rows in done.items() if rows}
+
+
+def restore_month(db: Session, month: date) -> int:
+    """Move month's archived transactions back into transactions; returns how many."""
+    txn, archive = models.Transaction, models.TransactionArchive
+    archived = db.scalars(select(archive).where(archive.month == month)).all()
+    if not archived:
+        return 0
+    if is_partitioned(db) and month not in partitions(db):
+        create_partition(db, month)
+    naive = db.get_bind().dialect.name == "sqlite"
+    restored = 0
+    for row in archived:
+        values = [{**r._asdict(), "user_id": row.user_id} for r in _unpack_archive(row.payload, naive)]
+        db.execute(insert(txn.__table__), values)
+        db.delete(row)
+        restored += len(values)
+    db.commit()
+    return restored
+
+
+def restore_recent(db: Session, today: date = None) -> dict:
+    """
+    Restore the archived months at or after the horizon, e.g. after TRANSACTIONS_HOT_MONTHS
+    was raised (or set to 0), so the readers in crud never need the archive for them.
+    """
+    archive = models.TransactionArchive
+    horizon = _archive_horizon(today)
+    query = select(archive.month).distinct()
+    if horizon is not None:
+        query = query.where(archive.month >= horizon)
+    return {month: restore_month(db, month) for month in db.scalars(query).all()}
+
+
+def maintain(db: Session, today: date = None) -> dict:
+    """
+    Create upcoming partitions, then restore and archive months to match the horizon.
+    Does nothing unless transactions is partitioned.
+    """
+    if not is_partitioned(db):
+        return {}
+    with _exclusive(db) as got:
+        if not got:
+            return {}
+        return {
+            "created": ensure_partitions(db, today=today),
+            "restored": restore_recent(db, today),
+            "archived": archive_old(db, today),
+        }
+
+
+def _maintain() -> dict:
+    with SessionLocal() as db:
+        return maintain(db)
+
+
+async def maintain_forever():
+    """Run maintain() at startup and then every PARTITION_MAINTENANCE_HOURS; for the app's lifespan."""
+    while True:
+        try:
+            done = await asyncio.to_thread(_maintain)
+            if any(done.values()):
+                logger.info("Transaction partitions maintained", extra={
+                    "created": [str(m) for m in done["created"]],
+                    "restored": {str(m): n for m, n in done["restored"].items()},
+                    "archived": {str(m): n for m, n in done["archived"].items()},
+                })
+        except Exception as e:
+            logger.warning("Transaction partition maintenance failed", extra={"error": repr(e)})
+        await asyncio.sleep(PARTITION_MAINTENANCE_HOURS * 3600)
+
+
+def status(db: Session) -> dict:
+    archive = models.TransactionArchive
+    archived = db.execute(
+        select(archive.month, func.count(), func.sum(archive.count), func.sum(func.length(archive.payload)))
+        .group_by(archive.month).order_by(archive.month)
+    ).all()
+    horizon = _archive_horizon()
+    return {
+        "partitioned": is_partitioned(db),
+        "partitions": [str(m) for m in partitions(db)] if is_partitioned(db) else [],
+        "horizon": str(horizon) if horizon else None,
+        "archived": {str(month): {"users": users, "rows": rows, "bytes": size} for month, users, rows, size in archived},
+    }
+
+
+def _month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Manage the monthly partitions and archive of transactions.")
+    ap.add_argument("command", choices=["status", "ensure", "archive", "restore"])
+    ap.add_argument("--month", type=_month, help="YYYY-MM; archive or restore just this month")
+    ap.add_argument("--all", action="store_true", help="restore every archived month")
+    args = ap.parse_args()
+    with SessionLocal() as db:
+        if args.command == "status":
+            result = status(db)
+        elif args.command == "ensure":
+            result = [str(m) for m in ensure_partitions(db)]
+        elif args.command == "archive":
+            result = {str(args.month): archive_month(db, args.month)} if args.month else archive_old(db)
+        elif args.month:
+            result = {str(args.month): restore_month(db, args.month)}
+        elif args.all:
+            result = {m: restore_month(db, m) for m in db.scalars(select(models.TransactionArchive.month).distinct()).all()}
+        else:
+            ap.error("restore needs --month or --all")
+    print({str(k): v for k, v in result.items()} if isinstance(result, dict) else result)
@@ -0,0 +1,204 @@
+# Statement counting for crud calls and webhook updates, from SQLAlchemy cursor events.
+# Off unless DB_PROFILE_SAMPLE > 0; a sampled update or crud call records how many
+# statements it ran and for how long, logs slow statements and statements repeated
+# N+1 style, and checks the count against QUERY_BUDGETS. With DB_QUERY_BUDGET_STRICT=1
+# going over budget raises QueryBudgetExceeded, so benchmarks and CI runs fail loudly.
+import contextvars
+import functools
+import os
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from sqlalchemy import event
+from app.services.log import get_logger
+from app.services.metrics import DB_STATEMENTS, DB_BUDGET_EXCEEDED, DB_REPEATED_STATEMENTS
+from app.services import tracing
+
+load_dotenv()
+
+DB_PROFILE_SAMPLE = float(os.getenv("DB_PROFILE_SAMPLE", "0"))  # fraction of updates/crud calls profiled
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+DB_REPEAT_THRESHOLD = int(os.getenv("DB_REPEAT_THRESHOLD", "5"))  # same statement this often in one update is flagged
+DB_QUERY_BUDGET_STRICT = os.getenv("DB_QUERY_BUDGET_STRICT", "0") == "1"
+
+# Most statements each crud call or update may run, counted on sqlite, which inserts ORM rows
+# one by one where Postgres batches them. Updates are keyed "update:<type>/<action>"; the user
+# and account lookups and creations in IDENTITY_SCOPES (identity cache misses) are counted
+# apart from an update's budget. Batches are budgeted for one account and up to three
+# entries; transfer legs make delete/update the priciest. Edited messages are all under
+# "update:edit/update", including one that no longer fits its transactions, which deletes
+# them and records it again, and one that recorded nothing, which is recorded afresh.
+QUERY_BUDGETS = {
+    "db.create_user": 1,
+    "db.get_user": 1,
+    "db.create_account": 1,
+    "db.get_account_by_name": 1,
+    "db.add_transaction": 3,
+    "db.add_transactions": 5,
+    "db.add_transfer": 5,
+    "db.set_balance": 4,
+    "db.get_all_balances": 1,
+    "db.delete_last_transaction": 5,
+    "db.update_last_transaction": 7,
+    "db.get_transactions_page": 1,
+    "db.get_message_transactions": 1,
+    "db.edit_transactions": 8,  # a three-entry list moved to another account
+    "db.delete_transactions": 5,
+    "db.get_transactions_by_account": 1,
+    "db.get_rollup_totals": 3,
+    "db.get_report_totals": 3,
+    "db.get_category_totals": 3,
+    "db.get_daily_totals": 4,  # rollups, partial days, and the archive for each partial day
+    "db.get_net_since": 3,
+    "update:expense/create": 3,
+    "update:income/create": 3,
+    "update:batch/create": 5,
+    "update:transfer/create": 5,
+    "update:balance/read": 1,
+    "update:balance_adjustment/update": 4,
+    "update:expense/delete": 5,
+    "update:income/delete": 5,
+    "update:expense/update": 7,
+    "update:income/update": 7,
+    "update:transaction/read": 1,
+    "update:edit/update": 11,
+    "update:analytics/read": 4,
+    "update:export/read": 0,
+}
+IDENTITY_SCOPES = {"db.create_user", "db.get_user", "db.create_account", "db.get_account_by_name"}
+
+logger = get_logger("app.db.profiler")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class Profile:
+    __slots__ = ("scope", "parent", "statements", "lookups", "seconds", "repeats", "closed")
+
+    def __init__(self, scope: str, parent: "Profile" = None):
+        self.scope = scope
+        self.parent = parent
+        self.statements = 0
+        self.lookups = 0  # statements from IDENTITY_SCOPES calls, outside the budget
+        self.seconds = 0.0
+        self.repeats = Counter()
+        self.closed = False
+
+
+_SKIPPED = Profile("skipped")  # an unsampled update; the crud calls under it aren't profiled either
+_current = contextvars.ContextVar("db_profile", default=None)
+
+
+@contextmanager
+def profile(scope: str):
+    """Profile the statements run inside the block, if this update or call is sampled."""
+    if DB_PROFILE_SAMPLE <= 0:
+        yield None
+        return
+    parent = _current.get()
+    if parent is not None and parent.closed:
+        parent = None  # a background job started by an update that has since finished
+    if parent is _SKIPPED or (parent is None and random.random() >= DB_PROFILE_SAMPLE):
+        token = _current.set(_SKIPPED)
+        try:
+            yield None
+        finally:
+            _current.reset(token)
+        return
+
+    current = Profile(scope, parent)
+    token = _current.set(current)
+    failed = True
+    try:
+        yield current
+        failed = False
+    finally:
+        _current.reset(token)
+        current.closed = True
+        if current.parent is not None:
+            if current.scope in IDENTITY_SCOPES:
+                current.parent.lookups += current.statements + current.lookups
+            else:
+                current.parent.statements += current.statements
+                current.parent.lookups += current.lookups
+            current.parent.seconds += current.seconds
+            current.parent.repeats.update(current.repeats)
+        _finish(current, raise_on_budget=not failed)
+
+
+def set_scope(scope: str):
+    """Name the current profile once it's known what it is, e.g. the update's parsed intent."""
+    current = _current.get()
+    if current is not None and current is not _SKIPPED:
+        current.scope = scope
+
+
+def _finish(current: Profile, raise_on_budget: bool):
+    DB_STATEMENTS.observe(current.statements, scope=current.scope)
+    if current.parent is None:
+        tracing.set_attributes(
+            db_statements=current.statements + current.lookups, db_lookups=current.lookups, db_ms=round(current.seconds * 1000, 2)
+        )
+        repeated = {sql: n for sql, n in current.repeats.items() if n >= DB_REPEAT_THRESHOLD}
+        if repeated:
+            DB_REPEATED_STATEMENTS.inc(scope=current.scope)
+            logger.warning("Statement repeated N+1 style", extra={
+                "scope": current.scope, "repeated": {" ".join(sql.split())[:200]: n for sql, n in repeated.items()},
+            })
+    budget = QUERY_BUDGETS.get(current.scope)
+    if budget is not None and current.statements > budget:
+        DB_BUDGET_EXCEEDED.inc(scope=current.scope)
+        message = f"{current.scope} ran {current.statements} statements, budget is {budget}"
+        if DB_QUERY_BUDGET_STRICT and raise_on_budget:
+            raise QueryBudgetExceeded(message)
+        logger.warning("Query budget exceeded", extra={"scope": current.scope, "statements": current.statements, "budget": budget})
+
+
+def profiled(fn):
+    """Decorator: profile each call of a crud function as "db.<name>"."""
+    scope = f"db.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with profile(scope):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    current = _current.get()
+    if current is not None and current is not _SKIPPED:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    current = _current.get()
+    if current is None or current is _SKIPPED or not conn.info.get("profile_started"):
+        return
+    elapsed = time.perf_counter() - conn.info["profile_started"].pop()
+    current.statements += 1
+    current.seconds += elapsed
+    if not executemany:
+        current.repeats[statement] += 1
+    if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+        logger.warning("Slow statement", extra={
+            "scope": current.scope, "ms": round(elapsed * 1000, 2), "statement": " ".join(statement.split())[:500],
+        })
+
+
+def install(*engines):
+    for target in engines:
+        if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+            event.listen(target, "before_cursor_execute", _before_cursor_execute)
+            event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+def instrument(target):
+    """Called by app.db.session for each engine it builds."""
+    if DB_PROFILE_SAMPLE > 0:
+        install(target)
@@ -0,0 +1,63 @@
+# Recompute transaction_rollups from transactions, e.g. after a bulk import or
+# after changing the keywords in app/nlp/categories.py (use --recategorize).
+#
+#     python -m app.db.rebuild_rollups [--user-id N] [--recategorize]
+import argparse
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+from app.db.session import SessionLocal
+from app.db import models
+from app.db.crud import TRANSFER_CATEGORY, local_day, _unpack_archive
+from app.nlp.categories import categorize
+
+
+def rebuild_rollups(db: Session, user_id: int = None, recategorize: bool = False, batch_size: int = 5000) -> int:
+    txn, rollup, archive = models.Transaction, models.TransactionRollup, models.TransactionArchive
+    query = db.query(txn)
+    archived = db.query(archive.user_id, archive.payload)
+    clear = delete(rollup)
+    if user_id is not None:
+        query = query.filter(txn.user_id == user_id)
+        archived = archived.filter(archive.user_id == user_id)
+        clear = clear.where(rollup.user_id == user_id)
+
+    totals = {}
+
+    def add(user_id, row, category):
+        day = local_day(row.date)
+        for grain, period_start in (("day", day), ("month", day.replace(day=1))):
+            key = (user_id, grain, period_start, row.account_id, row.type, category)
+            total, count = totals.get(key, (0, 0))
+            totals[key] = (total + row.amount_paise, count + 1)
+
+    for row in query.order_by(txn.id).yield_per(batch_size):
+        if recategorize or row.category is None:
+            row.category = TRANSFER_CATEGORY if row.transfer_id else categorize(row.description)
+        add(row.user_id, row, row.category)
+    # Archived months count too; --recategorize changes their rollups but not the archive.
+    for archived_user_id, payload in archived.yield_per(100):
+        for row in _unpack_archive(payload):
+            category = row.category
+            if recategorize or category is None:
+                category = TRANSFER_CATEGORY if row.transfer_id else categorize(row.description)
+            add(archived_user_id, row, category)
+
+    db.execute(clear)
+    rows = [
+        dict(zip(("user_id", "grain", "period_start", "account_id", "type", "category"), key), total_paise=total, count=count)
+        for key, (total, count) in totals.items()
+    ]
+    for i in range(0, len(rows), batch_size):
+        db.execute(insert(rollup), rows[i:i + batch_size])
+    db.commit()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Rebuild transaction_rollups from transactions.")
+    ap.add_argument("--user-id", type=int, default=None)
+    ap.add_argument("--recategorize", action="store_true", help="recompute each transaction's category first")
+    args = ap.parse_args()
+    with SessionLocal() as db:
+        written = rebuild_rollups(db, args.user_id, args.recategorize)
+    print(f"Wrote {written} rollup rows")
@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 import os
@@ -7,8 +9,111 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("NEON_DB_URL")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Neon drops idle connections
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+
+
+def _engine_options(url, is_async: bool = False) -> dict:
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return {}
+
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+    if url.get_backend_name() == "postgresql" and DB_STATEMENT_TIMEOUT_MS:
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def async_database_url(url: str):
+    """Translate the sync DATABASE_URL into its asyncpg/aiosqlite equivalent."""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if url.get_backend_name() == "postgresql":
+        # asyncpg doesn't understand libpq-only query params such as sslmode.
+        query = dict(url.query)
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode and sslmode != "disable":
+            query["ssl"] = "require"
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    return url
+
+
+_engine = None
+_async_engine = None
+
+
+def get_engine():
+    """Sync engine: scripts (init_db) and code that hasn't moved to the async path yet. Built on first use."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+        _instrument(_engine)
+    return _engine
+
+
+def get_async_engine():
+    """Async engine: the webhook path, so a slow round trip doesn't block other chats. Built on first use."""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(async_database_url(DATABASE_URL), **_engine_options(DATABASE_URL, is_async=True))
+        _instrument(_async_engine.sync_engine)
+    return _async_engine
+
+
+def _instrument(target):
+    from app.db import profiler
+
+    profiler.instrument(target)
+
+
+class _BindOnFirstUse:
+    """Session factory that only builds its engine when the first session is opened."""
+
+    def __init__(self, get_bind, **kw):
+        super().__init__(**kw)
+        self._get_bind = get_bind
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=self._get_bind())
+        return super().__call__(**local_kw)
+
+
+class _SessionLocal(_BindOnFirstUse, sessionmaker):
+    pass
+
+
+class _AsyncSessionLocal(_BindOnFirstUse, async_sessionmaker):
+    pass
+
+
+SessionLocal = _SessionLocal(get_engine, autocommit=False, autoflush=False)
+# expire_on_commit=False: ORM objects are read after commit and lazy refreshes can't run implicitly under asyncio.
+AsyncSessionLocal = _AsyncSessionLocal(get_async_engine, autoflush=False, expire_on_commit=False)
+
+
+def __getattr__(name):
+    # `from app.db.session import engine` still works for scripts and benchmarks; it builds the engine.
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 Base = declarative_base()
 
@@ -19,3 +124,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
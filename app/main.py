@@ -1,11 +1,64 @@
 # app/main.py
-from fastapi import FastAPI
-from app.bot_handler import telegram_webhook
+import asyncio
+from contextlib import asynccontextmanager
+import os
+import secrets
+from fastapi import FastAPI, HTTPException, Header
+from fastapi.responses import PlainTextResponse
+from app.bot_handler import telegram_webhook, process_update
+from app.services.update_queue import create_update_queue, get_update_queue
+from app.services.dedup import get_deduplicator
+from app.services.telegram_client import TelegramClient, set_telegram_client
+from app.services.export_jobs import ExportJobManager, set_export_manager, get_export_manager
+from app.services.statement_import import ImportJobManager, set_import_manager, get_import_manager
+from app.services.identity_cache import get_identity_cache
+from app.services.transactions import load_ledger_async, METRICS
+from app.services.warmup import STARTUP_WARMUP, warm_up
+from app.services.log import setup_logging, stop_logging, dropped as log_records_dropped
+from app.services import metrics
+from app.utils.parse_cache import get_parse_cache
+from app.db.session import AsyncSessionLocal
+from app.db.partitions import PARTITION_MAINTENANCE_HOURS, maintain_forever
+from app.db import async_crud as crud
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI()
+ANALYTICS_API_TOKEN = os.getenv("ANALYTICS_API_TOKEN")  # unset disables /analytics
+
+metrics.Gauge("bot_update_queue_depth", "Updates waiting to be handled.", lambda: get_update_queue().depth)
+metrics.Gauge("bot_update_queue_in_flight", "Updates being handled.", lambda: get_update_queue().in_flight)
+metrics.Gauge("bot_export_jobs_pending", "PDF exports queued or rendering.", lambda: get_export_manager().pending)
+metrics.Gauge("bot_import_jobs_pending", "Statement imports queued or running.", lambda: get_import_manager().pending)
+metrics.Gauge("bot_log_records_dropped", "Log records dropped because the log queue was full.", log_records_dropped)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    telegram = TelegramClient()
+    set_telegram_client(telegram)
+    exports = ExportJobManager()
+    set_export_manager(exports)
+    imports = ImportJobManager()
+    set_import_manager(imports)
+    queue = create_update_queue(process_update)
+    await queue.start()
+    warmup = asyncio.create_task(warm_up()) if STARTUP_WARMUP else None
+    maintenance = asyncio.create_task(maintain_forever()) if PARTITION_MAINTENANCE_HOURS > 0 else None
+    yield
+    if warmup:
+        warmup.cancel()
+    if maintenance:
+        maintenance.cancel()
+    await queue.stop()
+    await imports.shutdown()
+    await exports.shutdown()
+    await telegram.close()
+    stop_logging()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add webhook route
 app.include_router(telegram_webhook, prefix="/webhook")
@@ -13,3 +66,41 @@ app.include_router(telegram_webhook, prefix="/webhook")
 @app.get("/")
 def greet():
     return {"message": "Welcome to the Telegram Bot API!"}
+
+@app.get("/queue")
+def queue_stats():
+    return {**get_update_queue().stats(), "duplicates_dropped": get_deduplicator().duplicates}
+
+@app.get("/cache")
+def cache_stats():
+    return {"identity": get_identity_cache().stats(), "parse": get_parse_cache().stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/jobs/{job_id}")
+def export_job_status(job_id: str):
+    job = get_export_manager().get(job_id) or get_import_manager().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.get("/analytics/{telegram_id}/{metric}")
+async def analytics(telegram_id: str, metric: str, start: str = None, end: str = None, authorization: str = Header(None)):
+    if not ANALYTICS_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not secrets.compare_digest(authorization or "", f"Bearer {ANALYTICS_API_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if metric not in METRICS:
+        raise HTTPException(status_code=404, detail=f"Unknown metric, expected one of {', '.join(METRICS)}")
+    async with AsyncSessionLocal() as db:
+        user_id = await crud.get_user_id(db, telegram_id)
+        if user_id is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        try:
+            ledger = await load_ledger_async(db, user_id, start, end)
+        except (ValueError, OverflowError):
+            raise HTTPException(status_code=400, detail="start and end must be ISO dates")
+    return METRICS[metric](ledger)
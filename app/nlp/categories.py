@@ -0,0 +1,60 @@
+import re
+
+DEFAULT_CATEGORY = "Other"
+
+# Keyword -> category. Multi-word keywords are matched as phrases.
+CATEGORY_KEYWORDS = {
+    "Food": [
+        "chai", "tea", "coffee", "lunch", "dinner", "breakfast", "snacks", "snack", "food",
+        "swiggy", "zomato", "restaurant", "cafe", "pizza", "biryani", "juice", "canteen",
+    ],
+    "Groceries": [
+        "groceries", "grocery", "vegetables", "veggies", "fruits", "milk", "eggs",
+        "blinkit", "zepto", "bigbasket", "kirana", "ration",
+    ],
+    "Transport": [
+        "metro", "auto", "uber", "ola", "rapido", "cab", "taxi", "bus", "train", "flight",
+        "petrol", "diesel", "fuel", "parking", "toll", "fastag",
+    ],
+    "Bills": [
+        "rent", "electricity", "recharge", "wifi", "internet", "broadband", "bill", "bills",
+        "dth", "water", "gas", "maintenance", "emi", "insurance",
+    ],
+    "Shopping": ["amazon", "flipkart", "myntra", "meesho", "clothes", "shoes", "shopping"],
+    "Health": ["medicine", "medicines", "doctor", "pharmacy", "hospital", "gym", "medical"],
+    "Entertainment": ["movie", "movies", "netflix", "spotify", "hotstar", "prime", "concert", "party"],
+    "Education": ["books", "book", "course", "tuition", "fees", "college", "school"],
+    "Salary": ["salary", "stipend", "payroll", "paycheck"],
+    "Freelance": ["freelance", "freelancing", "client", "consulting", "project"],
+    "Gifts": ["gift", "gifts", "grandma", "grandpa", "birthday", "shagun"],
+    "Investment": ["sip", "mutual fund", "stocks", "shares", "fd", "dividend", "interest"],
+    "Refund": ["refund", "cashback", "reimbursement"],
+    "Adjustment": ["balance correction"],
+}
+
+# Categories that describe money coming in rather than going out.
+INCOME_CATEGORIES = {"Salary", "Freelance", "Gifts", "Refund"}
+
+_KEYWORD_TO_CATEGORY = {
+    keyword: category
+    for category, keywords in CATEGORY_KEYWORDS.items()
+    for keyword in keywords
+}
+_KEYWORD_RE = re.compile(
+    r"\b(" + "|".join(
+        re.escape(k) for k in sorted(_KEYWORD_TO_CATEGORY, key=len, reverse=True)
+    ) + r")\b"
+)
+
+
+def categorize(description: str) -> str:
+    if not description:
+        return DEFAULT_CATEGORY
+    match = _KEYWORD_RE.search(description.lower())
+    if not match:
+        return DEFAULT_CATEGORY
+    return _KEYWORD_TO_CATEGORY[match.group(1)]
+
+
+def is_known_keyword(word: str) -> bool:
+    return word.lower() in _KEYWORD_TO_CATEGORY
@@ -0,0 +1,362 @@
+import re
+from datetime import datetime, date, timedelta
+import pytz
+from app.nlp.categories import categorize, INCOME_CATEGORIES, DEFAULT_CATEGORY
+from app.schemas.base import ExpenseParsed
+
+india = pytz.timezone("Asia/Kolkata")
+
+# Account names we can recognise without asking the LLM, mapped to how they are displayed.
+KNOWN_ACCOUNTS = {
+    "cash": "Cash", "hdfc": "HDFC", "sbi": "SBI", "icici": "ICICI", "axis": "AXIS",
+    "kotak": "KOTAK", "idfc": "IDFC", "pnb": "PNB", "bob": "BOB", "canara": "CANARA",
+    "indusind": "INDUSIND", "federal": "FEDERAL", "sb": "SB", "card": "CARD",
+    "savings": "SAVINGS", "paytm": "PAYTM", "gpay": "GPAY", "phonepe": "PHONEPE",
+    "upi": "UPI", "wallet": "WALLET",
+}
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+_AMOUNT = r"(?:₹|rs\.?|inr)?\s*(?P<amount>\d{1,3}(?:,\d{2,3})+(?:\.\d+)?|\d+(?:\.\d+)?)(?P<k>k\b)?"
+# Month names and their usual abbreviations, and nothing else that starts like one ("marketing", "junk").
+MONTH_NAMES = (
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)(?![a-z])"
+)
+_MONTH = r"(?P<month>" + MONTH_NAMES + r")\.?"
+_DAY = r"(?P<day>\d{1,2})(?:st|nd|rd|th)?"
+_YEAR = r"(?:,?\s+(?P<year>\d{4}|\d{2}))?"
+
+AMOUNT_RE = re.compile(_AMOUNT)
+
+_DATE_PATTERNS = [
+    (re.compile(r"\b(?:on\s+)?day before yesterday\b"), "relative"),
+    (re.compile(r"\b(?:on\s+)?yesterday\b"), "relative"),
+    (re.compile(r"\b(?:on\s+)?today\b"), "relative"),
+    (re.compile(r"\b(?P<n>a|an|one|\d+)\s+(?P<unit>day|days|week|weeks)\s+ago\b"), "ago"),
+    (re.compile(r"\b(?:on\s+)?(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})\b"), "iso"),
+    (re.compile(r"\b(?:on\s+)?" + _DAY + r"\s+(?:of\s+)?" + _MONTH + _YEAR + r"\b"), "day_month"),
+    (re.compile(r"\b(?:on\s+)?" + _MONTH + r"\s+" + _DAY + _YEAR + r"\b"), "day_month"),
+    (re.compile(r"\bon\s+(?P<day>\d{1,2})[/-](?P<month>\d{1,2})(?:[/-](?P<year>\d{4}|\d{2}))?\b"), "numeric"),
+]
+
+_TRANSFER_RE = re.compile(r"^t\s*:|\btransfer(?:red|ring)?\b")
+_FROM_TO_RE = re.compile(r"\bfrom\s+(?P<src>[a-z][\w&-]*)\s+(?:to|into)\s+(?P<dst>[a-z][\w&-]*)\b")
+_HISTORY_RE = re.compile(r"\b(transactions?|txns?|history|statement)\b")
+_LIMIT_RE = re.compile(r"\b(?:last|recent|latest|past|previous|top)\s+(\d{1,4})\b|\b(\d{1,4})\s+(?:transactions?|txns?)\b")
+_DELETE_RE = re.compile(r"^(?:please\s+)?(?:delete|remove|undo|cancel)\b")
+_UPDATE_RE = re.compile(r"^(?:please\s+)?(?:update|change|edit|correct|modify)\b")
+_UPDATE_AMOUNT_RE = re.compile(r"\bto\s+" + _AMOUNT + r"\s*$")
+_BALANCE_RE = re.compile(r"\b(?:balance|balances|bal)\b")
+_BALANCE_OF_RE = re.compile(r"\b(?:of|in|for)\s+(?P<acc>[a-z][\w&-]*)\b")
+_ADJUST_RE = re.compile(
+    r"^(?:set\s+)?(?P<acc>[a-z][\w&-]*)(?:\s+balance)?\s*(?:=|:|\bis\b|\bto\b)\s*" + _AMOUNT + r"$"
+)
+_TYPE_WORD_RE = re.compile(r"\b(income|expense)\b")
+# Spending analytics questions, most specific first; the first match picks the metric.
+_ANALYTICS_RES = [
+    ("balances", re.compile(r"\b(?:running balances?|balance (?:trend|history|over time|graph|chart))\b")),
+    ("monthly", re.compile(r"\b(?:month over month|month on month|mom|monthly (?:trend|spend(?:ing)?|comparison)|(?:vs|versus|compared to) last month)\b")),
+    ("daily", re.compile(r"\b(?:(?:average|avg|mean) daily|daily (?:average|avg|spend(?:ing)?)|(?:spend(?:ing)?|spent) per day|per day spend(?:ing)?)\b")),
+    ("categories", re.compile(r"\b(?:breakdown|by categor(?:y|ies)|categor(?:y|ies) ?wise|categories|where did (?:my|the|all) (?:\w+ )?money go)\b")),
+    ("summary", re.compile(r"\b(?:how much (?:did|have) i (?:spend|spent|earn|earned|make|made)|spending summary|summary|analytics|insights|stats)\b")),
+]
+# "last 3 months" and "in 2024" are periods, not amounts.
+_PERIOD_NUMBER_RE = re.compile(r"\b\d+\s*(?:days?|weeks?|months?|years?|yrs?)\b|\b(?:19|20)\d{2}\b")
+# Separators between entries of a pasted list: "chai 20, auto 60; lunch 180". A comma
+# followed by a digit is left alone so "1,200" stays one amount.
+_ITEM_SPLIT_RE = re.compile(r"[\n;]|,(?!\d)")
+_AND_SPLIT_RE = re.compile(r"\s+(?:and|&|\+)\s+")
+_ACCOUNT_PHRASE_RE = re.compile(
+    r"\b(?P<prep>from|in|into|to|via|using|through|with|by)\s+(?:my\s+|the\s+)?(?P<acc>[a-z][\w&-]*)(?:\s+(?:account|acc|a/c|bank))?\b"
+)
+
+INCOME_WORDS = {
+    "received", "receive", "got", "get", "earned", "earn", "credited", "credit", "deposited",
+    "deposit", "added", "add", "income", "won", "sold",
+}
+# Words that mark income but still make a good description.
+INCOME_NOUNS = {"salary", "refund", "cashback", "bonus", "stipend", "dividend"}
+EXPENSE_WORDS = {
+    "spent", "spend", "paid", "pay", "sent", "send", "bought", "buy", "gave", "give",
+    "debited", "debit", "withdrew", "withdrawn", "expense", "lost", "purchased", "ordered",
+}
+FILLER_WORDS = {
+    "on", "for", "to", "from", "rs", "inr", "the", "my", "a", "an", "of", "i", "have", "has", "me",
+    "just", "and", "at", "by", "rupees", "rupee", "bucks", "worth", "some", "was", "is",
+}
+
+
+def _unknown() -> dict:
+    return ExpenseParsed(type="unknown", action="create", amount=0.0).model_dump()
+
+
+def _to_amount(match) -> float:
+    value = float(match.group("amount").replace(",", ""))
+    if match.group("k"):
+        value *= 1000
+    return value
+
+
+def _account_name(word: str) -> str:
+    return KNOWN_ACCOUNTS.get(word.lower(), word.upper())
+
+
+def _full_year(year: str, today: date) -> int:
+    if not year:
+        return today.year
+    year = int(year)
+    return year + 2000 if year < 100 else year
+
+
+def find_date(text: str, today: date = None):
+    """Return (YYYY-MM-DD, (start, end) span) for the first date phrase in text, or (None, None)."""
+    today = today or datetime.now(india).date()
+    for pattern, kind in _DATE_PATTERNS:
+        m = pattern.search(text)
+        if not m:
+            continue
+        phrase = m.group(0)
+        try:
+            if kind == "relative":
+                offset = 2 if "before" in phrase else 1 if "yesterday" in phrase else 0
+                found = today - timedelta(days=offset)
+            elif kind == "ago":
+                n = 1 if m.group("n") in ("a", "an", "one") else int(m.group("n"))
+                days = n * 7 if m.group("unit").startswith("week") else n
+                found = today - timedelta(days=days)
+            elif kind == "iso":
+                found = date(int(m.group("year")), int(m.group("month")), int(m.group("day")))
+            elif kind == "day_month":
+                found = date(_full_year(m.group("year"), today), MONTHS[m.group("month")[:3]], int(m.group("day")))
+            else:
+                found = date(_full_year(m.group("year"), today), int(m.group("month")), int(m.group("day")))
+        except ValueError:
+            continue
+        return found.isoformat(), m.span()
+    return None, None
+
+
+def extract_date(text: str, today: date = None):
+    """Return (YYYY-MM-DD or None, text with the date phrase removed)."""
+    found, span = find_date(text, today)
+    if not found:
+        return None, text
+    return found, (text[:span[0]] + " " + text[span[1]:]).strip()
+
+
+def _find_account(text: str):
+    """Return (account, matched span, preposition, confidence) for the best account mention."""
+    for m in _ACCOUNT_PHRASE_RE.finditer(text):
+        if m.group("acc") in KNOWN_ACCOUNTS:
+            return _account_name(m.group("acc")), m.span(), m.group("prep"), 1.0
+    for word in re.finditer(r"[a-z][\w&-]*", text):
+        if word.group(0) in KNOWN_ACCOUNTS:
+            return _account_name(word.group(0)), word.span(), None, 0.95
+    return None, None, None, 0.0
+
+
+def _describe(text: str) -> str:
+    words = [w for w in re.findall(r"[a-z][a-z'&.-]*", text)
+             if w not in FILLER_WORDS and w not in INCOME_WORDS and w not in EXPENSE_WORDS]
+    if not words:
+        return "Miscellaneous"
+    description = " ".join(words)
+    return description[0].upper() + description[1:]
+
+
+def _parse_history(text: str):
+    m = _LIMIT_RE.search(text)
+    limit = int(m.group(1) or m.group(2)) if m else None
+    account, _, _, _ = _find_account(text)
+    return ExpenseParsed(
+        type="transaction", action="read", amount=0.0, account=account or "Cash", limit=limit
+    ).model_dump(), 0.95
+
+
+def _parse_delete_or_update(text: str, action: str):
+    type_match = _TYPE_WORD_RE.search(text)
+    txn_type = type_match.group(1) if type_match else "transaction"
+    amount = 0.0
+    if action == "update":
+        m = _UPDATE_AMOUNT_RE.search(text)
+        if m:
+            amount = _to_amount(m)
+    account, _, _, _ = _find_account(text)
+    confidence = 0.9 if "last" in text.split() else 0.6
+    return ExpenseParsed(
+        type=txn_type, action=action, amount=amount, account=account or "Cash"
+    ).model_dump(), confidence
+
+
+def _parse_transfer(text: str):
+    amounts = list(AMOUNT_RE.finditer(text))
+    route = _FROM_TO_RE.search(text)
+    if len(amounts) != 1 or not route:
+        return _unknown(), 0.3
+    rest = text[:route.start()] + " " + text[route.end():]
+    rest = _TRANSFER_RE.sub(" ", AMOUNT_RE.sub(" ", rest))
+    description = _describe(rest)
+    return ExpenseParsed(
+        type="transfer",
+        action="create",
+        amount=_to_amount(amounts[0]),
+        account=_account_name(route.group("dst")),
+        from_account=_account_name(route.group("src")),
+        description="Transfer" if description == "Miscellaneous" else description,
+    ).model_dump(), 0.95
+
+
+def _parse_transaction(text: str, txn_date: str):
+    amounts = list(AMOUNT_RE.finditer(text))
+    if not amounts:
+        return _unknown(), 0.0
+    if len(amounts) > 1:
+        return _unknown(), 0.3
+
+    amount = _to_amount(amounts[0])
+    rest = text[:amounts[0].start()] + " " + text[amounts[0].end():]
+
+    confidence = 1.0
+    account, span, prep, account_confidence = _find_account(rest)
+    if account:
+        rest = rest[:span[0]] + " " + rest[span[1]:]
+        confidence = min(confidence, account_confidence)
+
+    words = set(re.findall(r"[a-z]+", rest))
+    if words & (INCOME_WORDS | INCOME_NOUNS) and not words & EXPENSE_WORDS:
+        txn_type = "income"
+    elif words & EXPENSE_WORDS and not words & INCOME_WORDS:
+        txn_type = "expense"
+    elif words & EXPENSE_WORDS and words & INCOME_WORDS:
+        return _unknown(), 0.3
+    else:
+        category = categorize(rest)
+        if category in INCOME_CATEGORIES:
+            txn_type, confidence = "income", min(confidence, 0.85)
+        elif category != DEFAULT_CATEGORY or re.search(r"\b(?:on|for)\b", rest):
+            txn_type, confidence = "expense", min(confidence, 0.85)
+        else:
+            txn_type, confidence = "expense", min(confidence, 0.7)
+
+    # "from X" on an expense where X isn't a known account is probably an account we've never
+    # seen; let the LLM decide. For income, "from X" is just the source and belongs in the description.
+    other = _ACCOUNT_PHRASE_RE.search(rest)
+    if other and other.group("prep") in ("from", "in", "into", "via", "using", "through") and txn_type == "expense":
+        confidence = min(confidence, 0.6)
+
+    description = _describe(rest)
+    if len(description.split()) > 4:
+        confidence = min(confidence, 0.7)
+
+    return ExpenseParsed(
+        type=txn_type,
+        action="create",
+        amount=amount,
+        account=account or "Cash",
+        description=description,
+        date=txn_date,
+    ).model_dump(), confidence
+
+
+def parse_local(text: str, today: date = None):
+    """
+    Parse a chat message without calling the LLM.
+    Returns (parsed, confidence) where parsed has the ExpenseParsed shape and
+    confidence is in [0, 1]; callers fall back to Gemini below their threshold.
+    """
+    lowered = " ".join((text or "").lower().split()).strip(" .!?")
+    if not lowered:
+        return _unknown(), 0.0
+
+    if not AMOUNT_RE.search(_PERIOD_NUMBER_RE.sub(" ", lowered)):
+        for metric, pattern in _ANALYTICS_RES:
+            if pattern.search(lowered):
+                return ExpenseParsed(type="analytics", action="read", amount=0.0, metric=metric).model_dump(), 0.95
+
+    if _HISTORY_RE.search(lowered) and not _DELETE_RE.search(lowered) and not _UPDATE_RE.search(lowered):
+        return _parse_history(lowered)
+    if _DELETE_RE.search(lowered):
+        return _parse_delete_or_update(lowered, "delete")
+    if _UPDATE_RE.search(lowered):
+        return _parse_delete_or_update(lowered, "update")
+    if _TRANSFER_RE.search(lowered):
+        return _parse_transfer(lowered)
+
+    m = _ADJUST_RE.match(lowered)
+    if m and m.group("acc") not in FILLER_WORDS:
+        confidence = 0.95 if m.group("acc") in KNOWN_ACCOUNTS else 0.7
+        return ExpenseParsed(
+            type="balance_adjustment", action="update", amount=_to_amount(m), account=_account_name(m.group("acc"))
+        ).model_dump(), confidence
+
+    if _BALANCE_RE.search(lowered) and not AMOUNT_RE.search(lowered):
+        # A known account named anywhere ("hdfc balance"), else whatever follows "of/in/for".
+        account = _find_account(lowered)[0]
+        if account is None:
+            m = _BALANCE_OF_RE.search(lowered)
+            account = _account_name(m.group("acc")) if m else "Cash"
+        return ExpenseParsed(type="balance", action="read", amount=0.0, account=account).model_dump(), 0.95
+
+    txn_date, rest = extract_date(lowered, today)
+    return _parse_transaction(rest, txn_date)
+
+
+def normalize(text: str) -> str:
+    """Lower-cased, single-spaced, without trailing punctuation: how messages are compared."""
+    return " ".join((text or "").lower().split()).strip(" .!?")
+
+
+def split_items(text: str) -> list:
+    """Split a pasted list into entries; returns [text] unless every entry has an amount."""
+    segments = []
+    for piece in _ITEM_SPLIT_RE.split(text or ""):
+        piece = normalize(piece)
+        if not piece:
+            continue
+        parts = _AND_SPLIT_RE.split(piece)
+        if len(parts) > 1 and all(AMOUNT_RE.search(p) for p in parts):
+            segments.extend(parts)
+        else:
+            segments.append(piece)
+    if len(segments) < 2 or not all(AMOUNT_RE.search(s) for s in segments):
+        return [text]
+    return segments
+
+
+def names_account(text: str, today: date = None) -> bool:
+    """Whether text names its account, rather than leaving it to the default (or a list's last entry)."""
+    return _find_account(extract_date(text, today)[1])[0] is not None
+
+
+def parse_local_many(text: str, today: date = None):
+    """
+    parse_local for messages that may list several income/expenses, e.g.
+    "chai 20, auto 60, lunch 180 from hdfc". Returns (items, confidence) with one
+    parsed dict per entry and the lowest confidence among them. An account or date
+    that only the last entry mentions applies to every entry.
+    """
+    segments = split_items(text)
+    if len(segments) == 1:
+        parsed, confidence = parse_local(text, today)
+        return [parsed], confidence
+
+    items, confidence = [], 1.0
+    for segment in segments:
+        parsed, segment_confidence = parse_local(segment, today)
+        if parsed["type"] not in ("income", "expense") or parsed["action"] != "create":
+            return [_unknown()], 0.3
+        items.append(parsed)
+        confidence = min(confidence, segment_confidence)
+
+    named = [names_account(s, today) for s in segments]
+    if named[-1] and not any(named[:-1]):
+        for item in items[:-1]:
+            item["account"] = items[-1]["account"]
+    if items[-1]["date"] and not any(item["date"] for item in items[:-1]):
+        for item in items[:-1]:
+            item["date"] = items[-1]["date"]
+    return items, confidence
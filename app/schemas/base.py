@@ -0,0 +1,25 @@
+from typing import Optional, Literal
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class ExpenseParsed(BaseModel):
+    type: Literal["income", "expense", "transfer", "balance", "balance_adjustment", "transaction", "analytics", "unknown"]
+    action: Literal["create", "update", "delete", "read"]
+    amount: float
+    account: str = "Cash"
+    description: str = "Miscellaneous"
+    date: Optional[str] = None
+    from_account: Optional[str] = None
+    limit: Optional[int] = None
+    metric: Optional[Literal["summary", "categories", "daily", "balances", "monthly"]] = None
+
+class TimeRange(BaseModel):
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+class UpdateFields(BaseModel):
+    amount: Optional[float] = None
+    description: Optional[str] = None
+    type: Optional[Literal["income", "expense"]] = None
+    date: Optional[datetime] = None  # ISO format
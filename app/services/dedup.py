@@ -0,0 +1,112 @@
+import os
+from collections import deque
+from datetime import datetime, timedelta
+import pytz
+from dotenv import load_dotenv
+from sqlalchemy import delete
+from app.db import models
+from app.db.session import AsyncSessionLocal
+
+load_dotenv()
+
+UPDATE_DEDUP_SIZE = int(os.getenv("UPDATE_DEDUP_SIZE", "10000"))
+UPDATE_DEDUP_PERSIST = os.getenv("UPDATE_DEDUP_PERSIST", "0") == "1"
+UPDATE_DEDUP_RETENTION_HOURS = int(os.getenv("UPDATE_DEDUP_RETENTION_HOURS", "48"))  # Telegram gives up after ~24h
+
+
+class RecentIds:
+    """Fixed-size ring buffer of ids with O(1) membership checks."""
+
+    def __init__(self, capacity: int = UPDATE_DEDUP_SIZE):
+        self._order = deque()
+        self._members = set()
+        self.capacity = capacity
+
+    def add(self, item) -> bool:
+        """Remember item; return False if it was already there."""
+        if item in self._members:
+            return False
+        if len(self._order) >= self.capacity:
+            self._members.discard(self._order.popleft())
+        self._order.append(item)
+        self._members.add(item)
+        return True
+
+    def discard(self, item):
+        # Left in _order, which ages it out like any other entry.
+        self._members.discard(item)
+
+    def __contains__(self, item):
+        return item in self._members
+
+    def __len__(self):
+        return len(self._members)
+
+
+class UpdateDeduplicator:
+    def __init__(self, capacity: int = UPDATE_DEDUP_SIZE, persist: bool = UPDATE_DEDUP_PERSIST):
+        self.recent = RecentIds(capacity)
+        self.persist = persist
+        self.duplicates = 0
+        self._inserts_since_prune = 0
+
+    async def _claim_persistent(self, update_id: int) -> bool:
+        async with AsyncSessionLocal() as db:
+            dialect = db.bind.dialect.name
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            result = await db.execute(
+                insert(models.ProcessedUpdate).values(update_id=update_id).on_conflict_do_nothing()
+            )
+            await db.commit()
+            self._inserts_since_prune += 1
+            if self._inserts_since_prune >= 1000:
+                await self.prune(db)
+            return result.rowcount == 1
+
+    async def prune(self, db):
+        cutoff = datetime.now(pytz.utc) - timedelta(hours=UPDATE_DEDUP_RETENTION_HOURS)
+        await db.execute(delete(models.ProcessedUpdate).where(models.ProcessedUpdate.created_at < cutoff))
+        await db.commit()
+        self._inserts_since_prune = 0
+
+    async def is_new(self, update_id) -> bool:
+        """True the first time an update_id is seen; False for redeliveries."""
+        if update_id is None:
+            return True
+        if not self.recent.add(update_id):
+            self.duplicates += 1
+            return False
+        if self.persist:
+            try:
+                claimed = await self._claim_persistent(update_id)
+            except Exception:
+                # Telegram redelivers after the error; that mustn't look like a duplicate.
+                self.recent.discard(update_id)
+                raise
+            if not claimed:
+                self.duplicates += 1
+                return False
+        return True
+
+    async def release(self, update_id):
+        """Forget an update_id claimed by is_new, so Telegram's redelivery of it is handled."""
+        if update_id is None:
+            return
+        self.recent.discard(update_id)
+        if self.persist:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(models.ProcessedUpdate).where(models.ProcessedUpdate.update_id == update_id))
+                await db.commit()
+
+
+_deduplicator = None
+
+
+def get_deduplicator() -> UpdateDeduplicator:
+    global _deduplicator
+    if _deduplicator is None:
+        _deduplicator = UpdateDeduplicator()
+    return _deduplicator
@@ -0,0 +1,142 @@
+import asyncio
+import multiprocessing
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from app.services.telegram_client import get_telegram_client
+from app.services.log import get_logger
+from app.services.metrics import PDF_RENDER_SECONDS
+
+load_dotenv()
+
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+EXPORT_QUEUE_MAX = int(os.getenv("EXPORT_QUEUE_MAX", "20"))
+EXPORT_JOBS_KEPT = int(os.getenv("EXPORT_JOBS_KEPT", "1000"))
+
+logger = get_logger("app.export")
+
+
+def _render(user_id: int, start: str = None, end: str = None) -> bytes:
+    # Runs in the worker processes, so only they import fpdf2; the web process never does.
+    from app.utils.generate_pdf import render_pdf_report
+
+    return render_pdf_report(user_id, start, end)
+
+
+def _load_renderer():
+    import app.utils.generate_pdf  # noqa: F401
+
+
+class ExportQueueFull(Exception):
+    pass
+
+
+class ExportJob:
+    def __init__(self, user_id: int, chat_id, start: str = None, end: str = None):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.start = start
+        self.end = end
+        self.status = "queued"  # queued -> rendering -> sending -> done | failed
+        self.error = None
+        self.size = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def file_name(self) -> str:
+        start = (self.start or "")[:10] or "last30"
+        end = (self.end or "")[:10] or "today"
+        return f"report_{start}_{end}.pdf"
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "start": self.start,
+            "end": self.end,
+            "size": self.size,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ExportJobManager:
+    """
+    Renders PDF exports in a process pool so fpdf2's CPU work never runs on the
+    event loop, and sends the result with sendDocument when it is ready. At most
+    max_pending exports are queued or running at once.
+    """
+
+    def __init__(self, workers: int = EXPORT_WORKERS, max_pending: int = EXPORT_QUEUE_MAX):
+        # spawn: forking a process that already runs an event loop and DB pools isn't safe.
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self.workers = workers
+        self.max_pending = max_pending
+        self.jobs = OrderedDict()
+        self.pending = 0
+        self._tasks = set()
+
+    def submit(self, user_id: int, chat_id, start: str = None, end: str = None) -> ExportJob:
+        if self.pending >= self.max_pending:
+            raise ExportQueueFull(f"{self.pending} exports pending")
+        job = ExportJob(user_id, chat_id, start, end)
+        self.jobs[job.id] = job
+        while len(self.jobs) > EXPORT_JOBS_KEPT:
+            self.jobs.popitem(last=False)
+        self.pending += 1
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: ExportJob):
+        loop = asyncio.get_running_loop()
+        try:
+            job.status = "rendering"
+            with PDF_RENDER_SECONDS.time():
+                pdf_bytes = await loop.run_in_executor(self.pool, _render, job.user_id, job.start, job.end)
+            job.size = len(pdf_bytes)
+            job.status = "sending"
+            await get_telegram_client().send_document(job.chat_id, pdf_bytes, job.file_name, caption="📄 Expense Report")
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.exception("Export job error", extra={"job_id": job.id})
+        finally:
+            job.finished_at = time.time()
+            self.pending -= 1
+
+    async def warm(self):
+        """Start every worker process and load the PDF renderer in it ahead of the first export."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _load_renderer) for _ in range(self.workers)))
+
+    def get(self, job_id: str) -> ExportJob:
+        return self.jobs.get(job_id)
+
+    async def shutdown(self, timeout: float = 30):
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=timeout)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+_manager = None
+
+
+def get_export_manager() -> ExportJobManager:
+    global _manager
+    if _manager is None:
+        _manager = ExportJobManager()
+    return _manager
+
+
+def set_export_manager(manager: ExportJobManager):
+    global _manager
+    _manager = manager
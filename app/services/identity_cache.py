@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import os
+from dotenv import load_dotenv
+from app.services.log import get_logger
+from app.utils.parse_cache import MemoryBackend, SqlBackend
+
+load_dotenv()
+logger = get_logger("app.identity_cache")
+
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))  # users kept per process
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "3600"))
+IDENTITY_CACHE_URL = os.getenv("IDENTITY_CACHE_URL")  # e.g. the Postgres URL, to share entries between workers
+
+
+class IdentityCache:
+    """
+    telegram_id -> user id and, per user, upper-cased account name -> account id, per
+    process and optionally in a shared SQL table for several workers. Only rows that
+    exist are cached, and users and accounts are never renamed or deleted, so an entry
+    can't go stale: an account created by another worker is found in the database on
+    the first miss.
+    """
+
+    def __init__(self, max_users: int = IDENTITY_CACHE_SIZE, ttl: float = IDENTITY_CACHE_TTL, shared_url: str = IDENTITY_CACHE_URL):
+        self.ttl = ttl
+        self.local = MemoryBackend(max_users * 2)  # one user entry plus one account map per user
+        self.shared = SqlBackend(shared_url, "identity_cache") if shared_url else None
+        self.user_hits = 0
+        self.user_misses = 0
+        self.account_hits = 0
+        self.account_misses = 0
+        self.shared_hits = 0
+
+    @staticmethod
+    def _shared_key(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()  # account names can be longer than the key column
+
+    async def _get_shared(self, key: str):
+        try:
+            value = await asyncio.to_thread(self.shared.get, self._shared_key(key))
+        except Exception as e:
+            logger.warning("Identity cache read error", extra={"error": repr(e)})
+            return None
+        if value is not None:
+            self.shared_hits += 1
+        return value
+
+    async def _set_shared(self, key: str, value: int):
+        try:
+            await asyncio.to_thread(self.shared.set, self._shared_key(key), value, self.ttl)
+        except Exception as e:
+            logger.warning("Identity cache write error", extra={"error": repr(e)})
+
+    async def get_user(self, telegram_id: str):
+        user_id = self.local.get(f"user:{telegram_id}")
+        if user_id is None and self.shared:
+            user_id = await self._get_shared(f"user:{telegram_id}")
+            if user_id is not None:
+                self.local.set(f"user:{telegram_id}", user_id, self.ttl)
+        if user_id is None:
+            self.user_misses += 1
+        else:
+            self.user_hits += 1
+        return user_id
+
+    async def set_user(self, telegram_id: str, user_id: int):
+        self.local.set(f"user:{telegram_id}", user_id, self.ttl)
+        if self.shared:
+            await self._set_shared(f"user:{telegram_id}", user_id)
+
+    async def get_account(self, user_id: int, name: str):
+        name = name.upper()
+        accounts = self.local.get(f"accounts:{user_id}") or {}
+        account_id = accounts.get(name)
+        if account_id is None and self.shared:
+            # One shared row per account, so workers adding accounts don't overwrite each other's.
+            account_id = await self._get_shared(f"account:{user_id}:{name}")
+            if account_id is not None:
+                self._remember_account(user_id, name, account_id)
+        if account_id is None:
+            self.account_misses += 1
+        else:
+            self.account_hits += 1
+        return account_id
+
+    def _remember_account(self, user_id: int, name: str, account_id: int):
+        accounts = self.local.get(f"accounts:{user_id}") or {}
+        accounts[name] = account_id
+        self.local.set(f"accounts:{user_id}", accounts, self.ttl)
+
+    async def set_account(self, user_id: int, name: str, account_id: int):
+        name = name.upper()
+        self._remember_account(user_id, name, account_id)
+        if self.shared:
+            await self._set_shared(f"account:{user_id}:{name}", account_id)
+
+    def stats(self) -> dict:
+        users = self.user_hits + self.user_misses
+        accounts = self.account_hits + self.account_misses
+        return {
+            "user_hits": self.user_hits,
+            "user_misses": self.user_misses,
+            "user_hit_ratio": self.user_hits / users if users else 0.0,
+            "account_hits": self.account_hits,
+            "account_misses": self.account_misses,
+            "account_hit_ratio": self.account_hits / accounts if accounts else 0.0,
+            "shared_hits": self.shared_hits,
+            "size": len(self.local),
+            "evictions": self.local.evictions,
+            "shared": self.shared is not None,
+        }
+
+
+_cache = None
+
+
+def get_identity_cache() -> IdentityCache:
+    global _cache
+    if _cache is None:
+        _cache = IdentityCache()
+    return _cache
+
+
+def set_identity_cache(cache: IdentityCache):
+    global _cache
+    _cache = cache
@@ -0,0 +1,90 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Users' message text stays out of the logs unless this is set.
+LOG_MESSAGE_TEXT = os.getenv("LOG_MESSAGE_TEXT", "0") == "1"
+
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, then any fields passed as extra=."""
+
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname, "logger": record.name, "msg": record.getMessage()}
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS})
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        elif record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread; when the queue is full the record is dropped, never waited on."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+_handler = None
+
+
+def setup_logging():
+    """Send the app.* loggers through a bounded queue to a writer thread, so logging never blocks the event loop."""
+    global _listener, _handler
+    if _listener:
+        return
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    _handler = DroppingQueueHandler(log_queue)
+    logger = logging.getLogger("app")
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Flush what is queued and stop the writer thread."""
+    global _listener, _handler
+    if _listener:
+        _listener.stop()
+        logging.getLogger("app").removeHandler(_handler)
+        _listener = _handler = None
+
+
+def dropped() -> int:
+    return _handler.dropped if _handler else 0
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
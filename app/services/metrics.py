@@ -0,0 +1,138 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# A small in-process registry rendered in the Prometheus text format at /metrics.
+# Metrics are safe to update from worker threads (statement imports, crud under to_thread).
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values) -> str:
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(labels.get(n, "") for n in self.labels), 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{_label_text(self.labels, key)} {_number(v)}" for key, v in items]
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram. time() fills in an "outcome" label (ok/error) when the histogram has one."""
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 2)
+            if slot < len(self.buckets):
+                values[slot] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        began = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            if "outcome" in self.labels:
+                labels["outcome"] = outcome
+            self.observe(time.perf_counter() - began, **labels)
+
+    def count(self, **labels) -> int:
+        values = self._values.get(tuple(labels.get(n, "") for n in self.labels))
+        return values[-1] if values else 0
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(values)) for key, values in self._values.items())
+        for key, values in items:
+            cumulative = 0
+            for bound, hits in zip(self.buckets + (float("inf"),), values[:-2] + [values[-1] - sum(values[:-2])]):
+                cumulative += hits
+                labels = _label_text(self.labels + ("le",), key + (_number(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_number(values[-2])}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {values[-1]}")
+        return lines
+
+
+class Gauge:
+    """A value read when /metrics is scraped, e.g. a queue's depth."""
+
+    def __init__(self, name: str, help: str, read):
+        self.name, self.help, self.read = name, help, read
+        _registry.append(self)
+
+    def render(self) -> list:
+        try:
+            value = self.read()
+        except Exception:
+            return []
+        if value is None:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {_number(value)}"]
+
+
+def render() -> str:
+    lines = []
+    for metric in list(_registry):
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+UPDATES = Counter("bot_updates_total", "Updates handled, by parsed type and action.", ("type", "action"))
+PARSES = Counter("bot_parse_total", "Messages parsed, by where the answer came from (local, cache, llm, error).", ("source",))
+UPDATE_SECONDS = Histogram("bot_update_seconds", "Time to handle one update, queue pickup to reply queued.", ("outcome",))
+LLM_SECONDS = Histogram("bot_llm_seconds", "Gemini call latency per nlp function.", ("function", "outcome"))
+DB_SECONDS = Histogram("bot_db_seconds", "Time spent in each crud function.", ("function",))
+PDF_RENDER_SECONDS = Histogram("bot_pdf_render_seconds", "PDF export render time.", ("outcome",))
+TELEGRAM_SECONDS = Histogram("bot_telegram_seconds", "Bot API call latency, retries included.", ("method", "outcome"))
+DB_STATEMENTS = Histogram(
+    "bot_db_statements", "SQL statements per profiled crud call or update.", ("scope",), buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50, 100)
+)
+DB_BUDGET_EXCEEDED = Counter("bot_db_budget_exceeded_total", "Profiled crud calls or updates over their statement budget.", ("scope",))
+DB_REPEATED_STATEMENTS = Counter("bot_db_repeated_statements_total", "Updates that ran one statement N+1 style.", ("scope",))
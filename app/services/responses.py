@@ -0,0 +1,78 @@
+from app.utils.indian_format import format_inr
+
+MONTHLY_REPLY_LIMIT = 12  # most recent months shown in a chat reply
+
+
+def _period(ledger) -> str:
+    return f"{ledger.start_day.strftime('%d %b %Y')} – {ledger.end_day.strftime('%d %b %Y')}"
+
+
+def format_summary(ledger) -> str:
+    s = ledger.summary()
+    lines = [
+        f"<b>Summary</b> <i>({_period(ledger)})</i>\n",
+        f"Spent: <b>{format_inr(s['spent_paise'])}</b>",
+        f"Earned: <b>{format_inr(s['earned_paise'])}</b>",
+        f"Net: <b>{format_inr(s['net_paise'])}</b>",
+        f"Average per day: {format_inr(s['average_daily_spend_paise'])}",
+    ]
+    if s["top_categories"]:
+        top = ", ".join(f"{c['category']} {format_inr(c['spent_paise'])}" for c in s["top_categories"])
+        lines.append(f"Top categories: {top}")
+    return "\n".join(lines)
+
+
+def format_categories(ledger) -> str:
+    rows = ledger.category_totals()
+    if not rows:
+        return f"No spending found <i>({_period(ledger)})</i>."
+    lines = [
+        f"• {c['category']}: <b>{format_inr(c['spent_paise'])}</b> ({c['share'] * 100:.1f}%, {c['count']} txns)"
+        for c in rows
+    ]
+    return f"<b>Spending by category</b> <i>({_period(ledger)})</i>\n\n" + "\n".join(lines)
+
+
+def format_daily(ledger) -> str:
+    d = ledger.daily()
+    lines = [
+        f"<b>Daily spending</b> <i>({_period(ledger)})</i>\n",
+        f"Average: <b>{format_inr(d['average_daily_spend_paise'])}</b>",
+        f"Median: {format_inr(d['median_daily_spend_paise'])}",
+    ]
+    if d["max_day"]:
+        lines.append(f"Highest: {format_inr(max(d['spent_paise']))} on {d['max_day']}")
+    return "\n".join(lines)
+
+
+def format_balances(ledger) -> str:
+    b = ledger.running_balances()
+    if not b["accounts"]:
+        return "No accounts yet."
+    lines = []
+    for name, closing in b["accounts"].items():
+        low = min(range(len(closing)), key=closing.__getitem__)
+        lines.append(
+            f"• <b>{name}</b>: {format_inr(closing[0])} → {format_inr(closing[-1])}"
+            f" <i>(lowest {format_inr(closing[low])} on {b['days'][low]})</i>"
+        )
+    return f"<b>Balances</b> <i>({_period(ledger)})</i>\n\n" + "\n".join(lines)
+
+
+def format_monthly(ledger) -> str:
+    lines = []
+    for m in ledger.monthly()[-MONTHLY_REPLY_LIMIT:]:
+        line = f"• {m['month']}: spent <b>{format_inr(m['spent_paise'])}</b>, earned {format_inr(m['earned_paise'])}"
+        if m["spent_change"] is not None:
+            line += f" <i>({m['spent_change'] * 100:+.1f}%)</i>"
+        lines.append(line)
+    return f"<b>Month over month</b> <i>({_period(ledger)})</i>\n\n" + "\n".join(lines)
+
+
+FORMATTERS = {
+    "summary": format_summary,
+    "categories": format_categories,
+    "daily": format_daily,
+    "balances": format_balances,
+    "monthly": format_monthly,
+}
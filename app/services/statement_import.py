@@ -0,0 +1,170 @@
+import asyncio
+import itertools
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from dotenv import load_dotenv
+from app.db.session import SessionLocal
+from app.db import crud
+from app.services.telegram_client import get_telegram_client
+from app.services.log import get_logger
+from app.utils.indian_format import format_inr
+from app.utils.statement_parser import iter_statement, StatementError
+
+load_dotenv()
+
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(20 * 2**20)))  # bots can't download more than 20 MB
+IMPORT_QUEUE_MAX = int(os.getenv("IMPORT_QUEUE_MAX", "5"))
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "1"))
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+IMPORT_PROGRESS_INTERVAL = float(os.getenv("IMPORT_PROGRESS_INTERVAL", "5"))  # seconds between progress replies
+IMPORT_JOBS_KEPT = int(os.getenv("IMPORT_JOBS_KEPT", "1000"))
+IMPORT_SPOOL_BYTES = 2**20  # downloads bigger than this go to a temp file
+
+logger = get_logger("app.import")
+
+
+class ImportQueueFull(Exception):
+    pass
+
+
+class ImportJob:
+    def __init__(self, user_id: int, chat_id, account: str, file_id: str, file_name: str = None):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.account = account
+        self.file_id = file_id
+        self.file_name = file_name
+        self.status = "queued"  # queued -> downloading -> importing -> done | failed
+        self.error = None
+        self.size = None
+        self.processed = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.net_paise = 0
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "account": self.account,
+            "file_name": self.file_name,
+            "size": self.size,
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "net_paise": self.net_paise,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ImportJobManager:
+    """
+    Imports bank statements sent as documents. The file is streamed to a spooled temp
+    file, then parsed and inserted in chunks on a worker thread (crud.import_transactions),
+    so memory stays bounded by the chunk size. Progress is posted back to the chat.
+    """
+
+    def __init__(self, workers: int = IMPORT_WORKERS, max_pending: int = IMPORT_QUEUE_MAX):
+        self.slots = asyncio.Semaphore(workers)
+        self.max_pending = max_pending
+        self.jobs = OrderedDict()
+        self.pending = 0
+        self._tasks = set()
+
+    def submit(self, user_id: int, chat_id, account: str, file_id: str, file_name: str = None) -> ImportJob:
+        if self.pending >= self.max_pending:
+            raise ImportQueueFull(f"{self.pending} imports pending")
+        job = ImportJob(user_id, chat_id, account, file_id, file_name)
+        self.jobs[job.id] = job
+        while len(self.jobs) > IMPORT_JOBS_KEPT:
+            self.jobs.popitem(last=False)
+        self.pending += 1
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: ImportJob):
+        telegram = get_telegram_client()
+        try:
+            async with self.slots:
+                with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as fileobj:
+                    job.status = "downloading"
+                    job.size = await telegram.download_file(job.file_id, fileobj, IMPORT_MAX_BYTES)
+                    job.status = "importing"
+                    await asyncio.to_thread(self._import, job, fileobj, asyncio.get_running_loop())
+            job.status = "done"
+            reply = (
+                f"✅ Imported <b>{job.inserted}</b> transactions into {job.account}"
+                f" <i>(net {format_inr(job.net_paise)})</i>."
+            )
+            if job.duplicates:
+                reply += f"\nSkipped {job.duplicates} already recorded."
+        except StatementError as e:
+            job.status, job.error = "failed", str(e)
+            reply = f"Couldn't import {job.file_name or 'that file'}: {e}"
+        except Exception as e:
+            job.status, job.error = "failed", str(e)
+            logger.exception("Import job error", extra={"job_id": job.id})
+            reply = f"Couldn't import {job.file_name or 'that file'}. Nothing was saved."
+        finally:
+            job.finished_at = time.time()
+            self.pending -= 1
+        telegram.send_message(job.chat_id, reply)
+
+    def _import(self, job: ImportJob, fileobj, loop: asyncio.AbstractEventLoop):
+        last_report = time.monotonic()
+
+        def progress(processed, inserted, duplicates):
+            nonlocal last_report
+            job.processed, job.inserted, job.duplicates = processed, inserted, duplicates
+            if time.monotonic() - last_report >= IMPORT_PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                loop.call_soon_threadsafe(
+                    get_telegram_client().send_message, job.chat_id, f"⏳ Importing… {processed} rows read."
+                )
+
+        rows = iter_statement(fileobj, job.file_name)
+        first = next(rows, None)  # reads the header, so a bad file fails before anything is created
+        if first is None:
+            raise StatementError("No transactions found in it.")
+        with SessionLocal() as db:
+            account = crud.get_account_by_name(db, job.user_id, job.account)
+            if account is None:
+                account = crud.create_account(db, job.user_id, job.account, 0)
+            job.account = account.name
+            result = crud.import_transactions(
+                db, account.id, itertools.chain([first], rows), IMPORT_CHUNK_SIZE, progress
+            )
+        job.processed, job.inserted, job.duplicates = result["processed"], result["inserted"], result["duplicates"]
+        job.net_paise = result["net_paise"]
+
+    def get(self, job_id: str) -> ImportJob:
+        return self.jobs.get(job_id)
+
+    async def shutdown(self, timeout: float = 30):
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=timeout)
+
+
+_manager = None
+
+
+def get_import_manager() -> ImportJobManager:
+    global _manager
+    if _manager is None:
+        _manager = ImportJobManager()
+    return _manager
+
+
+def set_import_manager(manager: ImportJobManager):
+    global _manager
+    _manager = manager
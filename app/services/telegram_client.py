@@ -0,0 +1,231 @@
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+import httpx
+from app.services.log import get_logger
+from app.services.metrics import TELEGRAM_SECONDS
+from app.services.tracing import timed
+
+load_dotenv()
+
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+# Telegram allows about one message per second in a chat and ~30 per second overall.
+TELEGRAM_CHAT_INTERVAL = float(os.getenv("TELEGRAM_CHAT_INTERVAL", "1.0"))
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT", "30"))
+
+MAX_MESSAGE_LENGTH = 4096
+
+logger = get_logger("app.telegram")
+
+
+class TelegramError(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _Outbox:
+    def __init__(self):
+        self.messages = []  # (text, parse_mode, reply_markup, future)
+        self.task = None
+
+
+class TelegramClient:
+    """
+    Outbound Bot API client sharing one pooled HTTP/2 connection.
+    Replies are rate limited per chat and globally, retried on 429 using
+    retry_after, and replies that pile up for one chat are sent as one message.
+    """
+
+    def __init__(
+        self,
+        token: str = TELEGRAM_BOT_TOKEN,
+        api_url: str = TELEGRAM_API_URL,
+        chat_interval: float = TELEGRAM_CHAT_INTERVAL,
+        global_rate: float = TELEGRAM_GLOBAL_RATE,
+        max_retries: int = TELEGRAM_MAX_RETRIES,
+        transport: httpx.AsyncBaseTransport = None,
+    ):
+        self.file_url = f"{api_url}/file/bot{token}"
+        self.http = httpx.AsyncClient(
+            base_url=f"{api_url}/bot{token}",
+            http2=transport is None,
+            transport=transport,
+            timeout=TELEGRAM_TIMEOUT,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+        )
+        self.chat_interval = chat_interval
+        self.bucket = TokenBucket(global_rate)
+        self.max_retries = max_retries
+        self._outboxes = {}
+        self._next_send_at = {}  # chat_id -> monotonic time the chat may next be written to
+        self.sent = 0
+        self.coalesced = 0
+        self.throttled = 0
+
+    async def call(self, method: str, **kwargs) -> dict:
+        with timed(f"telegram.{method}", TELEGRAM_SECONDS, method=method):
+            return await self._call(method, **kwargs)
+
+    async def _call(self, method: str, **kwargs) -> dict:
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            response = await self.http.post(f"/{method}", **kwargs)
+            if response.status_code == 429 and attempt < self.max_retries:
+                self.throttled += 1
+                retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+                await asyncio.sleep(retry_after)
+                continue
+            body = response.json()
+            if not body.get("ok"):
+                raise TelegramError(f"{method} failed: {body.get('description', response.status_code)}")
+            return body.get("result")
+
+    async def _wait_for_chat(self, chat_id):
+        now = time.monotonic()
+        if len(self._next_send_at) > 10000:
+            self._next_send_at = {c: t for c, t in self._next_send_at.items() if t > now}
+        send_at = max(now, self._next_send_at.get(chat_id, 0.0))
+        self._next_send_at[chat_id] = send_at + self.chat_interval
+        if send_at > now:
+            await asyncio.sleep(send_at - now)
+
+    def send_message(self, chat_id, text: str, parse_mode: str = "HTML", reply_markup: dict = None) -> asyncio.Future:
+        """
+        Queue a reply and return at once; the returned future resolves once it is sent.
+        Messages with a keyboard are never merged with others.
+        """
+        future = asyncio.get_running_loop().create_future()
+        outbox = self._outboxes.setdefault(chat_id, _Outbox())
+        outbox.messages.append((text, parse_mode, reply_markup, future))
+        if outbox.task is None or outbox.task.done():
+            outbox.task = asyncio.create_task(self._drain(chat_id, outbox))
+        return future
+
+    def _take_batch(self, outbox: _Outbox):
+        text, parse_mode, reply_markup, future = outbox.messages.pop(0)
+        texts, futures = [text], [future]
+        while reply_markup is None and outbox.messages:
+            next_text, next_mode, next_markup, next_future = outbox.messages[0]
+            joined = sum(len(t) + 2 for t in texts) + len(next_text)
+            if next_markup is not None or next_mode != parse_mode or joined > MAX_MESSAGE_LENGTH:
+                break
+            outbox.messages.pop(0)
+            texts.append(next_text)
+            futures.append(next_future)
+        return "\n\n".join(texts), parse_mode, reply_markup, futures
+
+    async def _drain(self, chat_id, outbox: _Outbox):
+        while outbox.messages:
+            await self._wait_for_chat(chat_id)
+            text, parse_mode, reply_markup, futures = self._take_batch(outbox)
+            self.coalesced += len(futures) - 1
+            payload = {"chat_id": chat_id, "text": text, "parse_mode": parse_mode}
+            if reply_markup:
+                payload["reply_markup"] = reply_markup
+            try:
+                result = await self.call("sendMessage", json=payload)
+                self.sent += 1
+                for future in futures:
+                    future.set_result(result)
+            except Exception as e:
+                logger.warning("Telegram sendMessage error", extra={"chat_id": chat_id, "error": repr(e)})
+                for future in futures:
+                    future.set_exception(e)
+                    future.exception()  # callers may not await; don't warn about it
+        self._outboxes.pop(chat_id, None)
+
+    async def edit_message(self, chat_id, message_id: int, text: str, parse_mode: str = "HTML", reply_markup: dict = None) -> dict:
+        await self._wait_for_chat(chat_id)
+        payload = {"chat_id": chat_id, "message_id": message_id, "text": text, "parse_mode": parse_mode}
+        if reply_markup:
+            payload["reply_markup"] = reply_markup
+        return await self.call("editMessageText", json=payload)
+
+    async def answer_callback_query(self, callback_query_id: str, text: str = None) -> dict:
+        """Stop the button's loading spinner; Telegram expects this for every callback query."""
+        payload = {"callback_query_id": callback_query_id}
+        if text:
+            payload["text"] = text
+        return await self.call("answerCallbackQuery", json=payload)
+
+    async def send_document(self, chat_id, document, filename: str, caption: str = None) -> dict:
+        await self._wait_for_chat(chat_id)
+        data = {"chat_id": chat_id}
+        if caption:
+            data["caption"] = caption
+        return await self.call("sendDocument", data=data, files={"document": (filename, document)})
+
+    async def download_file(self, file_id: str, fileobj, max_bytes: int = None) -> int:
+        """Stream a file the user sent into fileobj (rewound afterwards) and return its size."""
+        info = await self.call("getFile", json={"file_id": file_id})
+        if max_bytes and (info.get("file_size") or 0) > max_bytes:
+            raise TelegramError(f"file is {info['file_size']} bytes, limit is {max_bytes}")
+        size = 0
+        async with self.http.stream("GET", f"{self.file_url}/{info['file_path']}") as response:
+            if response.status_code != 200:
+                raise TelegramError(f"file download failed: {response.status_code}")
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise TelegramError(f"file is over the {max_bytes} byte limit")
+                fileobj.write(chunk)
+        fileobj.seek(0)
+        return size
+
+    async def flush(self, timeout: float = 10):
+        tasks = [o.task for o in self._outboxes.values() if o.task and not o.task.done()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    async def close(self):
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Telegram flush error")
+        await self.http.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "throttled": self.throttled,
+            "chats_pending": sum(1 for o in self._outboxes.values() if o.messages),
+        }
+
+
+_client = None
+
+
+def get_telegram_client() -> TelegramClient:
+    global _client
+    if _client is None:
+        _client = TelegramClient()
+    return _client
+
+
+def set_telegram_client(client: TelegramClient):
+    global _client
+    _client = client
@@ -0,0 +1,118 @@
+import contextvars
+import functools
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from app.services.log import get_logger
+
+try:  # spans are also exported through OpenTelemetry when it is installed and configured
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "0"))  # only log root spans slower than this
+
+logger = get_logger("app.trace")
+_current = contextvars.ContextVar("current_span", default=None)
+_tracer = otel_trace.get_tracer("finance-bot") if otel_trace else None
+
+
+class Span:
+    __slots__ = ("name", "attrs", "trace_id", "parent", "children", "start", "end", "error")
+
+    def __init__(self, name: str, attrs: dict, parent: "Span" = None):
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.children = []
+        self.start = time.perf_counter()
+        self.end = None
+        self.error = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def breakdown(self) -> dict:
+        """Milliseconds spent per span name under this one, e.g. {"llm.parse_message": 812.4, "db.add_transaction": 9.1}."""
+        totals = {}
+        stack = list(self.children)
+        while stack:
+            child = stack.pop()
+            totals[child.name] = round(totals.get(child.name, 0) + child.duration_ms, 2)
+            stack.extend(child.children)
+        return totals
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Time a block as a child of the current span. A span with no parent (one per update)
+    logs its duration with a per-name breakdown of everything under it when it ends.
+    Children that are still running when their parent ends, such as replies sent in the
+    background, are left out of the parent's breakdown.
+    """
+    parent = _current.get()
+    current = Span(name, attrs, parent)
+    token = _current.set(current)
+    otel = _tracer.start_as_current_span(name, attributes=attrs) if _tracer else None
+    if otel:
+        otel.__enter__()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        if otel:
+            otel.__exit__(type(e), e, e.__traceback__)
+            otel = None
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current.reset(token)
+        if otel:
+            otel.__exit__(None, None, None)
+        if parent is not None:
+            if parent.end is None:
+                parent.children.append(current)
+        elif current.duration_ms >= TRACE_SLOW_MS:
+            logger.info(f"{name} handled", extra={
+                **current.attrs,
+                "trace_id": current.trace_id,
+                "duration_ms": round(current.duration_ms, 2),
+                "breakdown_ms": current.breakdown(),
+                "error": current.error,
+            })
+
+
+def set_attributes(**attrs):
+    """Add attributes to the current span, e.g. the intent once the message is parsed."""
+    current = _current.get()
+    if current is not None:
+        current.attrs.update(attrs)
+    if otel_trace:
+        otel_trace.get_current_span().set_attributes({k: v for k, v in attrs.items() if v is not None})
+
+
+@contextmanager
+def timed(name: str, histogram, **labels):
+    """A span that also records its duration in a metrics histogram."""
+    with span(name, **labels), histogram.time(**labels):
+        yield
+
+
+def timed_calls(histogram, prefix: str):
+    """Decorator factory: time each call into histogram under function=<name>, as a "<prefix>.<name>" span."""
+
+    def decorate(fn):
+        name = f"{prefix}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(name, histogram, function=fn.__name__):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,136 @@
+import numpy as np
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import crud
+
+# Not spending or earning: moving money between accounts and correcting balances.
+EXCLUDED_CATEGORIES = (crud.TRANSFER_CATEGORY, crud.ADJUSTMENT_CATEGORY)
+
+
+class Ledger:
+    """
+    A user's transactions for a date range, summed per day, account, type and category,
+    as NumPy columns, plus what is needed to turn them into balances. Every metric is a
+    handful of bincount/cumsum calls over these arrays; amounts stay int64 paise throughout.
+    """
+
+    def __init__(self, rows, start: datetime, end: datetime, accounts, net_since_start: dict):
+        self.start_day = crud.local_day(start)
+        self.end_day = crud.local_day(end)
+        self.n_days = (self.end_day - self.start_day).days + 1
+
+        # rows are crud.get_daily_totals' cells, a few per active day rather than one per
+        # transaction; zip, dict.fromkeys and map run in C, so no Python code runs per cell.
+        days, account_ids, income, categories, amounts, counts = zip(*rows) if rows else ((),) * 6
+        self.day = np.array(days, dtype=np.int64) - (self.start_day - crud.EPOCH_DAY).days
+        self.amount = np.array(amounts, dtype=np.int64)
+        self.count = np.array(counts, dtype=np.int64)
+        income = np.array(income, dtype=bool)
+        self.signed = np.where(income, self.amount, -self.amount)
+        codes = {name: i for i, name in enumerate(dict.fromkeys(categories))}
+        self.category = np.fromiter(map(codes.__getitem__, categories), dtype=np.int64, count=len(categories))
+        self.category_names = np.array(list(codes), dtype=str)
+        counted = ~np.isin(self.category_names, EXCLUDED_CATEGORIES)[self.category] if len(rows) else np.zeros(0, dtype=bool)
+        self.spend = counted & ~income
+        self.earn = counted & income
+
+        self.account_names = {a.id: a.name for a in accounts}
+        self.account_ids = np.array(sorted(self.account_names), dtype=np.int64)
+        self.account = np.searchsorted(self.account_ids, np.array(account_ids, dtype=np.int64))
+        # Balance at the start of the range: today's balance minus everything since.
+        self.opening = np.array(
+            [a.balance_paise - net_since_start.get(a.id, 0) for a in sorted(accounts, key=lambda a: a.id)],
+            dtype=np.int64,
+        )
+
+    def _by_day(self, mask) -> np.ndarray:
+        return np.bincount(self.day[mask], weights=self.amount[mask], minlength=self.n_days).round().astype(np.int64)
+
+    def _days(self):
+        return [(self.start_day + timedelta(days=i)).isoformat() for i in range(self.n_days)]
+
+    def category_totals(self) -> list:
+        spent = np.bincount(self.category[self.spend], weights=self.amount[self.spend], minlength=len(self.category_names)).round().astype(np.int64)
+        counts = np.bincount(self.category[self.spend], weights=self.count[self.spend], minlength=len(self.category_names)).astype(np.int64)
+        total = int(spent.sum())
+        order = np.argsort(-spent, kind="stable")
+        return [
+            {"category": str(self.category_names[i]), "spent_paise": int(spent[i]), "count": int(counts[i]),
+             "share": round(float(spent[i] / total), 4) if total else 0.0}
+            for i in order if counts[i]
+        ]
+
+    def daily(self) -> dict:
+        spent, earned = self._by_day(self.spend), self._by_day(self.earn)
+        return {
+            "days": self._days(),
+            "spent_paise": spent.tolist(),
+            "earned_paise": earned.tolist(),
+            "average_daily_spend_paise": int(round(spent.sum() / self.n_days)),
+            "median_daily_spend_paise": int(np.median(spent)),
+            "max_day": self._days()[int(spent.argmax())] if spent.any() else None,
+        }
+
+    def running_balances(self) -> dict:
+        """Closing balance of every account on every day of the range."""
+        n_accounts = len(self.account_ids)
+        cell = self.day * n_accounts + self.account
+        moves = np.bincount(cell, weights=self.signed, minlength=self.n_days * n_accounts).round().astype(np.int64)
+        closing = moves.reshape(self.n_days, n_accounts).cumsum(axis=0) + self.opening
+        return {
+            "days": self._days(),
+            "accounts": {
+                self.account_names[int(account_id)]: closing[:, i].tolist()
+                for i, account_id in enumerate(self.account_ids)
+            },
+        }
+
+    def monthly(self) -> list:
+        """Spend and earnings per calendar month, with the change from the month before."""
+        first_month = np.datetime64(self.start_day, "M")
+        n_months = int(np.datetime64(self.end_day, "M") - first_month) + 1
+        month = ((np.datetime64(self.start_day, "D") + self.day).astype("datetime64[M]") - first_month).astype(np.int64)
+        spent = np.bincount(month[self.spend], weights=self.amount[self.spend], minlength=n_months).round().astype(np.int64)
+        earned = np.bincount(month[self.earn], weights=self.amount[self.earn], minlength=n_months).round().astype(np.int64)
+        delta = np.diff(spent, prepend=spent[:1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = np.where(np.roll(spent, 1) > 0, delta / np.roll(spent, 1), np.nan)
+        return [
+            {"month": str(first_month + i), "spent_paise": int(spent[i]), "earned_paise": int(earned[i]),
+             "spent_delta_paise": int(delta[i]) if i else None,
+             "spent_change": round(float(change[i]), 4) if i and not np.isnan(change[i]) else None}
+            for i in range(n_months)
+        ]
+
+    def summary(self) -> dict:
+        spent, earned = int(self.amount[self.spend].sum()), int(self.amount[self.earn].sum())
+        return {
+            "start": self.start_day.isoformat(),
+            "end": self.end_day.isoformat(),
+            "spent_paise": spent,
+            "earned_paise": earned,
+            "net_paise": earned - spent,
+            "transactions": int(self.count[self.spend].sum() + self.count[self.earn].sum()),
+            "average_daily_spend_paise": int(round(spent / self.n_days)),
+            "top_categories": self.category_totals()[:3],
+        }
+
+
+METRICS = {
+    "summary": Ledger.summary,
+    "categories": Ledger.category_totals,
+    "daily": Ledger.daily,
+    "balances": Ledger.running_balances,
+    "monthly": Ledger.monthly,
+}
+
+
+def load_ledger(db: Session, user_id: int, start_date: str = None, end_date: str = None) -> Ledger:
+    start, end = crud.date_range(start_date, end_date)
+    rows = crud.get_daily_totals(db, user_id, start, end)
+    return Ledger(rows, start, end, crud.get_all_balances(db, user_id), crud.get_net_since(db, user_id, start))
+
+
+async def load_ledger_async(db: AsyncSession, user_id: int, start_date: str = None, end_date: str = None) -> Ledger:
+    return await db.run_sync(load_ledger, user_id, start_date, end_date)
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from dotenv import load_dotenv
+from sqlalchemy import select, delete
+from app.db import models
+from app.db.session import AsyncSessionLocal
+from app.services.log import get_logger
+
+load_dotenv()
+
+UPDATE_QUEUE_BACKEND = os.getenv("UPDATE_QUEUE_BACKEND", "memory")  # memory | sql
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "8"))
+UPDATE_QUEUE_MAX = int(os.getenv("UPDATE_QUEUE_MAX", "1000"))
+
+logger = get_logger("app.queue")
+
+
+class QueueFull(Exception):
+    pass
+
+
+def chat_id_of(payload: dict):
+    for key in ("message", "edited_message"):
+        if key in payload:
+            return payload[key]["chat"]["id"]
+    if "callback_query" in payload:
+        return payload["callback_query"]["message"]["chat"]["id"]
+    return None
+
+
+class MemoryUpdateStore:
+    """Keeps nothing: updates in flight are lost if the process dies."""
+
+    async def add(self, payload: dict, chat_id) -> int:
+        return None
+
+    async def ack(self, item_id):
+        pass
+
+    async def load_pending(self):
+        return []
+
+
+class SqlUpdateStore:
+    """Writes each update to the pending_updates table until it has been processed."""
+
+    async def add(self, payload: dict, chat_id) -> int:
+        async with AsyncSessionLocal() as db:
+            row = models.PendingUpdate(chat_id=chat_id, payload=json.dumps(payload))
+            db.add(row)
+            await db.commit()
+            return row.id
+
+    async def ack(self, item_id):
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(models.PendingUpdate).where(models.PendingUpdate.id == item_id))
+            await db.commit()
+
+    async def load_pending(self):
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(select(models.PendingUpdate).order_by(models.PendingUpdate.id))).scalars().all()
+            return [(row.id, row.chat_id, json.loads(row.payload), row.created_at) for row in rows]
+
+
+class UpdateQueue:
+    """
+    Per-chat FIFO queues served by a pool of workers. A chat is handed to at most
+    one worker at a time, so its updates run in order, while different chats are
+    processed concurrently.
+    """
+
+    def __init__(self, handler, store=None, workers: int = UPDATE_WORKERS, max_depth: int = UPDATE_QUEUE_MAX):
+        self.handler = handler
+        self.store = store or MemoryUpdateStore()
+        self.workers = workers
+        self.max_depth = max_depth
+        self._pending = {}  # chat_id -> deque of (item_id, payload, enqueued_at)
+        self._ready = asyncio.Queue()  # chats with pending work and no worker on them
+        self._scheduled = set()
+        self._tasks = []
+        self.depth = 0
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+
+    def _push(self, item_id, chat_id, payload, enqueued_at):
+        self._pending.setdefault(chat_id, deque()).append((item_id, payload, enqueued_at))
+        self.depth += 1
+        if chat_id not in self._scheduled:
+            self._scheduled.add(chat_id)
+            self._ready.put_nowait(chat_id)
+
+    async def put(self, payload: dict):
+        if self.depth >= self.max_depth:
+            raise QueueFull(f"{self.depth} updates pending")
+        chat_id = chat_id_of(payload)
+        item_id = await self.store.add(payload, chat_id)
+        self._push(item_id, chat_id, payload, time.time())
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._ready.get()
+            item_id, payload, _ = self._pending[chat_id].popleft()
+            self.depth -= 1
+            self.in_flight += 1
+            try:
+                await self.handler(payload)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Update processing error", extra={"update_id": payload.get("update_id")})
+            finally:
+                self.in_flight -= 1
+                try:
+                    await self.store.ack(item_id)
+                except Exception as e:
+                    logger.warning("Update queue ack error", extra={"error": repr(e)})
+
+            if self._pending[chat_id]:
+                self._ready.put_nowait(chat_id)
+            else:
+                del self._pending[chat_id]
+                self._scheduled.discard(chat_id)
+
+    async def start(self):
+        for item_id, chat_id, payload, created_at in await self.store.load_pending():
+            self._push(item_id, chat_id, payload, created_at.timestamp() if created_at else time.time())
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10):
+        deadline = time.monotonic() + timeout
+        while (self.depth or self.in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        # Aggregates only: /queue is unauthenticated, so no chat ids.
+        now = time.time()
+        lag = sorted(now - items[0][2] for items in self._pending.values() if items)
+        return {
+            "depth": self.depth,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "failed": self.failed,
+            "chats_waiting": len(lag),
+            "max_lag_seconds": round(lag[-1], 3) if lag else 0.0,
+            "p95_lag_seconds": round(lag[min(len(lag) - 1, int(len(lag) * 0.95))], 3) if lag else 0.0,
+        }
+
+
+_queue = None
+
+
+def get_update_queue() -> UpdateQueue:
+    return _queue
+
+
+def create_update_queue(handler) -> UpdateQueue:
+    global _queue
+    store = SqlUpdateStore() if UPDATE_QUEUE_BACKEND == "sql" else MemoryUpdateStore()
+    _queue = UpdateQueue(handler, store)
+    return _queue
@@ -0,0 +1,51 @@
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+from sqlalchemy import text
+from app.db.session import get_async_engine
+from app.utils.llm import get_gateway
+from app.services.export_jobs import get_export_manager
+from app.services.log import get_logger
+
+load_dotenv()
+
+# Imports and connections are made on first use, so a cold instance starts fast. With
+# STARTUP_WARMUP=1 the lifespan makes them in the background right after startup instead
+# of during the first messages; 0 leaves each to the first message that needs it.
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "1") == "1"
+
+logger = get_logger("app.warmup")
+
+
+async def _db():
+    async with get_async_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def _llm():
+    await asyncio.to_thread(lambda: get_gateway().client)
+
+
+async def _pdf():
+    await get_export_manager().warm()
+
+
+STEPS = {"db": _db, "llm": _llm, "pdf": _pdf}
+
+
+async def _step(name: str, fn) -> tuple:
+    started = time.perf_counter()
+    try:
+        await fn()
+    except Exception as e:
+        logger.warning("Warmup step failed", extra={"step": name, "error": repr(e)})
+        return name, None
+    return name, round((time.perf_counter() - started) * 1000, 2)
+
+
+async def warm_up() -> dict:
+    """Open a DB connection, build the Gemini client and start the PDF workers; returns ms per step."""
+    timings = dict(await asyncio.gather(*(_step(name, fn) for name, fn in STEPS.items())))
+    logger.info("Warmup done", extra={"warmup_ms": timings})
+    return timings
@@ -0,0 +1,211 @@
+import re
+from calendar import monthrange
+from datetime import datetime, date, time, timedelta
+from functools import lru_cache
+import pytz
+from dateutil.relativedelta import relativedelta
+from app.nlp.parser import MONTHS, MONTH_NAMES, find_date
+
+india = pytz.timezone("Asia/Kolkata")
+
+_MONTH = MONTH_NAMES + r"\.?"
+# One end of an explicit range: 2025-05-01, 1/5/25, 1st may 2025, may 1, may 2025, today.
+_DAY_TOKEN = (
+    r"(?:\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[/.-]\d{1,2}(?:[/.-]\d{2,4})?"
+    r"|\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?" + _MONTH + r"(?:,?\s+\d{4}|\s+'?\d{2}(?!\d))?"
+    r"|" + _MONTH + r"\s+\d{1,2}(?:st|nd|rd|th)?\b(?:,?\s+\d{4})?"
+    r"|" + _MONTH + r"(?:,?\s+'?\d{4})?"
+    r"|today|yesterday)"
+)
+_RANGE_RE = re.compile(r"\b(?:from\s+|between\s+)?(?P<a>" + _DAY_TOKEN + r")\s*(?:to|till|until|and|through|-|–)\s*(?P<b>" + _DAY_TOKEN + r")(?![\w/.-])")
+_SINCE_RE = re.compile(r"\b(?:since|from|after)\s+(?P<a>" + _DAY_TOKEN + r")(?![\w/.-])")
+_HAS_YEAR_RE = re.compile(r"\d{4}|[/.-]\d{1,2}[/.-]\d{2}|'\d{2}|\s\d{2}$")
+_MONTH_ONLY_RE = re.compile(r"^(?P<month>" + _MONTH + r")(?:,?\s+'?(?P<year>\d{4}|\d{2}))?$")
+# Indian financial years run April to March: "fy 2024-25", "fy25", "financial year 2024".
+_FY_RE = re.compile(r"\b(?:fy|financial year|fiscal year)\s*'?(?P<y1>\d{4}|\d{2})(?:\s*[-/–]\s*'?(?P<y2>\d{4}|\d{2}))?\b")
+_LAST_N_RE = re.compile(r"\b(?:last|past|previous)\s+(?P<n>\d{1,3})\s+(?P<unit>day|week|month|year)s?\b")
+_PERIOD_RE = re.compile(
+    r"\b(?P<which>this|current|last|previous|prev|past)\s+(?P<unit>week|month|quarter|year|fy|financial year|fiscal year)\b"
+)
+_TO_DATE_RE = re.compile(r"\b(?P<unit>mtd|ytd|month to date|year to date|month till date|year till date)\b")
+_DAY_RE = re.compile(r"\b(?P<which>today|yesterday|day before yesterday)\b")
+_MONTH_RE = re.compile(r"\b(?P<month>" + _MONTH + r")(?:,?\s+'?(?P<year>\d{4}|\d{2}))?(?![\w/.-])")
+_YEAR_RE = re.compile(r"\b(?P<year>(?:19|20)\d{2})\b")
+# Anything that might name a period; a message with none gets the default window without asking Gemini.
+_HINT_RE = re.compile(
+    r"\d|\b(?:" + _MONTH + r"|days?|weeks?|months?|years?|quarters?|fortnight|weekend|today|yesterday|tomorrow|"
+    r"ago|since|until|till|between|fy|mtd|ytd|monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b"
+)
+_DATE_TAIL_RE = re.compile(r"\b(?:on|to|as)\s+(?P<phrase>[\w ,/.'-]+?)\s*$")
+
+_DATEPARSER_SETTINGS = {"DATE_ORDER": "DMY", "PREFER_DATES_FROM": "past", "RETURN_AS_TIMEZONE_AWARE": False}
+
+
+def _today() -> date:
+    return datetime.now(india).date()
+
+
+def _full_year(year: str, today: date) -> int:
+    if not year:
+        return None
+    year = int(year)
+    return year + 2000 if year < 100 else year
+
+
+def _month_span(month: int, year: int):
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+
+def _latest_month(month: int, year: int, today: date) -> int:
+    """The year of the most recent such month when none was given: "export may" in March means last May."""
+    if year:
+        return year
+    return today.year if month <= today.month else today.year - 1
+
+
+def _fy_start(today: date) -> int:
+    return today.year if today.month >= 4 else today.year - 1
+
+
+@lru_cache(maxsize=1024)
+def _parse_day(token: str, today: date):
+    """One day from a range endpoint such as "1/5/25" or "1st may", or None."""
+    if token == "today":
+        return today
+    if token == "yesterday":
+        return today - timedelta(days=1)
+    found, _ = find_date(token, today)
+    if found:
+        return date.fromisoformat(found)
+    import dateparser  # only explicit dates the regexes above can't read get this far
+
+    parsed = dateparser.parse(token, languages=["en"], settings={**_DATEPARSER_SETTINGS, "RELATIVE_BASE": datetime.combine(today, time())})
+    return parsed.date() if parsed else None
+
+
+def _endpoint(token: str, today: date, year: int = None):
+    """(first day, last day) an endpoint covers: a whole month for "may 2025", else one day."""
+    m = _MONTH_ONLY_RE.match(token)
+    if m:
+        month = MONTHS[m.group("month")[:3]]
+        return _month_span(month, _full_year(m.group("year"), today) or year or _latest_month(month, None, today))
+    day = _parse_day(token, today)
+    return (day, day) if day else None
+
+
+def _explicit_range(a: str, b: str, today: date):
+    end = _endpoint(b, today)
+    start = _endpoint(a, today, end[0].year) if end else None
+    if start is None:
+        return None
+    if not _HAS_YEAR_RE.search(a):
+        # A start without a year is in the end's year, or the one before: "nov to feb 2025".
+        year = end[0].year - (start[0].replace(year=end[0].year) > end[1])
+        start = (start[0].replace(year=year), start[1].replace(year=year))
+    return min(start[0], end[0]), max(start[1], end[1])
+
+
+def _period(which: str, unit: str, today: date):
+    previous = which in ("last", "previous", "prev", "past")
+    if unit == "week":
+        start = today - timedelta(days=today.weekday())
+        if previous:
+            return start - timedelta(days=7), start - timedelta(days=1)
+        return start, today
+    if unit == "month":
+        start = today.replace(day=1)
+        if previous:
+            return start - relativedelta(months=1), start - timedelta(days=1)
+        return start, today
+    if unit == "quarter":
+        start = date(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+        if previous:
+            return start - relativedelta(months=3), start - timedelta(days=1)
+        return start, today
+    if unit == "year":
+        if previous:
+            return date(today.year - 1, 1, 1), date(today.year - 1, 12, 31)
+        return date(today.year, 1, 1), today
+    start = date(_fy_start(today) - previous, 4, 1)  # fy / financial year / fiscal year
+    return (start, date(start.year + 1, 3, 31)) if previous else (start, today)
+
+
+@lru_cache(maxsize=4096)
+def _resolve(text: str, today: date):
+    """(first day, last day) for the period text names, "default" when it names none, None when unsure."""
+    m = _RANGE_RE.search(text)
+    if m:
+        return _explicit_range(m.group("a"), m.group("b"), today)
+    m = _FY_RE.search(text)
+    if m:
+        # "fy 2024-25" starts in 2024; "fy25" and "fy 2025" name the year ending March 2025.
+        y1 = _full_year(m.group("y1"), today)
+        start_year = y1 if m.group("y2") else y1 - 1
+        return date(start_year, 4, 1), date(start_year + 1, 3, 31)
+    m = _SINCE_RE.search(text)
+    if m:
+        start = _endpoint(m.group("a"), today)
+        return (start[0], today) if start else None
+    m = _LAST_N_RE.search(text)
+    if m:
+        n, unit = int(m.group("n")), m.group("unit")
+        return today - relativedelta(**{f"{unit}s": n}) + timedelta(days=1), today
+    m = _PERIOD_RE.search(text)
+    if m:
+        return _period(m.group("which"), m.group("unit"), today)
+    m = _TO_DATE_RE.search(text)
+    if m:
+        return _period("this", "month" if m.group("unit").startswith("m") else "year", today)
+    m = _DAY_RE.search(text)
+    if m:
+        day = today - timedelta(days={"today": 0, "yesterday": 1}.get(m.group("which"), 2))
+        return day, day
+    found, _ = find_date(text, today)
+    if found:
+        day = date.fromisoformat(found)
+        return day, day
+    m = _MONTH_RE.search(text)
+    if m:
+        month = MONTHS[m.group("month")[:3]]
+        return _month_span(month, _latest_month(month, _full_year(m.group("year"), today), today))
+    m = _YEAR_RE.search(text)
+    if m:
+        year = int(m.group("year"))
+        return date(year, 1, 1), date(year, 12, 31)
+    return None if _HINT_RE.search(text) else "default"
+
+
+def as_range(start: date, end: date) -> dict:
+    """{"start", "end"} as IST timestamps covering start's first instant to end's last."""
+    return {
+        "start": india.localize(datetime.combine(start, time.min)).isoformat() if start else None,
+        "end": india.localize(datetime.combine(end, time.max)).isoformat() if end else None,
+    }
+
+
+def resolve_range(text: str, today: date = None):
+    """
+    The date range a message like "export last month" or "spent in fy 2024-25" asks for, as
+    {"start", "end"} IST timestamps. Both are None when the message names no period (callers
+    use their default window); returns None when it seems to name one that couldn't be read.
+    """
+    resolved = _resolve(" ".join(text.lower().split()), today or _today())
+    if resolved is None:
+        return None
+    if resolved == "default":
+        return {"start": None, "end": None}
+    return as_range(*resolved)
+
+
+def resolve_date(text: str, today: date = None):
+    """YYYY-MM-DD for the date a message like "change the date to 5 may" names, or None."""
+    text = " ".join(text.lower().split())
+    today = today or _today()
+    found, _ = find_date(text, today)
+    if found:
+        return found
+    m = _DATE_TAIL_RE.search(text)
+    if m and _HINT_RE.search(m.group("phrase")):
+        day = _parse_day(m.group("phrase"), today)
+        return day.isoformat() if day else None
+    return None
@@ -1,6 +1,8 @@
+from itertools import groupby
+from operator import attrgetter
 from fpdf import FPDF
-from dateutil.parser import parse as date_parse
-from app.db import crud
+from app.db import crud, models
+from app.utils.indian_format import format_inr, format_amount
 
 class PDF(FPDF):
     def header(self):
@@ -22,15 +24,30 @@ class PDF(FPDF):
         
         # Red for expense
         self.set_text_color(200, 0, 0)
-        self.cell(70, 10, f"Total Expense: Rs.{round(total_expense, 2)}", ln=0, align="C")
+        self.cell(70, 10, f"Total Expense: {format_inr(total_expense, symbol='Rs.')}", ln=0, align="C")
         
         # Green for income
         self.set_text_color(0, 150, 0)
-        self.cell(70, 10, f"Total Income: Rs.{round(total_income, 2)}", ln=1, align="C")
+        self.cell(70, 10, f"Total Income: {format_inr(total_income, symbol='Rs.')}", ln=1, align="C")
         
         self.set_text_color(0, 0, 0)  # Reset color
         self.ln(5)
 
+    def add_category_breakdown(self, spent_by_category):
+        spent = sorted(
+            ((category, total) for category, total in spent_by_category.items() if category != crud.TRANSFER_CATEGORY and total),
+            key=lambda t: -t[1],
+        )
+        if not spent:
+            return
+        self.set_font("Arial", "B", 11)
+        self.cell(0, 10, "Spending by Category", ln=True)
+        self.set_font("Arial", "", 9)
+        for category, total in spent:
+            self.cell(50, 7, category, 1)
+            self.cell(35, 7, format_amount(total), 1, ln=1, align="R")
+        self.ln(5)
+
     def add_account_table(self, title, transactions):
         self.set_font("Arial", "B", 11)
         self.cell(0, 10, title, ln=True)
@@ -47,20 +64,20 @@ class PDF(FPDF):
         balance = 0
         for txn in transactions:
             date = txn.date.strftime("%Y-%m-%d")
-            spent = txn.amount if txn.type == "expense" else ""
-            credited = txn.amount if txn.type == "income" else ""
-            balance += txn.amount if txn.type == "income" else -txn.amount
+            spent = format_amount(txn.amount_paise) if txn.type == "expense" else ""
+            credited = format_amount(txn.amount_paise) if txn.type == "income" else ""
+            balance += txn.amount_paise if txn.type == "income" else -txn.amount_paise
             desc = txn.description or ""
 
             self.cell(30, 8, str(date), 1)
-            self.cell(25, 8, str(spent), 1)
-            self.cell(25, 8, str(credited), 1)
-            self.cell(35, 8, str(balance), 1)
+            self.cell(25, 8, spent, 1)
+            self.cell(25, 8, credited, 1)
+            self.cell(35, 8, format_amount(balance), 1)
             self.cell(75, 8, desc[:50], 1)
             self.ln()
         self.ln(5)
 
-    def add_combined_sheet(self, all_transactions):
+    def add_combined_sheet(self, transactions):
         self.set_font("Arial", "B", 12)
         self.cell(0, 10, "All Accounts Combined", ln=True)
 
@@ -73,53 +90,62 @@ class PDF(FPDF):
         self.ln()
 
         self.set_font("Arial", "", 9)
-        for acc_name, txn in sorted(all_transactions, key=lambda x: x[1].date):
+        for txn in transactions:
+            acc_name = txn.account_name
             date = txn.date.strftime("%Y-%m-%d")
-            spent = txn.amount if txn.type == "expense" else ""
-            credited = txn.amount if txn.type == "income" else ""
+            spent = format_amount(txn.amount_paise) if txn.type == "expense" else ""
+            credited = format_amount(txn.amount_paise) if txn.type == "income" else ""
             desc = txn.description or ""
 
             self.cell(30, 8, acc_name, 1)
             self.cell(30, 8, date, 1)
-            self.cell(25, 8, str(spent), 1)
-            self.cell(25, 8, str(credited), 1)
+            self.cell(25, 8, spent, 1)
+            self.cell(25, 8, credited, 1)
             self.cell(80, 8, desc[:60], 1)
             self.ln()
 
 def generate_pdf_report(user_id, db, output_path="expense_report.pdf", start=None, end=None):
-    accounts = crud.get_all_balances(db, user_id)
-    all_transactions = []
+    """Write the report to output_path, or return it as bytes when output_path is None."""
+    # Totals come from the rollups; transfers between accounts and balance corrections
+    # aren't spending or income.
+    totals = crud.get_category_totals(db, user_id, start, end)
+    counted = [t for t in totals if t.category not in (crud.TRANSFER_CATEGORY, crud.ADJUSTMENT_CATEGORY)]
+    total_income = sum(t.total_paise for t in counted if t.type == models.TransactionType.INCOME)
+    spent_by_category = {t.category: t.total_paise for t in counted if t.type != models.TransactionType.INCOME}
+    total_expense = sum(spent_by_category.values())
 
     pdf = PDF()
     pdf.add_page()
 
-    total_expense, total_income = 0, 0
-
-    # First, calculate totals by iterating through all transactions
-    for acc in accounts:
-        txns = crud.get_transactions_by_account(db, acc.id, start, end)
-        if txns:
-            all_transactions.extend([(acc.name, t) for t in txns])
-            for t in txns:
-                if not t.description.lower() == "balance correction":
-                    if t.type == "income":
-                        total_income += t.amount
-                    else:
-                        total_expense += t.amount
-
     # ✅ Add summary at the top, right after header
     pdf.add_summary_line(total_expense, total_income)
 
-    # Then add account tables
-    for acc in accounts:
-        txns = crud.get_transactions_by_account(db, acc.id, start, end)
-        if txns:
-            pdf.add_account_table(acc.name, txns)
+    if not totals:
+        return _finish(pdf, output_path)
 
-    # ✅ Add combined sheet (n+1)
-    if all_transactions:
-        pdf.add_page()
-        pdf.add_combined_sheet(all_transactions)
+    pdf.add_category_breakdown(spent_by_category)
 
+    # Then add account tables, streamed by account, then date
+    rows = crud.iter_user_transactions(db, user_id, start, end, by_account=True)
+    for acc_name, txns in groupby(rows, key=attrgetter("account_name")):
+        pdf.add_account_table(acc_name, txns)
+
+    # ✅ Add combined sheet, streamed oldest first
+    pdf.add_page()
+    pdf.add_combined_sheet(crud.iter_user_transactions(db, user_id, start, end))
+
+    return _finish(pdf, output_path)
+
+
+def _finish(pdf, output_path):
+    if output_path is None:
+        return bytes(pdf.output())
     pdf.output(output_path)
-    return output_path
\ No newline at end of file
+    return output_path
+
+
+def render_pdf_report(user_id, start=None, end=None) -> bytes:
+    """Entry point for export worker processes: own DB session, PDF returned in memory."""
+    from app.db.session import SessionLocal
+    with SessionLocal() as db:
+        return generate_pdf_report(user_id, db, None, start, end)
@@ -0,0 +1,28 @@
+# Indian digit grouping: the last three digits, then groups of two (12,34,56,789).
+
+
+def group_indian(number: int) -> str:
+    digits = str(abs(number))
+    head, tail = digits[:-3], digits[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    grouped = ",".join(groups + [tail])
+    return f"-{grouped}" if number < 0 else grouped
+
+
+def format_inr(paise: int, symbol: str = "₹", paise_digits: bool = True) -> str:
+    """12345678 paise -> "₹1,23,456.78". The PDF's core fonts have no ₹, so it passes symbol="Rs."."""
+    sign = "-" if paise < 0 else ""
+    rupees, rest = divmod(abs(paise), 100)
+    text = f"{sign}{symbol}{group_indian(rupees)}"
+    return f"{text}.{rest:02d}" if paise_digits else text
+
+
+def format_amount(paise: int) -> str:
+    """Number only, for table cells: 12345678 -> "1,23,456.78"."""
+    return format_inr(paise, symbol="")
+
@@ -0,0 +1,158 @@
+import asyncio
+import random
+import time
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")  # point at a fake model server in tests/benchmarks
+MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.25"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "4"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMUnavailable(LLMError):
+    """Raised without calling the model while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+def _is_retryable(exc: Exception) -> bool:
+    from google.genai import errors
+
+    if isinstance(exc, (asyncio.TimeoutError, errors.ServerError)):
+        return True
+    if isinstance(exc, errors.ClientError):
+        return exc.code == 429
+    return isinstance(exc, OSError)
+
+
+class LLMGateway:
+    """
+    Async front door for Gemini: bounded concurrency, per-call timeout,
+    retries with jittered exponential backoff and a circuit breaker.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        model: str = MODEL,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        backoff_max: float = LLM_BACKOFF_MAX,
+        breaker: CircuitBreaker = None,
+    ):
+        self._client = client
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai  # heavy (~0.5s); only paid by the first message that needs Gemini
+
+            http_options = {"base_url": GEMINI_BASE_URL} if GEMINI_BASE_URL else None
+            self._client = genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+        return self._client
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": sleep a random amount up to the exponential cap.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def generate(self, prompt: str, schema=None) -> str:
+        """Return the raw response text (JSON when a schema is given)."""
+        config = {"response_mime_type": "application/json", "response_schema": schema} if schema else None
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise LLMUnavailable("Gemini circuit breaker is open")
+            try:
+                async with self._semaphore:
+                    response = await asyncio.wait_for(
+                        self.client.aio.models.generate_content(
+                            model=self.model, contents=[prompt], config=config
+                        ),
+                        timeout=self.timeout,
+                    )
+            except Exception as e:
+                self.breaker.record_failure()
+                last_error = e
+                if not _is_retryable(e) or attempt == self.max_retries:
+                    break
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            self.breaker.record_success()
+            return response.text
+
+        raise LLMError(f"Gemini call failed after {attempt + 1} attempt(s): {last_error!r}") from last_error
+
+
+_gateway = None
+
+
+def get_gateway() -> LLMGateway:
+    global _gateway
+    if _gateway is None:
+        _gateway = LLMGateway()
+    return _gateway
+
+
+def set_gateway(gateway: LLMGateway):
+    global _gateway
+    _gateway = gateway
@@ -0,0 +1,18 @@
+# Money is stored and added up as integer paise (BIGINT columns named *_paise).
+# Convert at the edges only: parsed amounts on the way in, indian_format on the way out.
+from decimal import Decimal, ROUND_HALF_UP
+
+PAISE_PER_RUPEE = 100
+
+
+def to_paise(rupees) -> int:
+    """Rupees as int, float, str or Decimal -> int paise, rounding half away from zero."""
+    if isinstance(rupees, int):
+        return rupees * PAISE_PER_RUPEE
+    # str() first so a float like 200.459 is taken at face value, not as 200.45899999...
+    value = Decimal(str(rupees).replace(",", "")) * PAISE_PER_RUPEE
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_rupees(paise: int) -> Decimal:
+    return Decimal(paise).scaleb(-2)
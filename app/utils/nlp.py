@@ -1,55 +1,53 @@
-from google import genai
-from typing import Optional, Literal
 from dotenv import load_dotenv
-from pydantic import BaseModel
 from datetime import datetime 
+from app.schemas.base import ExpenseParsed, TimeRange, UpdateFields
+from app.nlp.parser import parse_local_many
+from app.utils.llm import get_gateway
+from app.utils.parse_cache import get_parse_cache
+from app.utils.date_parser import as_range, resolve_range, resolve_date
+from app.services.log import get_logger
+from app.services.metrics import LLM_SECONDS, PARSES
+from app.services.tracing import timed
 import json
 import os
 import pytz
 
 load_dotenv()
 india = pytz.timezone("Asia/Kolkata")
+logger = get_logger("app.nlp")
 
-class ExpenseParsed(BaseModel):
-    type: Literal["income", "expense", "transfer", "balance", "balance_adjustment", "transaction","unknown"]
-    action: Literal["create", "update", "delete", "read"]
-    amount: float
-    account: str = "Cash"
-    description: str = "Miscellaneous"
-    date: Optional[str] = None
-    from_account: Optional[str] = None
-    limit: Optional[int] = None 
 
-class TimeRange(BaseModel):
-    start: Optional[datetime] = None
-    end: Optional[datetime] = None
+# Messages the local parser is at least this sure about never reach Gemini.
+LOCAL_PARSE_THRESHOLD = float(os.getenv("LOCAL_PARSE_THRESHOLD", "0.8"))
 
-class UpdateFields(BaseModel):
-    amount: Optional[float] = None
-    description: Optional[str] = None
-    type: Optional[Literal["income", "expense"]] = None
-    date: Optional[datetime] = None  # ISO format
+async def parse_message(text: str) -> list:
+    """One parsed dict per transaction in the message; most messages give a list of one."""
+    parsed, confidence = parse_local_many(text)
+    if confidence >= LOCAL_PARSE_THRESHOLD:
+        PARSES.inc(source="local")
+        return parsed
 
+    cache = get_parse_cache()
+    cached = await cache.get_message(text)
+    if cached is not None:
+        PARSES.inc(source="cache")
+        return cached if isinstance(cached, list) else [cached]
 
-# Set up Gemini
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") 
-MODEL= os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
-
-client = genai.Client(api_key=GEMINI_API_KEY)
-
-def parse_message(text: str) -> dict:
     prompt = f"""
-You are a finance assistant bot. Extract structured data in the following JSON format:
+You are a finance assistant bot. Extract structured data as a JSON array with one object per
+transaction in the message. Almost every message has exactly one; a pasted list such as
+"chai 20, auto 60, lunch 180 from hdfc" has one object per entry. Each object has this format:
 
 {{
-  "type": "income | expense | transfer | balance | balance_adjustment | transaction | unknown",
+  "type": "income | expense | transfer | balance | balance_adjustment | transaction | analytics | unknown",
   "action": "create | update | delete | read",
   "amount": float (₹),
   "account": string (e.g., 'Cash', 'HDFC', 'SBI'),
   "description": string (e.g., 'Groceries', 'Salary'),
   "date": YYYY-MM-DD or null,
   "from_account": string (only for transfers),
-  "limit": int (optional, for transaction history requests)
+  "limit": int (optional, for transaction history requests),
+  "metric": "summary | categories | daily | balances | monthly" (only for analytics)
 }}
 
 Instructions:
@@ -60,6 +58,9 @@ Instructions:
 - "balance": Request for current balance of an account.
 - "balance_adjustment": Directly setting a value to an account (e.g., "Cash is 1000", "HDFC = 0").
 - "transaction": for displaying transaction history. (action="read")
+- "analytics": Questions about spending over a period (action="read"), with "metric":
+  "summary" (totals, e.g. "how much did I spend this month"), "categories" (breakdown by category),
+  "daily" (average/daily spend), "balances" (running balance over time), "monthly" (month over month).
 - "unknown": If the type cannot be determined.
 2. Actions:
 - "create": Adding a new income or expense.
@@ -68,6 +69,7 @@ Instructions:
 - "read": Fetching details about the account.
 3. "account" is Compulsory for all types except "balance".
 4. "from_account" is only required for transfers.
+5. Only income/expense entries with action "create" are ever listed together; any other request is a single object.
 
 Defaults:
 - "account": "Cash"
@@ -75,6 +77,7 @@ Defaults:
 - "date": None
 - "amount": 0.0
 - "limit": None
+- "metric": None
 - "from_account": None
 "from_account" only appears for transfers.
 
@@ -82,23 +85,32 @@ Parse this: "{text}"
 """
 
     try:
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=[prompt],
-            config={
-                "response_mime_type": "application/json",
-                "response_schema": ExpenseParsed
-            }
-        )
-
-        return json.loads(response.text)
+        with timed("llm.parse_message", LLM_SECONDS, function="parse_message"):
+            response_text = await get_gateway().generate(prompt, list[ExpenseParsed])
+        parsed = json.loads(response_text)
+        parsed = [ExpenseParsed(**item).model_dump() for item in (parsed if isinstance(parsed, list) else [parsed])]
+        if not parsed:
+            raise ValueError("empty list")
+        await cache.set_message(text, parsed)
+        PARSES.inc(source="llm")
+        return parsed
 
     except Exception as e:
-        print("Gemini parsing error:", e)
-        return ExpenseParsed(type="unknown", action="create", amount=0.0).dict()
+        PARSES.inc(source="error")
+        logger.warning("Gemini parsing error", extra={"function": "parse_message", "error": repr(e)})
+        return [ExpenseParsed(type="unknown", action="create", amount=0.0).dict()]
 
 
-def parse_time_range(msg: str):
+async def parse_time_range(msg: str):
+    local = resolve_range(msg)
+    if local is not None:
+        return local
+
+    cache = get_parse_cache()
+    cached = await cache.get_time_range(msg)
+    if cached is not None:
+        return cached
+
     prompt = f"""
 Extract the start and end date from the following message. 
 Today's date is {datetime.now(pytz.timezone("Asia/Kolkata")).strftime('%Y-%m-%d')}.
@@ -113,25 +125,22 @@ start: YYYY-MM-DD
 end: YYYY-MM-DD
 """
     try:
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=[prompt],
-            config={
-                "response_mime_type": "application/json",
-                "response_schema": TimeRange
-            }
+        with timed("llm.parse_time_range", LLM_SECONDS, function="parse_time_range"):
+            response_text = await get_gateway().generate(prompt, TimeRange)
+        logger.debug("Gemini time range", extra={"response": response_text})
+        res = json.loads(response_text)
+        start, end = (
+            datetime.fromisoformat(res[k].replace("_", "T")).date() if res.get(k) else None for k in ("start", "end")
         )
-        print("Raw Response:", response.text)
-        res = json.loads(response.text)
-        res['start'] = res['start'].replace("_", "T") if res['start'] else None
-        res['end'] = res['end'].replace("_", "T") if res['end'] else None
+        res = as_range(start, end)
+        await cache.set_time_range(msg, res)
         return res
     except Exception as e:
-        print("Gemini time range parsing error:", e)
+        logger.warning("Gemini time range parsing error", extra={"function": "parse_time_range", "error": repr(e)})
         return {"start": None, "end": None}
 
 
-def extract_update_fields_from_msg(msg: str) -> dict:
+async def extract_update_fields_from_msg(msg: str) -> dict:
     prompt = f"""
 You are a finance assistant. Extract ONLY the fields that the user intends to update from the message below.
 
@@ -149,18 +158,17 @@ Message: "{msg}"
 """
 
     try:
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=[prompt],
-            config={
-                "response_mime_type": "application/json",
-                "response_schema": UpdateFields
-            }
-        )
-        return json.loads(response.text)
+        with timed("llm.extract_update_fields", LLM_SECONDS, function="extract_update_fields_from_msg"):
+            response_text = await get_gateway().generate(prompt, UpdateFields)
+        fields = json.loads(response_text)
     except Exception as e:
-        print("Gemini update field extraction error:", e)
-        return {}
+        logger.warning("Gemini update field extraction error", extra={"function": "extract_update_fields_from_msg", "error": repr(e)})
+        fields = {}
+    # Dates are read locally; Gemini tends to get the year wrong for "5 may" and the like.
+    local_date = resolve_date(msg)
+    if local_date:
+        fields["date"] = local_date
+    return fields
 
 # Test cases
 test_cases = [
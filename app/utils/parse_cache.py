@@ -0,0 +1,283 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, date
+import pytz
+from dotenv import load_dotenv
+from app.nlp.parser import AMOUNT_RE, KNOWN_ACCOUNTS, find_date
+from app.services.log import get_logger
+
+load_dotenv()
+india = pytz.timezone("Asia/Kolkata")
+logger = get_logger("app.parse_cache")
+
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "4096"))
+PARSE_CACHE_TTL = float(os.getenv("PARSE_CACHE_TTL", str(7 * 24 * 3600)))
+PARSE_CACHE_URL = os.getenv("PARSE_CACHE_URL")  # e.g. sqlite:///parse_cache.db or the Postgres URL
+
+_ACCOUNT_WORD_RE = re.compile(r"\b(" + "|".join(map(re.escape, KNOWN_ACCOUNTS)) + r")\b")
+# Words whose meaning depends on the current date; templates containing them are keyed on today.
+_RELATIVE_RE = re.compile(
+    r"\b(today|yesterday|tomorrow|ago|last|this|next|previous|past|current|week|month|year|"
+    r"weekend|morning|evening|night|now|since|till|until)\b"
+)
+
+
+def _today() -> date:
+    return datetime.now(india).date()
+
+
+def templatize(text: str, today: date = None):
+    """
+    Mask amounts, dates and account names: "metro 40 hdfc" -> ("metro <amt> <acc>", slots).
+    Slots map each placeholder, numbered in order of appearance, to the value it stands for.
+    """
+    today = today or _today()
+    template = " ".join((text or "").lower().split())
+    slots = {}
+    counts = {"date": 0, "amt": 0, "acc": 0}
+
+    def slot(kind, value):
+        slots[f"{kind}{counts[kind]}"] = value
+        counts[kind] += 1
+        return f"<{kind}>"
+
+    for _ in range(3):
+        found, span = find_date(template, today)
+        if not found:
+            break
+        template = template[:span[0]] + slot("date", found) + template[span[1]:]
+
+    def mask_amount(m):
+        value = float(m.group("amount").replace(",", ""))
+        prefix = " " if m.group(0).startswith(" ") else ""
+        return prefix + slot("amt", value * 1000 if m.group("k") else value)
+
+    template = AMOUNT_RE.sub(mask_amount, template)
+    template = _ACCOUNT_WORD_RE.sub(lambda m: slot("acc", KNOWN_ACCOUNTS[m.group(1)]), template)
+    return template, slots
+
+
+def _matches(value, slot_value) -> bool:
+    if isinstance(slot_value, float):
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and float(value) == slot_value
+    return isinstance(value, str) and value.lower() == slot_value.lower()
+
+
+def to_template_output(output, slots: dict):
+    """
+    Replace output values that came from a slot with {"$slot": name}. output is one
+    parsed dict or a list of them. Returns (templated output, names of slots the output
+    doesn't use). Unused slots are "pinned": their literal values become part of the
+    cache key instead.
+    """
+    items = output if isinstance(output, list) else [output]
+    templated = [dict(item) for item in items]
+    pinned = []
+    for name, slot_value in slots.items():
+        fields = [(i, k) for i, item in enumerate(items) for k, v in item.items() if _matches(v, slot_value)]
+        ambiguous = any(n != name and v == slot_value for n, v in slots.items())
+        if not fields or ambiguous:
+            pinned.append(name)
+            continue
+        for i, field in fields:
+            templated[i][field] = {"$slot": name, "int": isinstance(items[i][field], int)}
+    return (templated if isinstance(output, list) else templated[0]), pinned
+
+
+def fill(templated, slots: dict):
+    if isinstance(templated, list):
+        items = [fill(item, slots) for item in templated]
+        return None if any(item is None for item in items) else items
+    output = {}
+    for field, value in templated.items():
+        if isinstance(value, dict) and "$slot" in value:
+            if value["$slot"] not in slots:
+                return None
+            value = slots[value["$slot"]]
+            if isinstance(value, float) and templated[field].get("int"):
+                value = int(value)
+        output[field] = value
+    return output
+
+
+class MemoryBackend:
+    def __init__(self, max_size: int = PARSE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, ttl: float):
+        self._entries[key] = (value, time.time() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqlBackend:
+    """Shared cache table so several workers reuse each other's LLM results (or identity ids)."""
+
+    def __init__(self, url: str, table: str = "parse_cache"):
+        from sqlalchemy import create_engine, MetaData, Table, Column, String, Text, Float
+        self.engine = create_engine(url, pool_pre_ping=True)
+        metadata = MetaData()
+        self.table = Table(
+            table, metadata,
+            Column("key", String(64), primary_key=True),
+            Column("value", Text, nullable=False),
+            Column("expires_at", Float, nullable=False, index=True),
+        )
+        metadata.create_all(self.engine)
+
+    def get(self, key: str):
+        from sqlalchemy import select
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(self.table.c.value).where(self.table.c.key == key, self.table.c.expires_at >= time.time())
+            ).first()
+        return json.loads(row.value) if row else None
+
+    def set(self, key: str, value, ttl: float):
+        values = {"key": key, "value": json.dumps(value), "expires_at": time.time() + ttl}
+        with self.engine.begin() as conn:
+            if self.engine.dialect.name == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(self.table).values(**values)
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=["key"], set_={"value": values["value"], "expires_at": values["expires_at"]}
+            ))
+
+    def purge_expired(self):
+        with self.engine.begin() as conn:
+            conn.execute(self.table.delete().where(self.table.c.expires_at < time.time()))
+
+
+class ParseCache:
+    """In-process LRU/TTL cache, optionally backed by a shared SQL table."""
+
+    def __init__(self, max_size: int = PARSE_CACHE_SIZE, ttl: float = PARSE_CACHE_TTL, shared_url: str = PARSE_CACHE_URL):
+        self.ttl = ttl
+        self.local = MemoryBackend(max_size)
+        self.shared = SqlBackend(shared_url) if shared_url else None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _range_key(text: str, today: date) -> str:
+        normalized = " ".join(text.lower().split())
+        return hashlib.sha256(f"range:{normalized}|{today.isoformat()}".encode()).hexdigest()
+
+    @staticmethod
+    def _key(kind: str, template: str, today: date) -> str:
+        if _RELATIVE_RE.search(template):
+            template = f"{template}|{today.isoformat()}"
+        return hashlib.sha256(f"{kind}:{template}".encode()).hexdigest()
+
+    async def _get(self, key: str):
+        value = self.local.get(key)
+        if value is None and self.shared:
+            try:
+                value = await asyncio.to_thread(self.shared.get, key)
+            except Exception as e:
+                logger.warning("Parse cache read error", extra={"error": repr(e)})
+            if value is not None:
+                self.local.set(key, value, self.ttl)
+        return value
+
+    async def _set(self, key: str, value):
+        self.local.set(key, value, self.ttl)
+        if self.shared:
+            try:
+                await asyncio.to_thread(self.shared.set, key, value, self.ttl)
+            except Exception as e:
+                logger.warning("Parse cache write error", extra={"error": repr(e)})
+
+    async def get_message(self, text: str, today: date = None):
+        today = today or _today()
+        template, slots = templatize(text, today)
+        key = self._key("message", template, today)
+        templated = await self._get(key)
+        if isinstance(templated, dict) and "$pinned" in templated:
+            pinned = {name: slots.get(name) for name in templated["$pinned"]}
+            templated = await self._get(self._key("message", f"{template}|{json.dumps(pinned)}", today))
+        result = fill(templated, slots) if templated else None
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    async def set_message(self, text: str, parsed, today: date = None):
+        if any(item.get("type") == "unknown" for item in (parsed if isinstance(parsed, list) else [parsed])):
+            return
+        today = today or _today()
+        template, slots = templatize(text, today)
+        templated, pinned = to_template_output(parsed, slots)
+        key = self._key("message", template, today)
+        if pinned:
+            await self._set(key, {"$pinned": pinned})
+            pinned_values = {name: slots[name] for name in pinned}
+            key = self._key("message", f"{template}|{json.dumps(pinned_values)}", today)
+        await self._set(key, templated)
+
+    # Ranges are almost always relative ("last month"), so they are keyed on the
+    # normalized text plus today's IST date and stored as-is.
+    async def get_time_range(self, text: str, today: date = None):
+        result = await self._get(self._range_key(text, today or _today()))
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    async def set_time_range(self, text: str, time_range: dict, today: date = None):
+        if not time_range.get("start") and not time_range.get("end"):
+            return
+        await self._set(self._range_key(text, today or _today()), time_range)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self.local),
+            "evictions": self.local.evictions,
+            "shared": self.shared is not None,
+        }
+
+
+_cache = None
+
+
+def get_parse_cache() -> ParseCache:
+    global _cache
+    if _cache is None:
+        _cache = ParseCache()
+    return _cache
+
+
+def set_parse_cache(cache: ParseCache):
+    global _cache
+    _cache = cache
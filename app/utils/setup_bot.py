@@ -2,6 +2,7 @@ from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, CommandHandler, filters
 from app.db.crud import create_user, create_account, get_user
 from app.db.session import get_db
+from app.utils.money import to_paise
 
 ASK_NAME, ASK_ACCOUNT_NAME, ASK_INITIAL_BALANCE, ASK_ADD_ANOTHER = range(4)
 
@@ -31,14 +32,14 @@ async def ask_initial_balance(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def save_account_and_ask_more(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     try:
-        balance = float(update.message.text.strip())
-    except ValueError:
+        balance_paise = to_paise(update.message.text.strip())
+    except (ValueError, ArithmeticError):
         await update.message.reply_text("Please enter a valid number.")
         return ASK_INITIAL_BALANCE
 
     context.user_data["accounts"].append({
         "name": context.user_data["current_account_name"],
-        "balance": balance
+        "balance_paise": balance_paise
     })
 
     await update.message.reply_text("Do you want to add another account? (yes/no)")
@@ -56,7 +57,7 @@ async def ask_next_or_finish(update: Update, context: ContextTypes.DEFAULT_TYPE)
         user = create_user(db, telegram_id, name)
 
         for acc in context.user_data["accounts"]:
-            create_account(db, user.id, acc["name"], acc["balance"])
+            create_account(db, user.id, acc["name"], acc["balance_paise"])
 
         await update.message.reply_text(f"Setup complete! Your accounts are ready, {name}.")
         return ConversationHandler.END
@@ -0,0 +1,185 @@
+import csv
+import io
+import re
+from datetime import datetime, date
+from decimal import Decimal
+from functools import lru_cache
+from dateutil import parser
+import pytz
+from app.utils.money import to_paise
+
+india_tz = pytz.timezone("Asia/Kolkata")
+
+# Normalised header text -> field. Earlier aliases win when a statement has several
+# (e.g. "Date" and "Value Dt").
+HEADER_ALIASES = {
+    "date": ("date", "txn date", "transaction date", "tran date", "posting date", "value date", "value dt"),
+    "description": ("description", "narration", "particulars", "remarks", "details",
+                    "transaction details", "transaction remarks", "transaction description"),
+    "debit": ("debit", "withdrawal", "withdrawals", "withdrawal amt", "withdrawal amount", "debit amount", "dr amount", "dr"),
+    "credit": ("credit", "deposit", "deposits", "deposit amt", "deposit amount", "credit amount", "cr amount", "cr"),
+    "amount": ("amount", "transaction amount", "amt", "amount inr", "amount rs"),
+    "direction": ("dr cr", "cr dr", "debit credit", "type", "transaction type"),
+}
+HEADER_SCAN_ROWS = 50  # banks put account details above the table
+
+_HEADER_CLEAN_RE = re.compile(r"[^a-z]+")
+_AMOUNT_CLEAN_RE = re.compile(r"(?:₹|rs\.?|inr|,|\s)", re.IGNORECASE)
+_SUFFIX_RE = re.compile(r"(cr|dr)\.?$", re.IGNORECASE)
+
+
+class StatementError(Exception):
+    pass
+
+
+def _normalise(cell) -> str:
+    return _HEADER_CLEAN_RE.sub(" ", str(cell or "").lower()).strip()
+
+
+def map_columns(header) -> dict:
+    """field -> column index for a header row, or None if it lacks a date or amount column."""
+    names = [_normalise(c) for c in header]
+    columns = {}
+    for field, aliases in HEADER_ALIASES.items():
+        for alias in aliases:
+            if alias in names:
+                columns[field] = names.index(alias)
+                break
+    if "date" not in columns or not ("amount" in columns or "debit" in columns or "credit" in columns):
+        return None
+    return columns
+
+
+def _localize(when: datetime) -> datetime:
+    return when if when.tzinfo else india_tz.localize(when)
+
+
+@lru_cache(maxsize=4096)  # statements repeat the same few hundred dates
+def _parse_date_text(text: str):
+    try:
+        return _localize(parser.parse(text, dayfirst=True))
+    except (ValueError, OverflowError):
+        return None
+
+
+def _parse_date(cell):
+    if isinstance(cell, datetime):
+        return _localize(cell)
+    if isinstance(cell, date):
+        return _localize(datetime(cell.year, cell.month, cell.day))
+    text = str(cell or "").strip()
+    return _parse_date_text(text) if text else None
+
+
+def _parse_amount(cell):
+    """Signed paise, with a trailing Cr/Dr or (brackets) taken into account; None if blank."""
+    if cell is None or cell == "":
+        return None
+    if isinstance(cell, (int, float, Decimal)):
+        return to_paise(cell)
+    text = _AMOUNT_CLEAN_RE.sub("", str(cell))
+    sign = 1
+    suffix = _SUFFIX_RE.search(text)
+    if suffix:
+        sign = -1 if suffix.group(1).lower() == "dr" else 1
+        text = text[:suffix.start()]
+    if text.startswith("(") and text.endswith(")"):
+        sign, text = -sign, text[1:-1]
+    if not text or text in ("-", "--"):
+        return None
+    try:
+        return sign * to_paise(text)
+    except (ValueError, ArithmeticError):
+        return None
+
+
+def _signed_amount(row, columns):
+    if "debit" in columns or "credit" in columns:
+        debit = _parse_amount(_cell(row, columns.get("debit")))
+        credit = _parse_amount(_cell(row, columns.get("credit")))
+        return (abs(credit) if credit else 0) - (abs(debit) if debit else 0)
+    amount = _parse_amount(_cell(row, columns["amount"]))
+    if amount is None:
+        return None
+    direction = _normalise(_cell(row, columns.get("direction")))
+    if direction.startswith(("dr", "debit", "withdrawal")):
+        return -abs(amount)
+    if direction.startswith(("cr", "credit", "deposit")):
+        return abs(amount)
+    return amount
+
+
+def _cell(row, index):
+    return row[index] if index is not None and index < len(row) else None
+
+
+def _csv_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", errors="replace", newline="")
+    sample = text.read(8192)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    return csv.reader(text, dialect)
+
+
+def _xlsx_rows(fileobj):
+    try:
+        import openpyxl
+    except ImportError:
+        raise StatementError("Excel (.xlsx) statements need the openpyxl package; send a CSV instead.")
+    workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    return workbook.worksheets[0].iter_rows(values_only=True)
+
+
+def _xls_rows(fileobj):
+    try:
+        import xlrd
+    except ImportError:
+        raise StatementError("Old Excel (.xls) statements need the xlrd package; send a CSV instead.")
+    sheet = xlrd.open_workbook(file_contents=fileobj.read()).sheet_by_index(0)
+    for i in range(sheet.nrows):
+        row = sheet.row(i)
+        yield [
+            xlrd.xldate.xldate_as_datetime(c.value, sheet.book.datemode) if c.ctype == xlrd.XL_CELL_DATE else c.value
+            for c in row
+        ]
+
+
+def _rows(fileobj, file_name: str):
+    head = fileobj.read(8)
+    fileobj.seek(0)
+    if head.startswith(b"PK"):
+        return _xlsx_rows(fileobj)
+    if head.startswith(b"\xd0\xcf\x11\xe0"):
+        return _xls_rows(fileobj)
+    if (file_name or "").lower().endswith((".xlsx", ".xls")):
+        raise StatementError("That doesn't look like an Excel file.")
+    return _csv_rows(fileobj)
+
+
+def iter_statement(fileobj, file_name: str = None):
+    """
+    Yield (date, description, type, amount_paise) for each transaction row of a bank
+    statement (CSV, XLSX or XLS), one row at a time. Rows without a parseable date or a
+    non-zero amount (opening balance lines, footers) are skipped.
+    """
+    rows = iter(_rows(fileobj, file_name))
+    columns = None
+    for _, header in zip(range(HEADER_SCAN_ROWS), rows):
+        columns = map_columns(header)
+        if columns:
+            break
+    if not columns:
+        raise StatementError("Couldn't find the column headers. The statement needs a date column and an amount (or debit/credit) column.")
+
+    for row in rows:
+        if not row:
+            continue
+        when = _parse_date(_cell(row, columns["date"]))
+        amount = _signed_amount(row, columns) if when else None
+        if not amount:
+            continue
+        description = str(_cell(row, columns.get("description")) or "").strip() or "Imported"
+        yield when, description, "income" if amount > 0 else "expense", abs(amount)
@@ -0,0 +1,135 @@
+"""
+Spending analytics for a heavy synthetic user: per-row Python loops (how the PDF
+report walks transactions) versus the NumPy Ledger in app/services/transactions.py.
+
+    python -m benchmarks.analytics --rows 200000 --accounts 5
+
+The loops read every transaction in the range; the Ledger reads crud.get_daily_totals,
+a few cells per active day from the daily rollups plus the partial days at either end,
+so neither its query nor its build grows with the number of transactions. Times are
+end to end, load included, for a range of whole days and one with partial days at both
+ends; the script fails if any metric differs.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+_db_file = os.path.join(tempfile.gettempdir(), "bench_analytics.db")
+os.environ.setdefault("NEON_DB_URL", f"sqlite:///{_db_file}")
+
+from sqlalchemy import select
+from app.db.session import SessionLocal
+from app.db import crud, models
+from app.nlp.categories import DEFAULT_CATEGORY
+from app.services.transactions import EXCLUDED_CATEGORIES, load_ledger
+from benchmarks.pdf_export import seed
+
+
+RANGES = {
+    "whole days": ("2024-06-01T00:00:00+05:30", "2025-06-01T00:00:00+05:30"),
+    "partial days": ("2024-06-03T10:30:00+05:30", "2025-05-20T15:45:00+05:30"),
+}
+
+
+def load_rows(db, user_id, start, end):
+    txn = models.Transaction
+    return db.execute(
+        select(txn.date, txn.account_id, txn.type, txn.category, txn.amount_paise)
+        .where(txn.user_id == user_id, txn.date >= start, txn.date <= end)
+        .order_by(txn.date, txn.id)
+    ).all()
+
+
+def loop_metrics(rows, start, end, accounts, net_since_start):
+    start_day, end_day = crud.local_day(start), crud.local_day(end)
+    n_days = (end_day - start_day).days + 1
+    by_category, counts = defaultdict(int), defaultdict(int)
+    spent_by_day = [0] * n_days
+    moves = {a.id: [0] * n_days for a in accounts}
+    for date, account_id, type_, category, amount in rows:
+        day = (crud.local_day(date) - start_day).days
+        income = type_ == "income"
+        moves[account_id][day] += amount if income else -amount
+        if not income and (category or DEFAULT_CATEGORY) not in EXCLUDED_CATEGORIES:
+            by_category[category or DEFAULT_CATEGORY] += amount
+            counts[category or DEFAULT_CATEGORY] += 1
+            spent_by_day[day] += amount
+
+    balances = {}
+    for a in accounts:
+        balance = a.balance_paise - net_since_start.get(a.id, 0)
+        closing = []
+        for move in moves[a.id]:
+            balance += move
+            closing.append(balance)
+        balances[a.name] = closing
+
+    months = defaultdict(int)
+    for i, spent in enumerate(spent_by_day):
+        months[(start_day + timedelta(days=i)).strftime("%Y-%m")] += spent
+    return {
+        "categories": {c: (t, counts[c]) for c, t in by_category.items()},
+        "daily": spent_by_day,
+        "balances": balances,
+        "monthly": dict(months),
+    }
+
+
+def ledger_metrics(ledger):
+    return {
+        "categories": {c["category"]: (c["spent_paise"], c["count"]) for c in ledger.category_totals()},
+        "daily": ledger.daily()["spent_paise"],
+        "balances": ledger.running_balances()["accounts"],
+        "monthly": {m["month"]: m["spent_paise"] for m in ledger.monthly()},
+    }
+
+
+def timed(fn, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - began)
+    return best, result
+
+
+def compare(db, label, start_date, end_date):
+    start, end = crud.date_range(start_date, end_date)
+
+    def loops():
+        rows = load_rows(db, 1, start, end)
+        return len(rows), loop_metrics(rows, start, end, crud.get_all_balances(db, 1), crud.get_net_since(db, 1, start))
+
+    loop_time, (n_rows, expected) = timed(loops)
+    load_time, ledger = timed(lambda: load_ledger(db, 1, start_date, end_date))
+    metrics_time, got = timed(lambda: ledger_metrics(ledger))
+
+    print(f"{label}: {n_rows} transactions, {len(ledger.amount)} ledger cells")
+    print(f"  Python loops   {loop_time * 1000:8.1f} ms")
+    print(f"  NumPy Ledger   {(load_time + metrics_time) * 1000:8.1f} ms  ({loop_time / (load_time + metrics_time):.1f}x)"
+          f"  = load {load_time * 1000:.1f} ms + all metrics {metrics_time * 1000:.1f} ms")
+    return [f"{label}: {name}" for name in expected if expected[name] != got[name]]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--accounts", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"seeding {args.rows} transactions across {args.accounts} accounts...")
+    seed(args.rows, args.accounts)
+    with SessionLocal() as db:
+        mismatched = [m for label, (start, end) in RANGES.items() for m in compare(db, label, start, end)]
+    if mismatched:
+        print(f"\nmetrics differ: {', '.join(mismatched)}")
+        sys.exit(1)
+    print("\nall metrics match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Cold-start cost of a fresh process: importing app.main, entering the FastAPI lifespan
+and answering the first request, each measured in a new interpreter, plus a
+`python -X importtime` report of which packages the import spends its time in.
+
+    python -m benchmarks.cold_start --runs 5
+    python -m benchmarks.cold_start --budget-ms 1500 --warmup   # exit 1 over budget
+    python -m benchmarks.cold_start --forbid google.genai fpdf --out cold.json
+
+Modules listed in --forbid (by default the Gemini SDK and fpdf2, which are loaded on
+first use) must not be imported by app.main; the run fails if one is.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+# Runs in the child interpreter: time the import, the lifespan startup and GET /.
+CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+forbidden = [m for m in sys.argv[1:] if m in sys.modules]
+
+async def first_request():
+    import httpx
+    async with app.main.app.router.lifespan_context(app.main.app):
+        up = time.perf_counter()
+        transport = httpx.ASGITransport(app=app.main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            (await client.get("/")).raise_for_status()
+        answered = time.perf_counter()
+    return up, answered
+
+up, answered = asyncio.run(first_request())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (up - imported) * 1000,
+    "first_request_ms": (answered - up) * 1000,
+    "total_ms": (answered - started) * 1000,
+    "forbidden": forbidden,
+}))
+"""
+
+
+def child_env(warmup: bool) -> dict:
+    env = dict(os.environ)
+    env.setdefault("NEON_DB_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_cold_start.db')}")
+    env.setdefault("GEMINI_API_KEY", "fake")
+    env.setdefault("TELEGRAM_BOT_TOKEN", "TOKEN")
+    env.update({"STARTUP_WARMUP": "1" if warmup else "0", "LOG_LEVEL": "WARNING"})
+    return env
+
+
+def run_once(env: dict, forbid) -> dict:
+    out = subprocess.run([sys.executable, "-c", CHILD, *forbid], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def import_report(env: dict, top: int) -> list:
+    """(package, self ms, modules) for the packages importing app.main spends the most time in."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], env=env, capture_output=True, text=True, check=True)
+    totals = defaultdict(lambda: [0.0, 0])
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        package = name.split(".")[0]
+        if package == "app":
+            package = ".".join(name.split(".")[:3])
+        totals[package][0] += int(self_us) / 1000
+        totals[package][1] += 1
+    ranked = sorted(totals.items(), key=lambda item: -item[1][0])[:top]
+    return [(package, round(ms, 1), modules) for package, (ms, modules) in ranked]
+
+
+def main(args) -> int:
+    env = child_env(args.warmup)
+    run_once(env, args.forbid)  # compile bytecode first; a deployed image ships it
+    runs = [run_once(env, args.forbid) for _ in range(args.runs)]
+    summary = {key: round(statistics.median(run[key] for run in runs), 1) for key in ("import_ms", "startup_ms", "first_request_ms", "total_ms")}
+    forbidden = sorted({m for run in runs for m in run["forbidden"]})
+    report = import_report(env, args.top)
+
+    print(f"{args.runs} fresh interpreters, warmup {'on' if args.warmup else 'off'} (median ms)\n")
+    for key, value in summary.items():
+        print(f"  {key:<18}{value:>9.1f}")
+    print("\nimport time by package (self ms, one run with -X importtime):\n")
+    for package, ms, modules in report:
+        print(f"  {package:<36}{ms:>9.1f}  ({modules} modules)")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"runs": runs, "median": summary, "packages": report, "forbidden_imported": forbidden}, f, indent=2)
+
+    failed = False
+    if forbidden:
+        print(f"\nFAIL: app.main imported {', '.join(forbidden)}, which should load on first use")
+        failed = True
+    if args.budget_ms and summary["total_ms"] > args.budget_ms:
+        print(f"\nFAIL: cold start took {summary['total_ms']:.0f} ms, budget is {args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5, help="fresh interpreters to time")
+    ap.add_argument("--warmup", action="store_true", help="start with STARTUP_WARMUP=1 (it runs in the background, after startup)")
+    ap.add_argument("--budget-ms", type=float, default=0, help="fail when the median import + startup + first request is slower")
+    ap.add_argument("--forbid", nargs="*", default=["google.genai", "fpdf"], help="modules app.main must not import")
+    ap.add_argument("--top", type=int, default=15, help="packages to list in the import report")
+    ap.add_argument("--out", help="write results as JSON here")
+    sys.exit(main(ap.parse_args()))
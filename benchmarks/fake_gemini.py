@@ -0,0 +1,53 @@
+"""
+Minimal stand-in for the Gemini REST API, for exercising app/utils/llm.py offline.
+
+    python -m benchmarks.fake_gemini --port 8765 --latency 0.2 --error-rate 0.1
+    GEMINI_BASE_URL=http://127.0.0.1:8765 GEMINI_API_KEY=fake uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import uvicorn
+
+DEFAULT_REPLY = {"type": "expense", "action": "create", "amount": 2000.0, "account": "HDFC",
+                 "description": "Miscellaneous", "date": None, "from_account": None, "limit": None}
+
+
+def create_app(latency: float = 0.2, error_rate: float = 0.0, reply=None) -> FastAPI:
+    """reply is the JSON the model answers with, or a function of the prompt text returning it."""
+    app = FastAPI()
+    app.state.calls = 0
+
+    def answer(body: dict):
+        if callable(reply):
+            prompt = " ".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+            return reply(prompt)
+        return reply or DEFAULT_REPLY
+
+    @app.post("/{version}/models/{model_action}")
+    async def generate_content(version: str, model_action: str, req: Request):
+        app.state.calls += 1
+        body = await req.json()
+        await asyncio.sleep(latency)
+        if random.random() < error_rate:
+            return JSONResponse({"error": {"code": 503, "message": "overloaded", "status": "UNAVAILABLE"}}, status_code=503)
+        return {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": json.dumps(answer(body))}]},
+                "finishReason": "STOP",
+            }]
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.2)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    uvicorn.run(create_app(args.latency, args.error_rate), host="127.0.0.1", port=args.port)
@@ -0,0 +1,77 @@
+"""
+Load test for the async LLM gateway against benchmarks/fake_gemini.
+
+Fires bursts of concurrent "webhooks": some need Gemini, some are handled by the
+local parser. With the gateway the local-path p99 and event-loop lag stay flat
+as concurrency grows; only LLM-bound requests queue behind LLM_MAX_CONCURRENCY.
+
+    python -m benchmarks.llm_load --latency 0.2 --levels 2 10 50 100
+"""
+import argparse
+import asyncio
+import os
+import time
+from benchmarks.common import free_port, serve_in_thread, percentile
+from benchmarks.fake_gemini import create_app
+
+
+async def loop_lag(stop: asyncio.Event, samples: list, interval: float = 0.005):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def timed(coro, sink):
+    start = time.perf_counter()
+    await coro
+    sink.append(time.perf_counter() - start)
+
+
+async def burst(concurrency: int, parse_message):
+    llm, local, lag = [], [], []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(loop_lag(stop, lag))
+    tasks = []
+    for i in range(concurrency):
+        if i % 2:
+            tasks.append(timed(parse_message("moved 2000 from hdfc to icici"), llm))
+        else:
+            tasks.append(timed(parse_message("spent 500 on groceries"), local))
+    await asyncio.gather(*tasks)
+    stop.set()
+    await lag_task
+    return llm, local, lag or [0.0]
+
+
+async def main(levels, latency, error_rate):
+    port = free_port()
+    server = serve_in_thread(create_app(latency, error_rate), port)
+    os.environ.setdefault("GEMINI_API_KEY", "fake")
+
+    from app.utils import llm
+    from app.utils.parse_cache import ParseCache, set_parse_cache
+    from app.utils.nlp import parse_message
+    llm.GEMINI_BASE_URL = f"http://127.0.0.1:{port}"
+    llm.set_gateway(llm.LLMGateway())
+    set_parse_cache(ParseCache(max_size=0, shared_url=None))  # measure the gateway, not cache hits
+    # Build the client and open the connection pool before measuring.
+    warm = await parse_message("moved 2000 from hdfc to icici")
+    assert warm[0]["type"] != "unknown", "fake gemini is not answering"
+
+    print(f"fake gemini latency={latency}s error_rate={error_rate} max_concurrency={llm.LLM_MAX_CONCURRENCY}")
+    print(f"{'conc':>5} {'llm p50':>9} {'llm p99':>9} {'local p99':>10} {'loop lag p99':>13}")
+    for level in levels:
+        llm_lat, local_lat, lag = await burst(level, parse_message)
+        print(f"{level:>5} {percentile(llm_lat or [0], 50) * 1e3:>7.1f}ms {percentile(llm_lat or [0], 99) * 1e3:>7.1f}ms "
+              f"{percentile(local_lat, 99) * 1e3:>8.2f}ms {percentile(lag, 99) * 1e3:>11.2f}ms")
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--levels", type=int, nargs="+", default=[2, 10, 50, 100])
+    ap.add_argument("--latency", type=float, default=0.2)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    asyncio.run(main(args.levels, args.latency, args.error_rate))
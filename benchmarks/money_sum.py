@@ -0,0 +1,91 @@
+"""
+Balance recomputation over a large ledger: Float rupees (the old schema) versus
+BIGINT paise (app/utils/money.py), as SQL SUM ... GROUP BY and as a Python fold.
+
+    python -m benchmarks.money_sum --rows 2000000 --accounts 1000
+
+Also reports how far the float totals drift from the exact ones and the size of
+each table on disk.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from decimal import Decimal
+from app.utils.indian_format import format_inr
+from app.utils.money import to_rupees
+
+SCHEMAS = {
+    "float": "CREATE TABLE txn (id INTEGER PRIMARY KEY, account_id INTEGER, amount FLOAT)",
+    "paise": "CREATE TABLE txn (id INTEGER PRIMARY KEY, account_id INTEGER, amount BIGINT)",
+}
+
+
+def seed(kind: str, rows: int, accounts: int) -> sqlite3.Connection:
+    path = os.path.join(tempfile.gettempdir(), f"bench_money_{kind}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute(SCHEMAS[kind])
+    rng = random.Random(3)
+    batch = []
+    for i in range(rows):
+        paise = rng.randint(100, 500000) * (1 if rng.random() < 0.3 else -1)
+        batch.append((rng.randrange(accounts), paise / 100 if kind == "float" else paise))
+        if len(batch) == 100000:
+            conn.executemany("INSERT INTO txn (account_id, amount) VALUES (?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO txn (account_id, amount) VALUES (?, ?)", batch)
+    conn.execute("CREATE INDEX ix_txn_account ON txn (account_id, amount)")
+    conn.commit()
+    return conn
+
+
+def timed(fn, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - began)
+    return best, result
+
+
+def python_fold(conn):
+    balances = {}
+    for account_id, amount in conn.execute("SELECT account_id, amount FROM txn"):
+        balances[account_id] = balances.get(account_id, 0) + amount
+    return balances
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    ap.add_argument("--accounts", type=int, default=1000)
+    args = ap.parse_args()
+
+    results = {}
+    for kind in SCHEMAS:
+        conn = seed(kind, args.rows, args.accounts)
+        pages, page_size = conn.execute("PRAGMA page_count").fetchone()[0], conn.execute("PRAGMA page_size").fetchone()[0]
+        sql_time, sql_rows = timed(lambda: dict(conn.execute("SELECT account_id, SUM(amount) FROM txn GROUP BY account_id")))
+        fold_time, _ = timed(lambda: python_fold(conn), repeat=1)
+        results[kind] = sql_rows
+        print(f"{kind:6} SQL SUM {sql_time * 1000:8.1f} ms   Python fold {fold_time * 1000:8.1f} ms   {pages * page_size / 2**20:6.1f} MiB on disk")
+        conn.close()
+
+    exact = results["paise"]
+    # What str(balance) shows for the float total versus the exact rupee amount.
+    drift = {a: Decimal(repr(total)) - to_rupees(exact[a]) for a, total in results["float"].items()}
+    drifted = [a for a, d in drift.items() if d]
+    worst = max((abs(d) for d in drift.values()), default=0)
+    print(f"\nfloat totals that print wrong: {len(drifted)} of {len(exact)} accounts (worst off by Rs.{worst})")
+    sample = next(iter(drifted), None)
+    if sample is not None:
+        print(f"e.g. account {sample}: float {results['float'][sample]!r} vs exact {format_inr(exact[sample])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Accuracy and latency of the local parser (app/nlp/parser.py) over a labelled corpus.
+Seeded from the test_cases list in app/utils/nlp.py. Also checks the periods that
+app/utils/date_parser.py reads locally from export and analytics messages.
+
+    python -m benchmarks.parser_corpus
+"""
+import statistics
+import sys
+import time
+from datetime import date
+from app.nlp.parser import parse_local_many
+from app.utils.date_parser import resolve_range
+from app.utils.nlp import LOCAL_PARSE_THRESHOLD
+
+TODAY = date(2025, 6, 10)
+
+# (message, expected fields). Fields not listed are not checked. A list of expected
+# fields means the message should come back as that many transactions.
+CORPUS = [
+    ("cash is 0", {"type": "balance_adjustment", "amount": 0.0, "account": "Cash"}),
+    ("cash = 0", {"type": "balance_adjustment", "amount": 0.0, "account": "Cash"}),
+    ("hdfc = 2000", {"type": "balance_adjustment", "amount": 2000.0, "account": "HDFC"}),
+    ("sent 500 from cash", {"type": "expense", "action": "create", "amount": 500.0, "account": "Cash"}),
+    ("got 1000 from grandma", {"type": "income", "action": "create", "amount": 1000.0, "account": "Cash"}),
+    ("200.459 on ram from hdfc", {"type": "expense", "amount": 200.459, "account": "HDFC", "description": "Ram"}),
+    ("10,200.459 salary in hdfc", {"type": "income", "amount": 10200.459, "account": "HDFC"}),
+    ("spent 500 on groceries", {"type": "expense", "amount": 500.0, "account": "Cash", "description": "Groceries"}),
+    ("received 500 from client on 25 May", {"type": "income", "amount": 500.0, "date": "2025-05-25"}),
+    ("earned 1000 from freelancing yesterday", {"type": "income", "amount": 1000.0, "date": "2025-06-09"}),
+    ("added 250 to savings a week ago", {"type": "income", "amount": 250.0, "account": "SAVINGS", "date": "2025-06-03"}),
+    ("delete last expense", {"action": "delete", "account": "Cash"}),
+    ("balance of card", {"type": "balance", "action": "read", "account": "CARD"}),
+    ("hdfc balance", {"type": "balance", "action": "read", "account": "HDFC"}),
+    ("what's my sbi bal", {"type": "balance", "action": "read", "account": "SBI"}),
+    ("balance in my hdfc account", {"type": "balance", "action": "read", "account": "HDFC"}),
+    ("balance of zeta", {"type": "balance", "action": "read", "account": "ZETA"}),
+    ("balance", {"type": "balance", "action": "read", "account": "Cash"}),
+    ("update last income to 600", {"action": "update", "type": "income", "amount": 600.0}),
+    ("transfer 1500 from cash to sb", {"type": "transfer", "amount": 1500.0, "from_account": "Cash", "account": "SB"}),
+    ("t: 1500 from cash to hdfc", {"type": "transfer", "amount": 1500.0, "from_account": "Cash", "account": "HDFC"}),
+    ("give me the last 5 transactions from hdfc", {"type": "transaction", "action": "read", "limit": 5, "account": "HDFC"}),
+    ("show me the last 15 transactions from hdfc", {"type": "transaction", "action": "read", "limit": 15, "account": "HDFC"}),
+    ("breakdown by category last 3 months", {"type": "analytics", "metric": "categories"}),
+    ("what's my average daily spend", {"type": "analytics", "metric": "daily"}),
+    ("how much did i spend this month", {"type": "analytics", "metric": "summary"}),
+    ("spending month over month this year", {"type": "analytics", "metric": "monthly"}),
+    ("running balance last 30 days", {"type": "analytics", "metric": "balances"}),
+    ("last 10 transactions", {"type": "transaction", "action": "read", "limit": 10}),
+    ("chai 20", {"type": "expense", "amount": 20.0, "account": "Cash", "description": "Chai"}),
+    ("metro 40 cash", {"type": "expense", "amount": 40.0, "account": "Cash", "description": "Metro"}),
+    ("chai 20 junk food", {"type": "expense", "amount": 20.0, "date": None, "description": "Chai junk food"}),
+    ("paid 12 decor", {"type": "expense", "amount": 12.0, "date": None, "description": "Decor"}),
+    ("paid 1.5k rent from icici", {"type": "expense", "amount": 1500.0, "account": "ICICI", "description": "Rent"}),
+    ("₹250 lunch", {"type": "expense", "amount": 250.0, "description": "Lunch"}),
+    ("uber 320 via paytm", {"type": "expense", "amount": 320.0, "account": "PAYTM"}),
+    ("salary 50000 credited in sbi on 1st june", {"type": "income", "amount": 50000.0, "account": "SBI", "date": "2025-06-01"}),
+    # Ambiguous on purpose: these should fall through to Gemini.
+    ("moved 2000 from hdfc to icici", None),
+    ("t: ATM withdrawal", None),
+    ("chai 20 and samosa 15", None),
+    ("chai 20, auto 60, lunch 180 from hdfc", [
+        {"type": "expense", "amount": 20.0, "account": "HDFC", "description": "Chai"},
+        {"type": "expense", "amount": 60.0, "account": "HDFC", "description": "Auto"},
+        {"type": "expense", "amount": 180.0, "account": "HDFC", "description": "Lunch"},
+    ]),
+    ("salary 50000 to hdfc; rent 15000 from sbi", [
+        {"type": "income", "amount": 50000.0, "account": "HDFC"},
+        {"type": "expense", "amount": 15000.0, "account": "SBI"},
+    ]),
+    ("groceries 1,250, uber 340 yesterday", [
+        {"amount": 1250.0, "date": "2025-06-09"},
+        {"amount": 340.0, "date": "2025-06-09"},
+    ]),
+    ("chai 20, t: 500 from hdfc to sbi", None),
+    ("hello", None),
+]
+
+# (message, (first day, last day)), or "default" when it names no period. Words that only
+# start like a month ("marketing", "separately") are not months.
+RANGES = [
+    ("export march", ("2025-03-01", "2025-03-31")),
+    ("export sept 2024", ("2024-09-01", "2024-09-30")),
+    ("export dec.", ("2024-12-01", "2024-12-31")),
+    ("export 5 may to 10 june", ("2025-05-05", "2025-06-10")),
+    ("spend since 1st apr", ("2025-04-01", "2025-06-10")),
+    ("export marketing expenses", "default"),
+    ("export separately", "default"),
+    ("decor spend", "default"),
+    ("junk food spend", "default"),
+    ("augment the report", "default"),
+]
+
+
+def run(iterations: int = 200):
+    confident, correct, latencies = 0, 0, []
+    failures = []
+    for text, expected in CORPUS:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            items, confidence = parse_local_many(text, today=TODAY)
+        latencies.append((time.perf_counter() - start) / iterations * 1e6)
+
+        if confidence < LOCAL_PARSE_THRESHOLD:
+            if expected is not None:
+                failures.append((text, "fell back to LLM", confidence))
+            continue
+        confident += 1
+        if expected is None:
+            failures.append((text, f"should fall back, got {items}", confidence))
+            continue
+        expected_items = expected if isinstance(expected, list) else [expected]
+        if len(items) != len(expected_items):
+            failures.append((text, f"expected {len(expected_items)} transaction(s), got {items}", confidence))
+            continue
+        wrong = {k: parsed[k] for parsed, fields in zip(items, expected_items) for k, v in fields.items() if parsed[k] != v}
+        if wrong:
+            failures.append((text, f"wrong fields {wrong}", confidence))
+        else:
+            correct += 1
+
+    total = len(CORPUS)
+    latencies.sort()
+    print(f"messages:        {total}")
+    print(f"handled locally: {confident}/{total} ({confident / total:.0%}) at threshold {LOCAL_PARSE_THRESHOLD}")
+    print(f"local accuracy:  {correct}/{confident} ({correct / max(confident, 1):.0%})")
+    print(f"latency (us):    p50={statistics.median(latencies):.1f} max={latencies[-1]:.1f}")
+    for text, reason, confidence in failures:
+        print(f"  FAIL {text!r}: {reason} (confidence {confidence:.2f})")
+
+    wrong_ranges = []
+    for text, expected in RANGES:
+        got = resolve_range(text, today=TODAY)
+        got = "default" if got == {"start": None, "end": None} else got and (got["start"][:10], got["end"][:10])
+        if got != expected:
+            wrong_ranges.append((text, expected, got))
+    print(f"date ranges:     {len(RANGES) - len(wrong_ranges)}/{len(RANGES)}")
+    for text, expected, got in wrong_ranges:
+        print(f"  FAIL {text!r}: expected {expected}, got {got}")
+    return not failures and not wrong_ranges
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
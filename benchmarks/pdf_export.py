@@ -0,0 +1,127 @@
+"""
+PDF export for a heavy synthetic user: the old per-account report (2N+1 queries, every ORM
+row loaded twice) versus the one in app/utils/generate_pdf.py, which reads its totals from
+the rollups and streams its two tables from ordered queries. Peak RSS is mostly fpdf2's
+document, which both keep in memory until output.
+
+    python -m benchmarks.pdf_export --rows 100000 --accounts 5
+"""
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+_db_file = os.path.join(tempfile.gettempdir(), "bench_pdf_export.db")
+os.environ.setdefault("NEON_DB_URL", f"sqlite:///{_db_file}")
+
+from sqlalchemy import event, insert
+from app.db.session import engine, SessionLocal, Base
+from app.db import models, crud
+from app.db.rebuild_rollups import rebuild_rollups
+from app.nlp.categories import categorize
+from app.utils.generate_pdf import PDF, generate_pdf_report
+
+LegacyRow = namedtuple("LegacyRow", "account_name date amount_paise type description")
+DESCRIPTIONS = ["Chai", "Metro", "Groceries", "Rent", "Salary", "Balance correction", "Uber", "Lunch"]
+
+
+def seed(rows: int, accounts: int):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    rng = random.Random(7)
+    with engine.begin() as conn:
+        user_id = conn.execute(insert(models.User).values(id=1, telegram_id="1", name="Heavy")).inserted_primary_key[0]
+        account_ids = [
+            conn.execute(insert(models.Account).values(user_id=user_id, name=f"ACC{i}", balance_paise=0)).inserted_primary_key[0]
+            for i in range(accounts)
+        ]
+        start = datetime(2024, 6, 1)
+        batch = []
+        for i in range(rows):
+            description = rng.choice(DESCRIPTIONS)
+            batch.append({
+                "account_id": rng.choice(account_ids),
+                "user_id": user_id,
+                "amount_paise": rng.randint(1000, 500000),
+                "description": description,
+                "category": categorize(description),
+                "type": rng.choice([models.TransactionType.EXPENSE, models.TransactionType.INCOME]),
+                "date": start + timedelta(seconds=i * 365 * 86400 // rows),
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(models.Transaction), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.Transaction), batch)
+    with SessionLocal() as db:
+        rebuild_rollups(db)
+
+
+def legacy_report(user_id, db, output_path, start, end):
+    """generate_pdf_report as it was before the rollup and streaming rewrite."""
+    accounts = crud.get_all_balances(db, user_id)
+    all_transactions = []
+    pdf = PDF()
+    pdf.add_page()
+    total_expense, total_income = 0, 0
+    for acc in accounts:
+        txns = crud.get_transactions_by_account(db, acc.id, start, end)
+        if txns:
+            all_transactions.extend([(acc.name, t) for t in txns])
+            for t in txns:
+                if not t.description.lower() == "balance correction":
+                    if t.type == "income":
+                        total_income += t.amount_paise
+                    else:
+                        total_expense += t.amount_paise
+    pdf.add_summary_line(total_expense, total_income)
+    for acc in accounts:
+        txns = crud.get_transactions_by_account(db, acc.id, start, end)
+        if txns:
+            pdf.add_account_table(acc.name, txns)
+    if all_transactions:
+        pdf.add_page()
+        all_transactions.sort(key=lambda x: x[1].date)
+        pdf.add_combined_sheet(LegacyRow(n, t.date, t.amount_paise, t.type, t.description) for n, t in all_transactions)
+    pdf.output(output_path)
+
+
+def measure(label, fn, user_id, start, end):
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(engine, "before_cursor_execute", listener)
+    out = os.path.join(tempfile.gettempdir(), f"bench_{label}.pdf")
+    with SessionLocal() as db:
+        began = time.perf_counter()
+        fn(user_id, db, out, start, end)
+        elapsed = time.perf_counter() - began
+    event.remove(engine, "before_cursor_execute", listener)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    print(f"{label:10} {elapsed:8.2f}s  peak RSS {peak:7.1f} MiB  {len(statements):4} queries  {os.path.getsize(out) / 2**20:.1f} MiB pdf")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--accounts", type=int, default=5)
+    ap.add_argument("--skip-legacy", action="store_true")
+    ap.add_argument("--variant", choices=["legacy", "current"], help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    start, end = "2024-06-01T00:00:00+05:30", "2025-06-01T00:00:00+05:30"
+
+    if args.variant:
+        # Child process: one variant per process so peak RSS is attributable.
+        fn = legacy_report if args.variant == "legacy" else generate_pdf_report
+        measure(args.variant, fn, 1, start, end)
+        sys.exit(0)
+
+    seed(args.rows, args.accounts)
+    print(f"{args.rows} transactions over {args.accounts} accounts")
+    for variant in ([] if args.skip_legacy else ["legacy"]) + ["current"]:
+        subprocess.run([sys.executable, "-m", "benchmarks.pdf_export", "--variant", variant], check=True)
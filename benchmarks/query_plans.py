@@ -0,0 +1,203 @@
+"""
+EXPLAIN every statement the crud functions issue against a seeded large dataset and
+fail if any of them falls back to a sequential scan of transactions or accounts, or
+if a crud function runs more statements than its budget in app.db.profiler.QUERY_BUDGETS.
+
+    python -m benchmarks.query_plans                        # sqlite, seeded in a temp file
+    python -m benchmarks.query_plans --url postgresql://... # seeds and checks a scratch Postgres db
+
+Exits 1 and prints the offending plans on a regression. Meant to run in CI after
+any change to app/db/crud.py or the migrations.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+_db_file = os.path.join(tempfile.gettempdir(), "bench_query_plans.db")
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--url", default=None, help="database to seed and check; defaults to a temp sqlite file")
+parser.add_argument("--users", type=int, default=2000)
+parser.add_argument("--accounts", type=int, default=3, help="accounts per user")
+parser.add_argument("--rows", type=int, default=200000)
+args = parser.parse_args() if __name__ == "__main__" else parser.parse_args([])
+
+os.environ["NEON_DB_URL"] = args.url or f"sqlite:///{_db_file}"
+# The archive horizon at 2024-03, two months into the seeded year, so reads reaching back
+# before it merge archived months in.
+_now = datetime.now()
+os.environ["TRANSACTIONS_HOT_MONTHS"] = str((_now.year - 2024) * 12 + _now.month - 3)
+
+from sqlalchemy import event, insert, select, text
+from app.db.session import engine, SessionLocal, Base
+from app.db import models, crud, partitions
+from app.db.rebuild_rollups import rebuild_rollups
+from app.db.profiler import QUERY_BUDGETS
+
+TABLES = ("transactions", "accounts", "users", "transaction_rollups", "transaction_archive")
+
+
+def seed():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    rng = random.Random(11)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": u, "telegram_id": str(100000 + u), "name": f"user{u}"} for u in range(1, args.users + 1)
+        ])
+        accounts = []
+        for u in range(1, args.users + 1):
+            for a in range(args.accounts):
+                accounts.append({"id": len(accounts) + 1, "user_id": u, "name": f"ACC{a}", "balance_paise": 0})
+        conn.execute(insert(models.Account), accounts)
+
+        start = datetime(2024, 1, 1)
+        batch = []
+        for i in range(args.rows):
+            account = rng.choice(accounts)
+            batch.append({
+                "account_id": account["id"],
+                "user_id": account["user_id"],
+                "amount_paise": rng.randint(1000, 500000),
+                "description": "seed",
+                "type": rng.choice([models.TransactionType.EXPENSE, models.TransactionType.INCOME]),
+                "date": start + timedelta(seconds=rng.randrange(365 * 86400)),
+                # Some transfer legs, or ANALYZE sees one transfer_id (NULL) on every row.
+                "transfer_id": f"{i:032x}" if i % 20 == 0 else None,
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(models.Transaction), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.Transaction), batch)
+    with SessionLocal() as db:
+        rebuild_rollups(db)
+    with SessionLocal() as db:
+        archived = partitions.archive_old(db)
+    print(f"archived {sum(archived.values())} transactions from {len(archived)} months")
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def capture(fn):
+    """Run fn(db) and return the (sql, params) of every statement it executed."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with SessionLocal() as db:
+            result = fn(db)
+            if hasattr(result, "__iter__") and not isinstance(result, (list, tuple)):
+                list(result)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+
+def explain(statement, parameters):
+    with engine.connect() as conn:
+        raw = conn.connection.dbapi_connection
+        cursor = raw.cursor()
+        if conn.dialect.name == "postgresql":
+            cursor.execute("SET enable_seqscan = off")  # any Seq Scan left is one with no usable index
+            cursor.execute("EXPLAIN " + statement, parameters)
+            plan = [row[0] for row in cursor.fetchall()]
+            cursor.execute("RESET enable_seqscan")
+        else:
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            plan = [row[-1] for row in cursor.fetchall()]
+        cursor.close()
+        raw.rollback()
+    return plan
+
+
+def seq_scans(plan, dialect):
+    bad = []
+    for line in plan:
+        for table in TABLES:
+            if dialect == "postgresql" and f"Seq Scan on {table}" in line:
+                bad.append(line.strip())
+            elif dialect == "sqlite" and line.startswith(f"SCAN {table}"):
+                bad.append(line.strip())
+    return bad
+
+
+def main():
+    print(f"seeding {args.rows} transactions for {args.users} users on {engine.dialect.name}...")
+    seed()
+
+    user_id, account_id, telegram_id = 42, 42 * args.accounts, "100042"
+    with SessionLocal() as db:
+        # A history page deep into the account, where an OFFSET scan would have to skip most rows.
+        ids = db.scalars(select(models.Transaction.id).where(models.Transaction.account_id == account_id)).all()
+        anchor_id = ids[len(ids) // 2]
+        # A transfer recorded from a Telegram message, for the edited-message lookups; another
+        # user's accounts so the *_last_transaction checks below don't touch it.
+        source = {"chat_id": 43, "message_id": 7, "source_text": "transfer 500 from acc1 to acc2"}
+        legs = crud.add_transfer(db, 43 * args.accounts - 1, 43 * args.accounts, 500, "plan check", source=source)
+        leg_ids = [leg.id for leg in legs]
+    checks = {
+        "get_user": lambda db: crud.get_user(db, telegram_id),
+        "get_account_by_name": lambda db: crud.get_account_by_name(db, user_id, "acc1"),
+        "get_all_balances": lambda db: crud.get_all_balances(db, user_id),
+        "get_transactions_page": lambda db: crud.get_transactions_page(db, user_id, account_id, 10),
+        "get_transactions_page (older)": lambda db: crud.get_transactions_page(db, user_id, account_id, 10, anchor_id),
+        "get_transactions_page (newer)": lambda db: crud.get_transactions_page(db, user_id, account_id, 10, anchor_id, newer=True),
+        "get_transactions_by_account": lambda db: crud.get_transactions_by_account(db, account_id, "2024-03-01T00:00:00Z", "2024-06-01T00:00:00Z"),
+        "get_report_totals": lambda db: crud.get_report_totals(db, user_id, "2024-01-10T10:00:00Z", "2024-11-20T10:00:00Z"),
+        "get_category_totals": lambda db: crud.get_category_totals(db, user_id, "2024-01-10T10:00:00Z", "2024-11-20T10:00:00Z"),
+        "get_daily_totals": lambda db: crud.get_daily_totals(db, user_id, *crud.date_range("2024-03-01T00:00:00Z", "2024-06-01T00:00:00Z")),
+        "get_net_since": lambda db: crud.get_net_since(db, user_id, crud.date_range("2024-06-01T00:00:00Z", None)[0]),
+        "get_daily_totals (archived)": lambda db: crud.get_daily_totals(db, user_id, *crud.date_range("2024-01-15T00:00:00Z", "2024-04-01T00:00:00Z")),
+        "get_net_since (archived)": lambda db: crud.get_net_since(db, user_id, crud.date_range("2024-02-01T00:00:00Z", None)[0]),
+        "iter_user_transactions": lambda db: crud.iter_user_transactions(db, user_id, "2024-01-01T00:00:00Z", "2025-01-01T00:00:00Z", by_account=True),
+        "add_transaction": lambda db: crud.add_transaction(db, account_id, 1000, "plan check", "expense"),
+        "add_transactions": lambda db: crud.add_transactions(db, [(account_id, 1000, "chai", "expense", None), (account_id - 1, 2000, "lunch", "expense", None)]),
+        "add_transfer": lambda db: crud.add_transfer(db, account_id, account_id - 1, 500, "plan check"),
+        "set_balance": lambda db: crud.set_balance(db, account_id, 100000),
+        "import_transactions": lambda db: crud.import_transactions(db, account_id, [(crud._day_start(datetime(2024, 3, 5).date()), "plan check", "expense", 1000)]),
+        "update_last_transaction": lambda db: crud.update_last_transaction(db, account_id, 1200),
+        "delete_last_transaction": lambda db: crud.delete_last_transaction(db, account_id),
+        "get_message_transactions": lambda db: crud.get_message_transactions(db, 43, 43, 7),
+        "edit_transactions": lambda db: crud.edit_transactions(db, {leg_ids[0]: {"amount_paise": 700, "description": "plan check 2"}}),
+        "delete_transactions": lambda db: crud.delete_transactions(db, leg_ids),
+    }
+
+    failures = 0
+    for name, fn in checks.items():
+        statements = capture(fn)
+        budget = QUERY_BUDGETS.get(f"db.{name.split()[0]}")
+        if budget is not None and len(statements) > budget:
+            failures += 1
+            print(f"{name:<30} OVER BUDGET: {len(statements)} statements, budget {budget}")
+            for statement, _ in statements:
+                print("   " + " ".join(statement.split())[:160])
+        for statement, parameters in statements:
+            if statement.lstrip().split(None, 1)[0].upper() not in ("SELECT", "UPDATE", "DELETE"):
+                continue
+            if isinstance(parameters, list):
+                parameters = parameters[0]  # executemany: the plan is the same for every row
+            plan = explain(statement, parameters)
+            bad = seq_scans(plan, engine.dialect.name)
+            status = "SEQ SCAN" if bad else "ok"
+            print(f"{name:<30} {status}")
+            if bad:
+                failures += 1
+                print("   " + " ".join(statement.split()))
+                for line in plan:
+                    print("     " + line)
+
+    if failures:
+        print(f"\n{failures} statement(s) fell back to a sequential scan or went over budget")
+        sys.exit(1)
+    print("\nall crud statements use an index and crud calls are within their query budgets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Bulk statement import: a synthetic HDFC-style CSV through iter_statement and
+crud.import_transactions, versus one crud.add_transaction (one commit) per row.
+
+    python -m benchmarks.statement_import --rows 100000
+
+Checks that every row landed, that the balance and rollups agree with the
+transactions, and that importing the same file again inserts nothing. Peak RSS
+is reported so memory growth with --rows shows up.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_file = os.path.join(tempfile.gettempdir(), "bench_statement_import.db")
+os.environ.setdefault("NEON_DB_URL", f"sqlite:///{_db_file}")
+
+from sqlalchemy import func, insert, select
+from app.db.session import engine, SessionLocal, Base
+from app.db import models, crud
+from app.utils.statement_parser import iter_statement
+
+NARRATIONS = [
+    "UPI-SWIGGY-swiggy@ybl-{ref}", "UPI-ZOMATO ORDER-{ref}", "POS {ref} BIGBASKET", "NEFT CR-SALARY-ACME LTD",
+    "ATM WDL {ref} MG ROAD", "UPI-UBER INDIA-{ref}", "ACH D- LIC PREMIUM-{ref}", "IMPS-{ref}-RENT",
+    "UPI-CHAI POINT-{ref}", "ELECTRICITY BILL BESCOM {ref}",
+]
+
+
+def write_statement(path: str, rows: int):
+    rng = random.Random(5)
+    start = datetime(2022, 4, 1)
+    with open(path, "w", newline="") as f:
+        f.write("HDFC BANK Ltd.,,,,,,\nStatement of account,,,,,,\n,,,,,,\n")
+        f.write("Date,Narration,Chq./Ref.No.,Value Dt,Withdrawal Amt.,Deposit Amt.,Closing Balance\n")
+        for i in range(rows):
+            day = (start + timedelta(days=i * 1095 // rows)).strftime("%d/%m/%y")
+            narration = rng.choice(NARRATIONS).format(ref=rng.randrange(10**11, 10**12))
+            amount = f"{rng.randint(100, 5000000) / 100:,.2f}"
+            credit = "SALARY" in narration or rng.random() < 0.1
+            f.write(f'{day},{narration},0000{i},{day},{"" if credit else amount},{amount if credit else ""},0.00\n')
+        f.write(",,,,,,\n**Statement Summary**,,,,,,\n")
+
+
+def fresh_account() -> int:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User).values(id=1, telegram_id="1", name="Importer"))
+        return conn.execute(insert(models.Account).values(user_id=1, name="HDFC", balance_paise=0)).inserted_primary_key[0]
+
+
+def run_import(path: str, account_id: int, chunk_size: int) -> tuple:
+    with SessionLocal() as db, open(path, "rb") as f:
+        began = time.perf_counter()
+        result = crud.import_transactions(db, account_id, iter_statement(f, path), chunk_size)
+        return time.perf_counter() - began, result
+
+
+def per_row(path: str, account_id: int, limit: int) -> float:
+    with SessionLocal() as db, open(path, "rb") as f:
+        began = time.perf_counter()
+        for i, (when, description, type, amount_paise) in enumerate(iter_statement(f, path)):
+            if i == limit:
+                break
+            crud.add_transaction(db, account_id, amount_paise, description, type, when)
+        return (time.perf_counter() - began) / limit
+
+
+def check(account_id: int, rows: int) -> list:
+    txn, rollup = models.Transaction, models.TransactionRollup
+    signed = func.sum(crud.case((txn.type == models.TransactionType.INCOME, txn.amount_paise), else_=-txn.amount_paise))
+    problems = []
+    with SessionLocal() as db:
+        count, net = db.execute(select(func.count(), signed).where(txn.account_id == account_id)).one()
+        balance = db.get(models.Account, account_id).balance_paise
+        rolled = db.execute(
+            select(func.sum(rollup.count), func.sum(rollup.total_paise)).where(rollup.account_id == account_id, rollup.grain == "month")
+        ).one()
+        raw = db.execute(select(func.count(), func.sum(txn.amount_paise)).where(txn.account_id == account_id)).one()
+    if count != rows:
+        problems.append(f"{count} transactions stored, expected {rows}")
+    if balance != net:
+        problems.append(f"balance {balance} != net of transactions {net}")
+    if tuple(rolled) != tuple(raw):
+        problems.append(f"month rollups {tuple(rolled)} != transactions {tuple(raw)}")
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--chunk-size", type=int, default=5000)
+    ap.add_argument("--per-row-sample", type=int, default=1000, help="rows timed through add_transaction")
+    args = ap.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "bench_statement.csv")
+    write_statement(path, args.rows)
+    print(f"{args.rows} row statement, {os.path.getsize(path) / 2**20:.1f} MiB")
+
+    if args.per_row_sample:
+        per_row_time = per_row(path, fresh_account(), args.per_row_sample)
+        print(f"add_transaction per row   {per_row_time * 1000:6.2f} ms/row  (~{per_row_time * args.rows:.0f}s for the file)")
+
+    account_id = fresh_account()
+    elapsed, result = run_import(path, account_id, args.chunk_size)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"import_transactions       {elapsed:6.2f}s  ({result['inserted'] / elapsed:,.0f} rows/s)  peak RSS {peak:.0f} MiB")
+
+    elapsed, again = run_import(path, account_id, args.chunk_size)
+    print(f"re-import                 {elapsed:6.2f}s  inserted {again['inserted']}, skipped {again['duplicates']}")
+
+    problems = check(account_id, args.rows)
+    if again["inserted"]:
+        problems.append(f"re-import inserted {again['inserted']} rows")
+    if problems:
+        print("\n" + "\n".join(problems))
+        sys.exit(1)
+    print("\nbalance, rollups and dedup check out")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Report/summary totals for a heavy user: GROUP BY over every transaction in range
+(the previous get_report_totals) versus the day/month rollups.
+
+    python -m benchmarks.summary_totals --rows 500000 --accounts 5
+"""
+import argparse
+import statistics
+import time
+from sqlalchemy import func, case
+from benchmarks.pdf_export import seed
+from benchmarks.common import percentile
+from app.db.session import SessionLocal
+from app.db import models, crud
+
+RANGES = {
+    "month": ("2024-09-01T00:00:00+05:30", "2024-09-30T23:59:59+05:30"),
+    "quarter": ("2024-07-01T00:00:00+05:30", "2024-09-30T23:59:59+05:30"),
+    "year": ("2024-06-01T00:00:00+05:30", "2025-05-31T23:59:59+05:30"),
+    "ragged": ("2024-06-14T15:30:00+05:30", "2025-02-03T09:00:00+05:30"),
+}
+
+
+def scan_totals(db, user_id, start, end):
+    start, end = crud.date_range(start, end)
+    counted = func.lower(models.Transaction.description) != "balance correction"
+    return db.query(
+        models.Transaction.account_id,
+        models.Transaction.type,
+        func.coalesce(func.sum(case((counted, models.Transaction.amount_paise), else_=0)), 0).label("total_paise"),
+        func.count(models.Transaction.id).label("count"),
+    ).join(models.Account, models.Account.id == models.Transaction.account_id).filter(
+        models.Account.user_id == user_id,
+        models.Transaction.date >= start,
+        models.Transaction.date <= end,
+    ).group_by(models.Transaction.account_id, models.Transaction.type).all()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - began) * 1000)
+    return samples, result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=500_000)
+    ap.add_argument("--accounts", type=int, default=5)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    print(f"seeding {args.rows} transactions over {args.accounts} accounts...")
+    seed(args.rows, args.accounts)
+    with SessionLocal() as db:
+        for label, (start, end) in RANGES.items():
+            scan, expected = timed(lambda: scan_totals(db, 1, start, end), args.repeat)
+            rollup, got = timed(lambda: crud.get_report_totals(db, 1, start, end), args.repeat)
+            same = sorted(tuple(r) for r in expected) == sorted(tuple(r) for r in got)
+            print(
+                f"{label:8} scan p50 {statistics.median(scan):8.2f} ms  p95 {percentile(scan, 95):8.2f} ms   "
+                f"rollup p50 {statistics.median(rollup):7.2f} ms  p95 {percentile(rollup, 95):7.2f} ms   "
+                f"{'same totals' if same else 'TOTALS DIFFER'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
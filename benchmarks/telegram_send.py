@@ -0,0 +1,54 @@
+"""
+Replies/sec to a local Telegram stub: one new httpx.AsyncClient per reply (the
+old bot_handler behaviour) versus the shared TelegramClient.
+
+    python -m benchmarks.telegram_send --replies 500 --chats 100
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from benchmarks.common import serve_in_thread, server_url
+from benchmarks.telegram_stub import create_app
+from app.services.telegram_client import TelegramClient
+
+
+async def client_per_reply(url: str, replies: int, chats: int):
+    async def send(i):
+        async with httpx.AsyncClient() as client:
+            await client.post(f"{url}/botTOKEN/sendMessage", json={"chat_id": i % chats, "text": f"reply {i}"})
+    await asyncio.gather(*(send(i) for i in range(replies)))
+
+
+async def shared_client(url: str, replies: int, chats: int):
+    # Rate limits off: this measures transport overhead, not Telegram's quotas.
+    telegram = TelegramClient(token="TOKEN", api_url=url, chat_interval=0, global_rate=1e9)
+    futures = [telegram.send_message(i % chats, f"reply {i}") for i in range(replies)]
+    await asyncio.gather(*futures)
+    await telegram.close()
+    return telegram.stats()
+
+
+async def main(replies: int, chats: int):
+    app = create_app()
+    url = server_url(serve_in_thread(app))
+
+    start = time.perf_counter()
+    await client_per_reply(url, replies, chats)
+    before = replies / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    stats = await shared_client(url, replies, chats)
+    after = replies / (time.perf_counter() - start)
+
+    print(f"replies: {replies} across {chats} chats")
+    print(f"client per reply: {before:8.1f} replies/s")
+    print(f"shared client:    {after:8.1f} replies/s  ({stats['sent']} requests, {stats['coalesced']} coalesced)")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--replies", type=int, default=500)
+    ap.add_argument("--chats", type=int, default=100)
+    args = ap.parse_args()
+    asyncio.run(main(args.replies, args.chats))
@@ -0,0 +1,56 @@
+"""
+Local stand-in for api.telegram.org. Records every call; optionally answers a
+fraction of them with 429 + retry_after like the real API does under load.
+Files put in app.state.files (file_id -> bytes) can be fetched with getFile and
+downloaded from /file/bot<token>/<file_path>, as for documents users send.
+
+    python -m benchmarks.telegram_stub --port 8766
+    TELEGRAM_API_URL=http://127.0.0.1:8766 uvicorn app.main:app
+"""
+import argparse
+import random
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+import uvicorn
+
+
+def create_app(throttle_rate: float = 0.0, retry_after: int = 1) -> FastAPI:
+    app = FastAPI()
+    app.state.calls = []
+    app.state.files = {}
+
+    @app.get("/file/bot{token}/documents/{file_id}")
+    async def download(token: str, file_id: str):
+        if file_id not in app.state.files:
+            return JSONResponse({"ok": False, "description": "Not Found"}, status_code=404)
+        return Response(app.state.files[file_id], media_type="application/octet-stream")
+
+    @app.post("/bot{token}/{method}")
+    async def bot_method(token: str, method: str, req: Request):
+        if req.headers.get("content-type", "").startswith("application/json"):
+            body = await req.json()
+        else:
+            body = dict(await req.form())
+        app.state.calls.append((method, body))
+        if random.random() < throttle_rate:
+            return JSONResponse(
+                {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                 "parameters": {"retry_after": retry_after}},
+                status_code=429,
+            )
+        if method == "getFile":
+            content = app.state.files.get(body.get("file_id"))
+            if content is None:
+                return JSONResponse({"ok": False, "error_code": 400, "description": "Bad Request: invalid file_id"}, status_code=400)
+            return {"ok": True, "result": {"file_id": body["file_id"], "file_size": len(content), "file_path": f"documents/{body['file_id']}"}}
+        return {"ok": True, "result": {"message_id": len(app.state.calls), "chat": {"id": body.get("chat_id")}}}
+
+    return app
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8766)
+    ap.add_argument("--throttle-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    uvicorn.run(create_app(args.throttle_rate), host="127.0.0.1", port=args.port)